@@ -0,0 +1,150 @@
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".rename_journals")
+
+def timestamp_names(timestamp_ms, ext):
+    """<timestamp_ms><ext>, then the timestamp + 1, + 2, ... on collisions"""
+    return (f"{timestamp_ms + counter}{ext}" for counter in itertools.count())
+
+def numbered_names(stem, ext):
+    """<stem><ext>, then "<stem> (1)<ext>", "<stem> (2)<ext>", ... on collisions"""
+    yield f"{stem}{ext}"
+    for counter in itertools.count(1):
+        yield f"{stem} ({counter}){ext}"
+
+class RenamePlanner:
+    """
+    Resolves rename targets in memory and applies them as one batch.
+
+    Each directory is listed once, the first time a file in it is planned;
+    after that collisions are checked against an in-memory set of names
+    instead of an os.path.exists() per candidate (a round trip each over
+    SMB). Every name that exists when the directory is listed stays taken,
+    including the names of files that are about to be renamed away, so the
+    planned renames never depend on each other and can run in any order.
+
+    apply() writes the planned renames to a JSON lines journal before
+    touching anything, and rollback() undoes a journal. It can be called
+    repeatedly while planning goes on (e.g. every few hundred files, so an
+    interrupted run keeps what it did); every call appends to the same
+    journal, so one rollback undoes the whole run. forget() drops the names
+    of a directory that is done. plan() and forget() are thread safe and
+    may run while one thread applies.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.taken = {}
+        self.renames = []
+        self.journal_path = None
+
+    def _taken_names(self, directory):
+        names = self.taken.get(directory)
+        if names is None:
+            names = {os.path.normcase(name) for name in os.listdir(directory)}
+            self.taken[directory] = names
+        return names
+
+    def plan(self, path, candidates):
+        """
+        Reserve the first free name from candidates (an iterable of file
+        names, usually one of the generators above) for the file at path.
+        Returns the target path, or None if the file already has the name it
+        would get (e.g. "<timestamp + 1>.jpg" after an earlier collision).
+        """
+        directory, current = os.path.split(path)
+        with self.lock:
+            taken = self._taken_names(directory)
+            for name in candidates:
+                if name == current:
+                    return None
+                key = os.path.normcase(name)
+                if key in taken and key != os.path.normcase(current):
+                    continue
+                taken.add(key)
+                target = os.path.join(directory, name)
+                self.renames.append((path, target))
+                return target
+
+    def forget(self, directory):
+        """Drop the cached names of a directory no more files are planned in"""
+        with self.lock:
+            self.taken.pop(directory, None)
+
+    def apply(self, journal_dir=DEFAULT_JOURNAL_DIR):
+        """
+        Rename everything planned since the last call. Returns (journal
+        path, list of (source, target) done, list of (source, target, error)
+        failed); the journal path is None until something was renamed.
+        A failed rename is reported and the rest of the batch continues.
+        """
+        with self.lock:
+            renames, self.renames = self.renames, []
+            if not renames:
+                return self.journal_path, [], []
+            if self.journal_path is None:
+                os.makedirs(journal_dir, exist_ok=True)
+                self.journal_path = os.path.join(
+                    journal_dir, time.strftime("rename-%Y%m%d-%H%M%S") + f"-{os.getpid()}.jsonl"
+                )
+            journal_path = self.journal_path
+        with open(journal_path, "a", encoding="utf-8") as journal:
+            for source, target in renames:
+                journal.write(json.dumps({"src": os.path.abspath(source), "dst": os.path.abspath(target)}) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+        done = []
+        failed = []
+        for source, target in renames:
+            try:
+                os.rename(source, target)
+                done.append((source, target))
+            except OSError as e:
+                failed.append((source, target, e))
+        return journal_path, done, failed
+
+def rollback(journal_path):
+    """
+    Undo the renames of a journal, newest first. Entries whose target is
+    gone or whose source name got reused are left alone and reported.
+    Returns (restored count, list of problem messages).
+    """
+    with open(journal_path, "r", encoding="utf-8") as journal:
+        entries = [json.loads(line) for line in journal if line.strip()]
+
+    restored = 0
+    problems = []
+    for entry in reversed(entries):
+        source, target = entry["src"], entry["dst"]
+        if not os.path.exists(target):
+            if not os.path.exists(source):
+                problems.append(f"Missing: {target}")
+            continue
+        if os.path.exists(source):
+            problems.append(f"Not restoring {target}, {source} exists again")
+            continue
+        try:
+            os.rename(target, source)
+            restored += 1
+        except OSError as e:
+            problems.append(f"Failed to restore {target} -> {source}: {e}")
+    return restored, problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Undo a batch of renames from its journal")
+    parser.add_argument("journal", help="journal file written by RenamePlanner.apply()")
+    args = parser.parse_args()
+
+    restored, problems = rollback(args.journal)
+    for problem in problems:
+        print(problem)
+    print(f"Restored {restored} files")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: sparse approximate filename clustering vs. exact DBSCAN
+
+    python benchmark_clustering.py --count 500000
+
+Clusters synthetic filenames (see benchmark_date_extraction) with
+filename_clustering and prints the time and peak memory of every stage.
+On a smaller sample it also runs the exact DBSCAN the scripts used before
+(brute force cosine on the sparse matrix, which is still O(n^2) time) and
+reports how well the two clusterings agree (adjusted Rand index).
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import adjusted_rand_score
+
+from benchmark_date_extraction import synthetic_filenames
+from filename_clustering import ResourceReport, SimHashIndex, cluster_filenames, make_vectorizer
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sparse filename clustering")
+    parser.add_argument("--count", type=int, default=500_000, help="synthetic filenames")
+    parser.add_argument("--exact-count", type=int, default=5_000, help="filenames for the exact comparison (0 to skip)")
+    parser.add_argument("--eps", type=float, default=0.6)
+    parser.add_argument("--tables", type=int, default=24, help="SimHash tables")
+    parser.add_argument("--window", type=int, default=64, help="neighbours compared per row and table")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    names = synthetic_filenames(args.count, args.seed)
+    index = SimHashIndex(args.tables, args.window)
+
+    print(f"Clustering {len(names)} filenames")
+    report = ResourceReport()
+    labels = cluster_filenames(names, eps=args.eps, index=index, report=report)
+    print(report.summary())
+    print(f"{len(set(labels)) - (-1 in labels)} clusters, {np.sum(labels == -1)} unclustered")
+
+    if not args.exact_count:
+        return
+    sample = names[:args.exact_count]
+    approximate = cluster_filenames(sample, eps=args.eps, index=index)
+    started = time.perf_counter()
+    X = make_vectorizer().fit_transform(sample)
+    exact = DBSCAN(eps=args.eps, min_samples=2, metric="cosine", algorithm="brute").fit(X).labels_
+    print(f"\nExact DBSCAN on {len(sample)} filenames: {time.perf_counter() - started:.2f} s")
+    print(f"Agreement (adjusted Rand index): {adjusted_rand_score(exact, approximate):.4f}")
+
+if __name__ == "__main__":
+    main()
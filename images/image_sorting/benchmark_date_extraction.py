@@ -0,0 +1,122 @@
+"""
+Micro-benchmark: DateExtractor vs. the per-pattern re.search + strptime loop
+
+    python benchmark_date_extraction.py --count 1000000
+
+Generates synthetic filenames (camera, phone, messenger, screenshot and
+timestamp names plus some without a date), then times:
+  - the compiled single-pass DateExtractor
+  - one re.search per pattern followed by strptime (the old loop)
+  - dateutil fuzzy parsing (only if python-dateutil is installed, on a
+    smaller sample since it is orders of magnitude slower)
+and reports how often the old loop and the extractor agree.
+"""
+
+import argparse
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+from date_extraction import DATE_FORMATS, DateExtractor
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+TEMPLATES = [
+    "IMG_{Y}{m}{d}_{H}{M}{S}.jpg",
+    "VID-{Y}{m}{d}-WA{n4}.mp4",
+    "WhatsApp Image {Y}-{m}-{d} at {H}.{M}.{S}.jpeg",
+    "Screenshot_{Y}-{m}-{d}-{H}-{M}-{S}.png",
+    "{ms}.jpg",
+    "scan {d} {b} {Y}.pdf",
+    "holiday_{d}_{m}_{Y}_{n4}.jpg",
+    "PXL_{Y}{m}{d}_{H}{M}{S}{n3}.jpg",
+    "DSC{n4}.JPG",
+    "family photo {n2}.png",
+]
+
+def synthetic_filenames(count, seed):
+    rng = random.Random(seed)
+    start = datetime(2005, 1, 1)
+    span = int((datetime(2025, 1, 1) - start).total_seconds())
+    names = []
+    for _ in range(count):
+        date = start + timedelta(seconds=rng.randrange(span))
+        names.append(rng.choice(TEMPLATES).format(
+            Y=date.year,
+            m=f"{date.month:02d}",
+            d=f"{date.day:02d}",
+            b=MONTH_NAMES[date.month - 1],
+            H=f"{date.hour:02d}",
+            M=f"{date.minute:02d}",
+            S=f"{date.second:02d}",
+            ms=int(date.timestamp() * 1000),
+            n2=rng.randrange(100),
+            n3=f"{rng.randrange(1000):03d}",
+            n4=f"{rng.randrange(10000):04d}",
+        ))
+    return names
+
+def strptime_loop(filename):
+    """The old approach: re.search per pattern, then strptime"""
+    for regex, format_str in DATE_FORMATS:
+        for match in re.finditer(regex, filename):
+            date_str = match.group()
+            try:
+                if format_str == "timestamp_ms":
+                    return datetime.fromtimestamp(int(date_str) / 1000.0)
+                if format_str == "timestamp_s":
+                    return datetime.fromtimestamp(int(date_str))
+                return datetime.strptime(date_str, format_str)
+            except (ValueError, OverflowError, OSError):
+                continue
+    return None
+
+def time_it(label, function, names):
+    started = time.perf_counter()
+    results = [function(name) for name in names]
+    elapsed = time.perf_counter() - started
+    found = sum(result is not None for result in results)
+    print(
+        f"{label:<26} {len(names):>9} names {elapsed:8.2f}s "
+        f"{elapsed / len(names) * 1e6:8.2f} us/name  {found / len(names):6.1%} dated"
+    )
+    return results, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark filename date extraction")
+    parser.add_argument("--count", type=int, default=1_000_000, help="synthetic filenames")
+    parser.add_argument("--legacy-count", type=int, default=None, help="filenames for the strptime loop (default: --count)")
+    parser.add_argument("--dateutil-count", type=int, default=20_000, help="filenames for the dateutil run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    names = synthetic_filenames(args.count, args.seed)
+    extractor = DateExtractor()
+
+    extracted, extractor_s = time_it("DateExtractor", extractor.extract_date, names)
+
+    legacy_names = names[:args.legacy_count or args.count]
+    legacy, legacy_s = time_it("re.search + strptime", strptime_loop, legacy_names)
+    agree = sum(a == b for a, b in zip(extracted, legacy))
+    print(f"Agreement with the strptime loop: {agree / len(legacy_names):.2%}")
+    print(
+        f"Speed-up: {legacy_s / len(legacy_names) / (extractor_s / len(names)):.1f}x"
+    )
+
+    try:
+        import dateutil.parser as dp
+    except ImportError:
+        print("python-dateutil is not installed, skipping the fuzzy parse run")
+        return
+
+    def fuzzy(filename):
+        try:
+            return dp.parse(filename, fuzzy=True, dayfirst=True)
+        except (ValueError, OverflowError):
+            return None
+
+    time_it("dateutil fuzzy", fuzzy, names[:args.dateutil_count])
+
+if __name__ == "__main__":
+    main()
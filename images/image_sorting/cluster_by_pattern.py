@@ -1,37 +1,158 @@
+import argparse
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import DBSCAN
-from collections import defaultdict
+from collections import Counter, defaultdict
 from shutil import move
-import numpy as np
-
-# ask user for folder path
-folder_path = input("Enter the folder path containing webp files: ").strip()
-if not os.path.isdir(folder_path):
-    raise ValueError("The provided path is not a valid directory.")
-
-# List all files
-files = [f for f in os.listdir(folder_path)]
-
-# Vectorize filenames using TF-IDF over character n-grams
-vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4))
-X = vectorizer.fit_transform(files)
-
-# Perform DBSCAN clustering
-clustering_model = DBSCAN(eps=0.6, min_samples=2, metric="cosine")
-clustering_model.fit(X.toarray())
-
-# Group files by cluster labels
-grouped_files = defaultdict(list)
-for file, label in zip(files, clustering_model.labels_):
-    cluster_name = f"cluster_{label}" if label != -1 else "unclustered"
-    grouped_files[cluster_name].append(file)
-
-# Create folders and move files
-for cluster, file_list in grouped_files.items():
-    folder_name = os.path.join(folder_path, cluster)
-    os.makedirs(folder_name, exist_ok=True)
-    for file in file_list:
-        move(os.path.join(folder_path, file), os.path.join(folder_name, file))
-
-print("Files have been clustered and organized into folders.")
+from filename_clustering import MODEL_FILE, ClusterModel, ResourceReport
+
+UNCLUSTERED = "unclustered"
+# Suggest a refit once this many names were assigned per name in the fit
+REFIT_RATIO = 0.5
+
+def is_cluster_folder(name):
+    return name == UNCLUSTERED or (name.startswith("cluster_") and name[len("cluster_"):].isdigit())
+
+def loose_files(folder_path):
+    """Files directly in folder_path, i.e. not clustered yet"""
+    return [
+        f for f in os.listdir(folder_path)
+        if f != MODEL_FILE and os.path.isfile(os.path.join(folder_path, f))
+    ]
+
+def all_files(folder_path):
+    """(subfolder, name) of every file, loose ("" as subfolder) or already clustered"""
+    entries = [("", f) for f in loose_files(folder_path)]
+    for sub in os.listdir(folder_path):
+        sub_path = os.path.join(folder_path, sub)
+        if is_cluster_folder(sub) and os.path.isdir(sub_path):
+            entries += [(sub, f) for f in os.listdir(sub_path) if os.path.isfile(os.path.join(sub_path, f))]
+    return entries
+
+def stable_cluster_names(labels, current_folders, existing_folders):
+    """
+    Name the new clusters after the cluster folder most of their files are
+    already in, so a refit only moves the files whose cluster changed.
+    Clusters without such a folder get a fresh cluster_N.
+    """
+    votes = Counter(
+        (label, folder) for label, folder in zip(labels, current_folders)
+        if label != -1 and folder.startswith("cluster_")
+    )
+    names = {}
+    taken = set()
+    for (label, folder), _ in votes.most_common():
+        if label not in names and folder not in taken:
+            names[label] = folder
+            taken.add(folder)
+    used_numbers = [int(f[len("cluster_"):]) for f in set(existing_folders) | taken if f.startswith("cluster_")]
+    next_number = max(used_numbers, default=-1) + 1
+    for label in sorted(set(labels) - {-1}):
+        if label not in names:
+            names[label] = f"cluster_{next_number}"
+            next_number += 1
+    return [names[label] for label in range(len(names))]
+
+def move_files(folder_path, moves):
+    """Move (subfolder, name, target folder) entries, returns the number moved"""
+    moved = 0
+    for sub, file, target in moves:
+        if sub == target:
+            continue
+        target_dir = os.path.join(folder_path, target)
+        os.makedirs(target_dir, exist_ok=True)
+        destination = os.path.join(target_dir, file)
+        if os.path.exists(destination):
+            print(f"Not moving {os.path.join(sub, file)}, {destination} exists")
+            continue
+        move(os.path.join(folder_path, sub, file), destination)
+        moved += 1
+    # Drop cluster folders a refit emptied
+    for sub in os.listdir(folder_path):
+        sub_path = os.path.join(folder_path, sub)
+        if is_cluster_folder(sub) and os.path.isdir(sub_path) and not os.listdir(sub_path):
+            os.rmdir(sub_path)
+    return moved
+
+def refit(folder_path, eps, min_samples):
+    """Cluster every file again, loose or clustered, and save the model"""
+    entries = all_files(folder_path)
+    if not entries:
+        print("Nothing to cluster.")
+        return
+    files = [file for _, file in entries]
+    current_folders = [sub for sub, _ in entries]
+
+    # TF-IDF over character n-grams (2-4) and DBSCAN with cosine distance, kept
+    # sparse throughout with approximate neighbourhoods (see filename_clustering)
+    report = ResourceReport()
+    model, labels = ClusterModel.fit(files, eps=eps, min_samples=min_samples, report=report)
+    existing = [sub for sub in os.listdir(folder_path) if is_cluster_folder(sub)]
+    model.cluster_names = stable_cluster_names(labels, current_folders, existing)
+    print(report.summary())
+
+    targets = [model.cluster_names[label] if label != -1 else UNCLUSTERED for label in labels]
+    moved = move_files(folder_path, [(sub, file, target) for (sub, file), target in zip(entries, targets)])
+    model.save(os.path.join(folder_path, MODEL_FILE))
+    print(f"Files have been clustered into {len(model.cluster_names)} folders, {moved} of {len(entries)} files moved.")
+
+def assign(folder_path):
+    """Put the loose files into the clusters of the saved model"""
+    model_path = os.path.join(folder_path, MODEL_FILE)
+    if not os.path.exists(model_path):
+        print(f"No saved clustering in {folder_path}, run the refit command first.")
+        return
+    model = ClusterModel.load(model_path)
+    files = loose_files(folder_path)
+    if not files:
+        print("No new files.")
+        return
+
+    labels = model.assign(files)
+    grouped_files = defaultdict(list)
+    for file, label in zip(files, labels):
+        grouped_files[model.cluster_names[label] if label != -1 else UNCLUSTERED].append(file)
+    move_files(folder_path, [("", file, cluster) for cluster, file_list in grouped_files.items() for file in file_list])
+    model.save(model_path)
+
+    unclustered = len(grouped_files.get(UNCLUSTERED, []))
+    print(f"{len(files) - unclustered} files added to existing clusters, {unclustered} unclustered.")
+    if model.n_assigned > REFIT_RATIO * model.n_fitted:
+        print(
+            f"{model.n_assigned} files were assigned since the last refit of {model.n_fitted}, "
+            "consider running the refit command."
+        )
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Sort files into cluster folders by the similarity of their names. "
+        "Without arguments it asks for a folder, then assigns the new files if the folder "
+        "has a saved clustering and clusters everything otherwise."
+    )
+    subcommands = parser.add_subparsers(dest="command")
+    refit_parser = subcommands.add_parser("refit", help="cluster all files again (loose and clustered)")
+    refit_parser.add_argument("folder")
+    refit_parser.add_argument("--eps", type=float, default=0.6, help="DBSCAN eps, cosine distance (default 0.6)")
+    refit_parser.add_argument("--min-samples", type=int, default=2, help="DBSCAN min_samples (default 2)")
+    assign_parser = subcommands.add_parser("assign", help="assign loose files to the saved clusters")
+    assign_parser.add_argument("folder")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.command is None:
+        # ask user for folder path
+        folder_path = input("Enter the folder path containing webp files: ").strip()
+        if not os.path.isdir(folder_path):
+            raise ValueError("The provided path is not a valid directory.")
+        if os.path.exists(os.path.join(folder_path, MODEL_FILE)):
+            assign(folder_path)
+        else:
+            refit(folder_path, eps=0.6, min_samples=2)
+    elif not os.path.isdir(args.folder):
+        raise ValueError("The provided path is not a valid directory.")
+    elif args.command == "refit":
+        refit(args.folder, args.eps, args.min_samples)
+    else:
+        assign(args.folder)
+
+if __name__ == "__main__":
+    main()
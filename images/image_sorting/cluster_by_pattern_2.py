@@ -1,22 +1,19 @@
+import argparse
 import os
 import re
 from collections import defaultdict
 from shutil import move
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import DBSCAN
 from sklearn.neighbors import NearestNeighbors
 import umap.umap_ as umap
-import matplotlib.pyplot as plt
-import seaborn as sns
+from filename_clustering import ResourceReport, elbow_eps, make_vectorizer
 
-folder_path = input("Enter the folder path containing webp files: ").strip()
-if not os.path.isdir(folder_path):
-    raise ValueError("The provided path is not a valid directory.")
-
-# List all files (webp only)
-files = [f for f in os.listdir(folder_path) if f.lower().endswith(".webp")]
+# Neighbour whose distance makes up the k-distance graph
+K_NEIGHBOR = 3
+# Used when the k-distances have no elbow (e.g. a handful of files)
+DEFAULT_EPS = 0.5
 
 
 # Preprocess filenames
@@ -27,70 +24,156 @@ def clean_name(name):
     return name
 
 
-cleaned_files = [clean_name(f) for f in files]
-
-# Vectorize filenames using TF-IDF on char n-grams (2-5)
-vectorizer = TfidfVectorizer(analyzer="char", ngram_range=(2, 5))
-X = vectorizer.fit_transform(cleaned_files)
-
-# UMAP dimensionality reduction to 10D
-reducer = umap.UMAP(n_neighbors=5, min_dist=0.3, metric="cosine", random_state=42)
-X_reduced = reducer.fit_transform(X.toarray())
-
-# Plot k-distance graph to find optimal eps
-neighbors = NearestNeighbors(n_neighbors=3, metric="euclidean")
-neighbors_fit = neighbors.fit(X_reduced)
-distances, indices = neighbors_fit.kneighbors(X_reduced)
-distances = np.sort(distances[:, 2])
-
-plt.figure(figsize=(8, 4))
-plt.plot(distances)
-plt.title("k-distance Graph (3-NN distances)")
-plt.xlabel("Points sorted by distance")
-plt.ylabel("3rd Nearest Neighbor Distance")
-plt.grid(True)
-plt.show()
-
-# Based on the elbow point in the graph, set eps:
-optimal_eps = float(
-    input("Enter optimal eps value after viewing the graph (e.g. 0.5): ")
-)
-
-# Perform DBSCAN clustering
-clustering_model = DBSCAN(eps=optimal_eps, min_samples=2, metric="euclidean")
-clustering_model.fit(X_reduced)
-
-# Group files by cluster labels
-grouped_files = defaultdict(list)
-for file, label in zip(files, clustering_model.labels_):
-    cluster_name = f"cluster_{label}" if label != -1 else "unclustered"
-    grouped_files[cluster_name].append(file)
-
-# Create folders and move files
-for cluster, file_list in grouped_files.items():
-    folder_name = os.path.join(folder_path, cluster)
-    os.makedirs(folder_name, exist_ok=True)
-    for file in file_list:
-        move(os.path.join(folder_path, file), os.path.join(folder_name, file))
-
-print("✅ Files have been clustered and organized into folders.")
-
-# Optional: Visualize clusters in 2D using UMAP
-reducer_2d = umap.UMAP(
-    n_neighbors=5, min_dist=0.3, metric="cosine", random_state=42, n_components=2
-)
-X_2d = reducer_2d.fit_transform(X.toarray())
-
-plt.figure(figsize=(8, 6))
-palette = sns.color_palette("hls", len(set(clustering_model.labels_)))
-sns.scatterplot(
-    x=X_2d[:, 0],
-    y=X_2d[:, 1],
-    hue=clustering_model.labels_,
-    palette=palette,
-    legend="full",
-)
-plt.title("Filename Clusters (2D UMAP Visualization)")
-plt.legend(title="Cluster")
-plt.grid(True)
-plt.show()
+def k_distances(X_reduced):
+    """Sorted distance of every point to its K_NEIGHBOR-th nearest neighbour"""
+    neighbors = NearestNeighbors(n_neighbors=min(K_NEIGHBOR, len(X_reduced)), metric="euclidean")
+    neighbors_fit = neighbors.fit(X_reduced)
+    distances, indices = neighbors_fit.kneighbors(X_reduced)
+    return np.sort(distances[:, -1])
+
+
+def plot_k_distances(distances, suggested_eps):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(8, 4))
+    plt.plot(distances)
+    plt.axhline(suggested_eps, color="red", linestyle="--", label=f"elbow eps = {suggested_eps:.3f}")
+    plt.legend()
+    plt.title(f"k-distance Graph ({K_NEIGHBOR}-NN distances)")
+    plt.xlabel("Points sorted by distance")
+    plt.ylabel(f"{K_NEIGHBOR}-NN distance")
+    plt.grid(True)
+    plt.show()
+
+
+def ask_eps(suggested_eps):
+    answer = input(f"Enter optimal eps value after viewing the graph (Enter for {suggested_eps:.3f}): ").strip()
+    return float(answer) if answer else suggested_eps
+
+
+def plot_clusters(X_2d, labels):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(8, 6))
+    palette = sns.color_palette("hls", len(set(labels)))
+    sns.scatterplot(
+        x=X_2d[:, 0],
+        y=X_2d[:, 1],
+        hue=labels,
+        palette=palette,
+        legend="full",
+    )
+    plt.title("Filename Clusters (2D UMAP Visualization)")
+    plt.legend(title="Cluster")
+    plt.grid(True)
+    plt.show()
+
+
+def move_into_clusters(folder_path, files, labels):
+    # Group files by cluster labels
+    grouped_files = defaultdict(list)
+    for file, label in zip(files, labels):
+        cluster_name = f"cluster_{label}" if label != -1 else "unclustered"
+        grouped_files[cluster_name].append(file)
+
+    # Create folders and move files
+    for cluster, file_list in grouped_files.items():
+        folder_name = os.path.join(folder_path, cluster)
+        os.makedirs(folder_name, exist_ok=True)
+        for file in file_list:
+            move(os.path.join(folder_path, file), os.path.join(folder_name, file))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Cluster webp files into folders by the similarity of their names. "
+        "Without a folder it asks interactively."
+    )
+    parser.add_argument("folder", nargs="?", help="folder containing the webp files")
+    parser.add_argument(
+        "--eps",
+        type=float,
+        default=None,
+        help="DBSCAN eps on the UMAP embedding (default: the elbow of the k-distance graph)",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="no plots and no prompts: take the elbow eps (or --eps) and skip the 2D "
+        "visualization, for batch jobs",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    folder_path = args.folder
+    if folder_path is None:
+        folder_path = input("Enter the folder path containing webp files: ").strip()
+    if not os.path.isdir(folder_path):
+        raise ValueError("The provided path is not a valid directory.")
+
+    # List all files (webp only)
+    files = [f for f in os.listdir(folder_path) if f.lower().endswith(".webp")]
+    if len(files) < 2:
+        print("Nothing to cluster.")
+        return
+    cleaned_files = [clean_name(f) for f in files]
+
+    report = ResourceReport()
+
+    # Vectorize filenames using TF-IDF on char n-grams (2-5)
+    vectorizer = make_vectorizer(analyzer="char", ngram_range=(2, 5))
+    with report.stage("TF-IDF"):
+        X = vectorizer.fit_transform(cleaned_files)
+
+    # UMAP dimensionality reduction (2D, the default n_components). UMAP takes
+    # the sparse matrix as is and finds its cosine neighbours with its
+    # approximate (NN-descent) index.
+    reducer = umap.UMAP(n_neighbors=5, min_dist=0.3, metric="cosine", random_state=42)
+    with report.stage("UMAP"):
+        X_reduced = reducer.fit_transform(X)
+
+    # k-distance graph, its elbow is the suggested eps
+    with report.stage("k-distances"):
+        distances = k_distances(X_reduced)
+        suggested_eps = elbow_eps(distances)
+    if suggested_eps is None:
+        suggested_eps = DEFAULT_EPS
+    print(f"Elbow of the k-distance graph: eps = {suggested_eps:.3f}")
+
+    if args.eps is not None:
+        optimal_eps = args.eps
+    elif args.headless:
+        optimal_eps = suggested_eps
+    else:
+        plot_k_distances(distances, suggested_eps)
+        optimal_eps = ask_eps(suggested_eps)
+
+    # Perform DBSCAN clustering
+    clustering_model = DBSCAN(eps=optimal_eps, min_samples=2, metric="euclidean")
+    with report.stage("DBSCAN"):
+        clustering_model.fit(X_reduced)
+    print(report.summary())
+
+    move_into_clusters(folder_path, files, clustering_model.labels_)
+    print("✅ Files have been clustered and organized into folders.")
+
+    if args.headless:
+        return
+
+    # Optional: Visualize clusters in 2D. The embedding above already is 2D
+    # (same parameters and seed), so it is only refitted for other sizes.
+    if X_reduced.shape[1] == 2:
+        X_2d = X_reduced
+    else:
+        reducer_2d = umap.UMAP(
+            n_neighbors=5, min_dist=0.3, metric="cosine", random_state=42, n_components=2
+        )
+        X_2d = reducer_2d.fit_transform(X)
+    plot_clusters(X_2d, clustering_model.labels_)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import re
+from collections import Counter
+from datetime import datetime
+
+# (regex, format) pairs in priority order, except that DateExtractor tries
+# the formats with a time of day before the date-only ones. The named groups
+# follow the strptime directives (Y, m, d, b, H, M, S) plus ms / s for Unix
+# timestamps, so a datetime can be built straight from the captured digits.
+DATE_FORMATS = [
+    (r"(?P<Y>20\d{2})-(?P<m>\d{2})-(?P<d>\d{2})", "%Y-%m-%d"),  # YYYY-MM-DD (2000+)
+    (r"(?P<Y>20\d{2})(?P<m>\d{2})(?P<d>\d{2})", "%Y%m%d"),  # YYYYMMDD (2000+)
+    (r"(?P<d>\d{2})-(?P<m>\d{2})-(?P<Y>20\d{2})", "%d-%m-%Y"),  # DD-MM-YYYY (2000+)
+    (r"(?P<d>\d{2})/(?P<m>\d{2})/(?P<Y>20\d{2})", "%d/%m/%Y"),  # DD/MM/YYYY (2000+)
+    (r"(?P<Y>20\d{2})/(?P<m>\d{2})/(?P<d>\d{2})", "%Y/%m/%d"),  # YYYY/MM/DD (2000+)
+    (r"(?P<d>\d{2})(?P<m>\d{2})(?P<Y>20\d{2})", "%d%m%Y"),  # DDMMYYYY (2000+)
+    (r"(?P<d>\d{1,2})-(?P<b>\w{3})-(?P<Y>20\d{2})", "%d-%b-%Y"),  # D-MMM-YYYY (2000+)
+    (r"(?P<b>\w{3})\s+(?P<d>\d{1,2}),\s+(?P<Y>20\d{2})", "%b %d, %Y"),  # Mon DD, YYYY (2000+)
+    (r"(?P<d>\d{1,2})\s+(?P<b>\w{3})\s+(?P<Y>20\d{2})", "%d %b %Y"),  # DD Mon YYYY (2000+)
+    (r"(?P<Y>20\d{2})_(?P<m>\d{2})_(?P<d>\d{2})", "%Y_%m_%d"),  # YYYY_MM_DD (2000+)
+    (r"(?P<d>\d{2})_(?P<m>\d{2})_(?P<Y>20\d{2})", "%d_%m_%Y"),  # DD_MM_YYYY (2000+)
+    (r"(?P<Y>\d{4})-(?P<m>\d{2})-(?P<d>\d{2})", "%Y-%m-%d"),  # YYYY-MM-DD
+    (r"(?P<m>\d{2})-(?P<d>\d{2})-(?P<Y>\d{4})", "%m-%d-%Y"),  # MM-DD-YYYY
+    (r"(?P<m>\d{2})_(?P<d>\d{2})_(?P<Y>\d{4})", "%m_%d_%Y"),  # MM_DD_YYYY
+    (r"(?P<Y>\d{4})_(?P<m>\d{2})_(?P<d>\d{2})", "%Y_%m_%d"),  # YYYY_MM_DD
+    (r"(?P<Y>\d{4})(?P<m>\d{2})(?P<d>\d{2})", "%Y%m%d"),  # YYYYMMDD
+    (r"(?P<m>\d{2})(?P<d>\d{2})(?P<Y>\d{4})", "%m%d%Y"),  # MMDDYYYY
+    (r"(?P<Y>\d{4})(?P<m>\d{2})(?P<d>\d{2})_(?P<H>\d{2})(?P<M>\d{2})(?P<S>\d{2})", "%Y%m%d_%H%M%S"),  # YYYYMMDD_HHMMSS
+    (r"(?P<Y>\d{4})(?P<m>\d{2})(?P<d>\d{2})(?P<H>\d{2})(?P<M>\d{2})(?P<S>\d{2})", "%Y%m%d%H%M%S"),  # YYYYMMDDHHMMSS
+    (r"(?P<ms>\d{13})", "timestamp_ms"),  # Unix timestamp (ms)
+    (r"(?P<s>\d{10})", "timestamp_s"),  # Unix timestamp (s)
+    (r"(?P<Y>\d{4})-(?P<m>\d{2})-(?P<d>\d{2})-(?P<H>\d{2})-(?P<M>\d{2})-(?P<S>\d{2})", "%Y-%m-%d-%H-%M-%S"),  # YYYY-MM-DD-HH-MM-SS
+    (r"(?P<Y>\d{4})(?P<m>\d{2})(?P<d>\d{2})-(?P<H>\d{2})(?P<M>\d{2})(?P<S>\d{2})", "%Y%m%d-%H%M%S"),  # YYYYMMDD-HHMMSS
+]
+
+MONTH_ABBREVIATIONS = {
+    name: number
+    for number, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1
+    )
+}
+CALENDAR, MONTH_NAME, TIMESTAMP_MS, TIMESTAMP_S = range(4)
+GROUP_NAME = re.compile(r"\(\?P<(\w+)>")
+# Dates only start where a run of digits or letters starts. Trying every
+# pattern at every character is what makes a big alternation slow, and a
+# date glued to the end of other digits is not one we want to pick anyway.
+# Patterns that start with a digit are only tried where a digit run starts,
+# the rest (month names) only where a letter run starts.
+DIGIT_RUN_START = r"(?<![0-9])(?=[0-9])"
+LETTER_RUN_START = r"(?<![A-Za-z])(?=[A-Za-z])"
+# Every pattern also gets a copy that must end where a run of digits ends.
+# Those copies rank above the plain ones, so 1712051234567 is read as the
+# whole millisecond timestamp and not as a YYYYMMDD taken from its start.
+DIGIT_RUN_END = r"(?![0-9])"
+DIGIT_START = re.compile(r"(?:\(\?P<\w+>)?(?:\\d|[0-9])")
+
+def has_time(regex):
+    """True if the pattern captures a time of day"""
+    return "(?P<H>" in regex
+
+def date_spec(groups, regex):
+    """
+    Return (kind, group numbers) telling build_date how to turn a match of
+    regex into a datetime; groups maps the named groups to their numbers.
+    """
+    if "ms" in groups:
+        return TIMESTAMP_MS, (groups["ms"],)
+    if "s" in groups:
+        return TIMESTAMP_S, (groups["s"],)
+    kind = MONTH_NAME if "b" in groups else CALENDAR
+    names = ["Y", "b" if kind == MONTH_NAME else "m", "d"]
+    names += [name for name in ("H", "M", "S") if name in groups]
+    missing = [name for name in names if name not in groups]
+    if missing:
+        raise ValueError(f"Date pattern {regex!r} has no group(s) {', '.join(missing)}")
+    return kind, tuple(groups[name] for name in names)
+
+class DateExtractor:
+    """
+    Finds the date in a filename with one compiled regex.
+
+    All patterns are joined into a single alternation inside a lookahead, so
+    one finditer pass reports, for every position where a run of digits or
+    letters starts, the highest priority pattern that matches there,
+    including overlapping matches. Patterns with a time of day rank above the
+    date-only ones, so 20231225_143022 is read as YYYYMMDD_HHMMSS and not as
+    a YYYYMMDD that drops the time. Within each of those, a match that ends
+    where its digit run ends ranks above one that stops inside it, so a Unix
+    timestamp is not cut down to the YYYYMMDD at its start. Otherwise
+    patterns rank in their ``formats`` order. Candidates are tried by rank (ties go to the leftmost
+    match); if one is not a valid date, the lower ranked patterns are tried
+    at the same position before moving on. Reported format indices are
+    always positions in ``formats``. The datetime is built from the named
+    groups with int(), so there are no strptime or dateutil calls on the hot
+    path.
+
+    min_year drops dates before that year. swap_day_month retries an invalid
+    day/month pair the other way round (12-25-2023 read as DD-MM-YYYY).
+    """
+
+    def __init__(self, formats=DATE_FORMATS, min_year=None, swap_day_month=False):
+        self.formats = list(formats)
+        self.min_year = min_year
+        self.swap_day_month = swap_day_month
+        # (format index, whole digit run) by rank: time-bearing formats
+        # first, a date-only pattern would otherwise match their leading
+        # date and win, then matches that end at the end of a digit run
+        self.ranked = sorted(
+            ((index, whole) for index in range(len(self.formats)) for whole in (True, False)),
+            key=lambda item: (not has_time(self.formats[item[0]][0]), not item[1], item[0]),
+        )
+
+        digit_alternatives = []
+        other_alternatives = []
+        for index, whole in self.ranked:
+            regex = self.formats[index][0]
+            key = f"f{index}{'w' if whole else 'p'}"
+            renamed = GROUP_NAME.sub(lambda m, k=key: f"(?P<{k}_{m.group(1)}>", regex)
+            alternative = f"(?P<{key}>{renamed}{DIGIT_RUN_END if whole else ''})"
+            if DIGIT_START.match(regex):
+                digit_alternatives.append(alternative)
+            else:
+                other_alternatives.append(alternative)
+        branches = []
+        if digit_alternatives:
+            branches.append(DIGIT_RUN_START + "(?=" + "|".join(digit_alternatives) + ")")
+        if other_alternatives:
+            branches.append(LETTER_RUN_START + "(?=" + "|".join(other_alternatives) + ")")
+        self.pattern = re.compile("|".join(branches))
+
+        # Wrapper group number -> (rank, format index, how to build the date)
+        groupindex = self.pattern.groupindex
+        self.fields = {}
+        for rank, (index, whole) in enumerate(self.ranked):
+            key = f"f{index}{'w' if whole else 'p'}"
+            groups = {
+                name[len(key) + 1:]: number
+                for name, number in groupindex.items()
+                if name.startswith(key + "_")
+            }
+            self.fields[groupindex[key]] = (rank, index, date_spec(groups, self.formats[index][0]))
+        # The lookahead only reports the first pattern matching at a position,
+        # so when that one is not a valid date the later ones are tried there
+        # one by one in rank order. That's the slow path, the combined regex is
+        # the fast one.
+        self.single_patterns = []
+        for index, whole in self.ranked:
+            regex = self.formats[index][0]
+            single = re.compile(regex + (DIGIT_RUN_END if whole else ""))
+            self.single_patterns.append((index, single, date_spec(single.groupindex, regex)))
+
+    def build_date(self, match, spec):
+        kind, groups = spec
+        try:
+            if kind == TIMESTAMP_MS:
+                date = datetime.fromtimestamp(int(match.group(groups[0])) / 1000.0)
+            elif kind == TIMESTAMP_S:
+                date = datetime.fromtimestamp(int(match.group(groups[0])))
+            else:
+                year, month, day, *clock = match.group(*groups)
+                if kind == MONTH_NAME:
+                    month = MONTH_ABBREVIATIONS.get(month[:3].lower())
+                    if month is None:
+                        return None
+                year, month, day = int(year), int(month), int(day)
+                clock = [int(value) for value in clock]
+                try:
+                    date = datetime(year, month, day, *clock)
+                except ValueError:
+                    if not self.swap_day_month or kind == MONTH_NAME:
+                        return None
+                    date = datetime(year, day, month, *clock)
+        except (ValueError, OverflowError, OSError):
+            return None
+        if self.min_year and date.year < self.min_year:
+            return None
+        return date
+
+    def extract(self, text):
+        """
+        Return (datetime, format index) for the best valid date in text, or
+        (None, None).
+        """
+        fields = self.fields
+        found = [
+            (*fields[match.lastindex], match.start(), match)
+            for match in self.pattern.finditer(text)
+        ]
+        if not found:
+            return None, None
+        if len(found) > 1:
+            found.sort(key=lambda item: (item[0], item[3]))
+        for rank, index, spec, position, match in found:
+            date = self.build_date(match, spec)
+            if date is not None:
+                return date, index
+            # Lower ranked patterns hidden behind this one at the same spot
+            for later, single, single_spec in self.single_patterns[rank + 1:]:
+                later_match = single.match(text, position)
+                if later_match:
+                    date = self.build_date(later_match, single_spec)
+                    if date is not None:
+                        return date, later
+        return None, None
+
+    def extract_date(self, text):
+        """Return just the datetime (or None) for text"""
+        return self.extract(text)[0]
+
+# Files looked at per directory when detecting its date format
+SAMPLE_SIZE = 300
+DIRECTIVE = re.compile(r"%([a-zA-Z])")
+
+def swap_day_month(entry):
+    """Return the (regex, format) pair with the day and month swapped"""
+    regex, format_str = entry
+    regex = regex.replace("(?P<d>", "(?P<_>").replace("(?P<m>", "(?P<d>").replace("(?P<_>", "(?P<m>")
+    format_str = format_str.replace("%d", "%_").replace("%m", "%d").replace("%_", "%m")
+    return regex, format_str
+
+def is_day_month_ambiguous(format_str):
+    """
+    True for numeric formats that end with the year (DD-MM-YYYY, MMDDYYYY, ...).
+    Those read just as well the other way round; year-first formats are
+    always year, month, day in practice.
+    """
+    return DIRECTIVE.findall(format_str)[:3] in (["d", "m", "Y"], ["m", "d", "Y"])
+
+def sample(filenames, sample_size=SAMPLE_SIZE):
+    """Evenly spread sample of at most sample_size names"""
+    if len(filenames) <= sample_size:
+        return list(filenames)
+    step = len(filenames) / sample_size
+    return [filenames[int(i * step)] for i in range(sample_size)]
+
+def detect_format(filenames, extractor, sample_size=SAMPLE_SIZE):
+    """
+    Infer the date format of one directory from a sample of its file names.
+
+    Every sampled name goes through the extractor and the winning formats are
+    counted; the most common one is the directory's format. For DD/MM vs
+    MM/DD formats the sample is checked again with that format's own regex:
+    a day above 12 proves the order it names, a month above 12 proves the
+    swapped order. With no proof, or proof both ways, the result is flagged
+    ambiguous.
+
+    Returns a dict with "format" ((regex, format) pair or None), "sampled",
+    "matched" (names dated with that format), "ambiguous" and "reason".
+    """
+    names = sample(filenames, sample_size)
+    counts = Counter()
+    for name in names:
+        _, index = extractor.extract(name)
+        if index is not None:
+            counts[index] += 1
+    result = {"format": None, "sampled": len(names), "matched": 0, "ambiguous": False, "reason": ""}
+    if not counts:
+        result["reason"] = "no dates in the sampled file names"
+        return result
+
+    index, matched = counts.most_common(1)[0]
+    entry = extractor.formats[index]
+    result.update(format=entry, matched=matched)
+    if not is_day_month_ambiguous(entry[1]):
+        return result
+
+    pattern = re.compile(entry[0])
+    as_named = swapped = False
+    # Names the extractor gave to the mirror format count for this one too
+    matched = 0
+    for name in names:
+        match = pattern.search(name)
+        if match:
+            matched += 1
+            as_named |= int(match.group("d")) > 12
+            swapped |= int(match.group("m")) > 12
+    result["matched"] = matched
+
+    if as_named and swapped:
+        result.update(ambiguous=True, reason="file names use both day/month orders")
+    elif swapped:
+        mirror = swap_day_month(entry)
+        # Prefer the listed pattern so the reported format stays familiar
+        for listed in extractor.formats:
+            if listed[1] == mirror[1] and is_day_month_ambiguous(listed[1]):
+                mirror = listed
+                break
+        result.update(format=mirror, reason="day and month swapped, a month field is above 12")
+    elif not as_named:
+        result.update(ambiguous=True, reason="no day above 12 to tell DD/MM from MM/DD")
+    return result
@@ -0,0 +1,55 @@
+import os
+from datetime import datetime
+
+from embedded_dates import read_embedded_date
+
+EMBEDDED, FILENAME, MTIME = "embedded", "filename", "mtime"
+SOURCES = (EMBEDDED, FILENAME, MTIME)
+# mtime is opt-in: it is usually the very date that is wrong
+DEFAULT_ORDER = (EMBEDDED, FILENAME)
+
+def parse_order(text):
+    """Turn "embedded,filename,mtime" into a tuple of sources"""
+    order = tuple(part.strip().lower() for part in text.split(",") if part.strip())
+    unknown = [source for source in order if source not in SOURCES]
+    if unknown or not order:
+        raise ValueError(f"Unknown date source(s) {', '.join(unknown)}, choose from {', '.join(SOURCES)}")
+    return order
+
+class DateResolver:
+    """
+    Finds the date of a file by trying the sources in order:
+
+    - embedded: capture date in the file's own headers (see embedded_dates)
+    - filename: the date in the file name, using the given DateExtractor
+    - mtime: the file's modification time
+
+    The first source that gives a date wins. resolve() is thread safe.
+    """
+
+    def __init__(self, order=DEFAULT_ORDER):
+        self.order = tuple(order)
+
+    def resolve(self, filepath, extractor=None, stat=None):
+        """
+        Return (date, source name), or (None, None) if no source has a date.
+        The filename source is skipped when extractor is None, stat saves a
+        stat call for the mtime source.
+        """
+        for source in self.order:
+            if source == EMBEDDED:
+                date = read_embedded_date(filepath)
+            elif source == FILENAME:
+                if extractor is None:
+                    continue
+                date = extractor.extract_date(os.path.basename(filepath))
+            else:
+                stat = stat or os.stat(filepath)
+                date = datetime.fromtimestamp(stat.st_mtime)
+            if date is not None:
+                return date, source
+        return None, None
+
+    def needs_filename_format(self):
+        """True if filename is the only source, so files without a format can't get a date"""
+        return set(self.order) == {FILENAME}
@@ -0,0 +1,240 @@
+import os
+import struct
+from datetime import datetime
+
+from exif_dates import EXIF_HEADER, find_exif_segment, read_tiff_date
+
+# Most bytes read from one place in a file: enough for an EXIF block, a HEIF
+# meta box or the start of a moov box. Pixel and sample data is never read.
+HEADER_BYTES = 64 * 1024
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# ftyp brands of HEIF/AVIF stills, which keep EXIF in a meta box item
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1", b"avif"}
+# Top level boxes an old QuickTime file may start with instead of ftyp
+QUICKTIME_BOXES = {b"moov", b"mdat", b"wide", b"free", b"skip"}
+# Seconds between 1904-01-01 (ISO BMFF / QuickTime epoch) and 1970-01-01
+MP4_EPOCH_OFFSET = 2082844800
+# VP8X flag telling a WebP file has an EXIF chunk
+WEBP_EXIF_FLAG = 0x08
+
+def iter_boxes(data, start=0, end=None):
+    """Yield (type, content start, box end) for the ISO BMFF boxes in data[start:end]"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", data[offset + 8:offset + 16])
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type, offset + header, offset + size
+        offset += size
+
+def iter_file_boxes(f):
+    """Like iter_boxes for the top level of a file, reading only the box headers"""
+    file_size = os.fstat(f.fileno()).st_size
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(16)
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", header[8:16])
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size:
+            return
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+def read_box(f, start, end):
+    f.seek(start)
+    return f.read(min(end - start, HEADER_BYTES))
+
+def jpeg_date(f):
+    segment = find_exif_segment(f)
+    return read_tiff_date(segment[1]) if segment else None
+
+def tiff_date(f):
+    # Raw formats (DNG, CR2, NEF, ...) are TIFF files, the IFDs come first
+    return read_tiff_date(f.read(HEADER_BYTES))
+
+def png_date(f):
+    """eXIf chunk, or a "Creation Time" text chunk, before the image data"""
+    f.seek(len(PNG_SIGNATURE))
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type in (b"IDAT", b"IEND"):
+            return None
+        if chunk_type == b"eXIf":
+            data = f.read(min(length, HEADER_BYTES))
+            return read_tiff_date(data.removeprefix(EXIF_HEADER))
+        if chunk_type == b"tEXt" and length < 1024:
+            keyword, _, text = f.read(length).partition(b"\x00")
+            if keyword == b"Creation Time":
+                return parse_text_date(text.decode("latin-1"))
+            f.seek(4, os.SEEK_CUR)
+            continue
+        f.seek(length + 4, os.SEEK_CUR)  # data and CRC
+
+def parse_text_date(text):
+    text = text.strip()
+    for parse in (
+        lambda s: datetime.strptime(s[:19], "%Y:%m:%d %H:%M:%S"),
+        lambda s: datetime.fromisoformat(s).replace(tzinfo=None),
+        lambda s: datetime.strptime(s, "%a, %d %b %Y %H:%M:%S %z").astimezone().replace(tzinfo=None),
+    ):
+        try:
+            return parse(text)
+        except ValueError:
+            continue
+    return None
+
+def webp_date(f):
+    """EXIF chunk of an extended (VP8X) WebP, found by skipping chunk headers"""
+    f.seek(12)
+    first = f.read(9)
+    if first[:4] != b"VP8X" or not first[8] & WEBP_EXIF_FLAG:
+        return None
+    offset = 12
+    while True:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk_type, length = struct.unpack("<4sI", header)
+        if chunk_type == b"EXIF":
+            data = f.read(min(length, HEADER_BYTES))
+            return read_tiff_date(data.removeprefix(EXIF_HEADER))
+        offset += 8 + length + (length & 1)
+
+def mp4_date(f):
+    """Creation time of the movie header (mvhd), stored as UTC"""
+    for box_type, start, end in iter_file_boxes(f):
+        if box_type != b"moov":
+            continue
+        moov = read_box(f, start, end)
+        for child_type, child_start, _ in iter_boxes(moov):
+            if child_type != b"mvhd":
+                continue
+            if moov[child_start] == 1:
+                (seconds,) = struct.unpack(">Q", moov[child_start + 4:child_start + 12])
+            else:
+                (seconds,) = struct.unpack(">I", moov[child_start + 4:child_start + 8])
+            if seconds <= MP4_EPOCH_OFFSET:
+                return None  # unset (0) or before 1970
+            return datetime.fromtimestamp(seconds - MP4_EPOCH_OFFSET)
+        return None
+    return None
+
+def read_uint(data, offset, size):
+    if size == 0:
+        return 0, offset
+    return int.from_bytes(data[offset:offset + size], "big"), offset + size
+
+def heif_exif_location(meta):
+    """(file offset, length) of the Exif item listed in a HEIF meta box, or None"""
+    exif_ids = set()
+    locations = {}
+    # meta is a full box: version and flags come before the children
+    for box_type, start, end in iter_boxes(meta, 4):
+        if box_type == b"iinf":
+            version = meta[start]
+            offset = start + 4 + (2 if version == 0 else 4)
+            for info_type, info_start, _ in iter_boxes(meta, offset, end):
+                info_version = meta[info_start]
+                if info_type != b"infe" or info_version < 2:
+                    continue
+                id_size = 2 if info_version == 2 else 4
+                item_id, offset = read_uint(meta, info_start + 4, id_size)
+                if meta[offset + 2:offset + 6] == b"Exif":
+                    exif_ids.add(item_id)
+        elif box_type == b"iloc":
+            version = meta[start]
+            offset_size, length_size = meta[start + 4] >> 4, meta[start + 4] & 0x0F
+            base_offset_size = meta[start + 5] >> 4
+            index_size = meta[start + 5] & 0x0F if version in (1, 2) else 0
+            count, offset = read_uint(meta, start + 6, 2 if version < 2 else 4)
+            for _ in range(count):
+                item_id, offset = read_uint(meta, offset, 2 if version < 2 else 4)
+                construction_method = 0
+                if version in (1, 2):
+                    construction_method, offset = read_uint(meta, offset, 2)
+                    construction_method &= 0x0F
+                offset += 2  # data_reference_index
+                base_offset, offset = read_uint(meta, offset, base_offset_size)
+                extent_count, offset = read_uint(meta, offset, 2)
+                extents = []
+                for _ in range(extent_count):
+                    offset += index_size
+                    extent_offset, offset = read_uint(meta, offset, offset_size)
+                    extent_length, offset = read_uint(meta, offset, length_size)
+                    extents.append((base_offset + extent_offset, extent_length))
+                # Only items stored in the file itself (not in idat) are read
+                if construction_method == 0 and extents:
+                    locations[item_id] = extents[0]
+    for item_id in exif_ids:
+        if item_id in locations:
+            return locations[item_id]
+    return None
+
+def heif_date(f):
+    """EXIF item of a HEIF/AVIF still: located through the meta box, then read"""
+    for box_type, start, end in iter_file_boxes(f):
+        if box_type != b"meta":
+            continue
+        location = heif_exif_location(read_box(f, start, end))
+        if location is None:
+            return None
+        offset, length = location
+        f.seek(offset)
+        data = f.read(min(length, HEADER_BYTES))
+        # The item starts with the offset of the TIFF header after these 4 bytes
+        (tiff_offset,) = struct.unpack(">I", data[:4])
+        return read_tiff_date(data[4 + tiff_offset:])
+    return None
+
+def reader_for(head):
+    """The date reader for a file starting with head, or None"""
+    if head.startswith(b"\xff\xd8"):
+        return jpeg_date
+    if head.startswith(PNG_SIGNATURE):
+        return png_date
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return webp_date
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return tiff_date
+    if head[4:8] == b"ftyp":
+        return heif_date if head[8:12] in HEIF_BRANDS else mp4_date
+    if head[4:8] in QUICKTIME_BOXES:
+        return mp4_date
+    return None
+
+def read_embedded_date(filepath):
+    """
+    Capture date stored in the file itself, as a naive local datetime:
+    EXIF DateTimeOriginal for JPEG, HEIC/AVIF, PNG, WebP and TIFF based raw
+    files, the mvhd creation time for MP4/MOV. The container is recognised
+    from its first bytes, not the extension. Only headers are read (at most
+    HEADER_BYTES at a time), nothing is decoded. Returns None if the file has
+    no usable date or its headers are damaged.
+    """
+    with open(filepath, "rb") as f:
+        head = f.read(12)
+        reader = reader_for(head)
+        if reader is None:
+            return None
+        f.seek(0)
+        try:
+            return reader(f)
+        except (struct.error, ValueError, IndexError, OverflowError, OSError):
+            return None
@@ -0,0 +1,164 @@
+import struct
+from datetime import datetime
+import piexif
+
+JPEG_SOI = b"\xff\xd8"
+EXIF_HEADER = b"Exif\x00\x00"
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+# "YYYY:MM:DD HH:MM:SS" plus the terminating NUL
+EXIF_DATE_LENGTH = 20
+ASCII_TYPE = 2
+EXIF_IFD_POINTER = piexif.ImageIFD.ExifTag
+IFD0_DATE_TAGS = (piexif.ImageIFD.DateTime,)
+EXIF_DATE_TAGS = (piexif.ExifIFD.DateTimeOriginal, piexif.ExifIFD.DateTimeDigitized)
+
+def find_exif_segment(f):
+    """
+    Walk the JPEG marker segments up to the image data and return
+    (file offset of the TIFF header, TIFF bytes) for the EXIF APP1 segment,
+    or None if the file has none. Only the headers are read.
+    """
+    if f.read(2) != JPEG_SOI:
+        raise ValueError("not a JPEG file")
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        # Fill bytes before a marker
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+        if 0xD0 <= marker[1] <= 0xD7 or marker[1] == 0x01:
+            continue
+        if marker[1] in (0xDA, 0xD9):  # start of scan / end of image
+            return None
+        (length,) = struct.unpack(">H", f.read(2))
+        start = f.tell()
+        if marker[1] == 0xE1:
+            data = f.read(length - 2)
+            if data.startswith(EXIF_HEADER):
+                return start + len(EXIF_HEADER), data[len(EXIF_HEADER):]
+        f.seek(start + length - 2)
+
+def read_ifd(tiff, offset, endian):
+    """Return {tag: (type, count, value_or_offset)} for one IFD"""
+    (count,) = struct.unpack(endian + "H", tiff[offset:offset + 2])
+    entries = {}
+    for i in range(count):
+        entry = offset + 2 + i * 12
+        tag, type_, n, value = struct.unpack(endian + "HHII", tiff[entry:entry + 12])
+        entries[tag] = (type_, n, value)
+    return entries
+
+def date_field_offsets(tiff):
+    """
+    Return the offsets (inside the TIFF block) of the DateTime,
+    DateTimeOriginal and DateTimeDigitized values, or None if any of them is
+    missing or not a standard 20 byte ASCII field.
+    """
+    endian = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if endian is None:
+        return None
+    (ifd0,) = struct.unpack(endian + "I", tiff[4:8])
+    ifd0_entries = read_ifd(tiff, ifd0, endian)
+    if EXIF_IFD_POINTER not in ifd0_entries:
+        return None
+    exif_entries = read_ifd(tiff, ifd0_entries[EXIF_IFD_POINTER][2], endian)
+
+    offsets = []
+    for entries, tags in ((ifd0_entries, IFD0_DATE_TAGS), (exif_entries, EXIF_DATE_TAGS)):
+        for tag in tags:
+            type_, n, value = entries.get(tag, (None, None, None))
+            if type_ != ASCII_TYPE or n != EXIF_DATE_LENGTH:
+                return None
+            if value + EXIF_DATE_LENGTH > len(tiff):
+                return None
+            offsets.append(value)
+    return offsets
+
+def read_ascii(tiff, type_, count, value):
+    """Value of an ASCII IFD entry (values of 4 bytes or less are inline)"""
+    if type_ != ASCII_TYPE or count <= 4:
+        return None
+    return tiff[value:value + count].rstrip(b"\x00 ").decode("ascii", "replace")
+
+def parse_exif_date(date_str):
+    """
+    Parse "YYYY:MM:DD HH:MM:SS" (some writers use "-" in the date part or add
+    sub-seconds). Returns None for blank or zeroed dates.
+    """
+    if not date_str or len(date_str) < 19:
+        return None
+    try:
+        return datetime.strptime(date_str[:19].replace("-", ":"), EXIF_DATE_FORMAT)
+    except ValueError:
+        return None
+
+def read_tiff_date(tiff):
+    """
+    Capture date of a TIFF/EXIF block: DateTimeOriginal, then
+    DateTimeDigitized, then the IFD0 DateTime. None if none is usable.
+    """
+    endian = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if endian is None:
+        return None
+    (ifd0,) = struct.unpack(endian + "I", tiff[4:8])
+    ifd0_entries = read_ifd(tiff, ifd0, endian)
+    candidates = []
+    if EXIF_IFD_POINTER in ifd0_entries:
+        exif_entries = read_ifd(tiff, ifd0_entries[EXIF_IFD_POINTER][2], endian)
+        candidates += [exif_entries.get(tag) for tag in EXIF_DATE_TAGS]
+    candidates += [ifd0_entries.get(tag) for tag in IFD0_DATE_TAGS]
+    for entry in candidates:
+        if entry is not None:
+            date = parse_exif_date(read_ascii(tiff, *entry))
+            if date is not None:
+                return date
+    return None
+
+def patch_exif_dates(filepath, date_str):
+    """
+    Overwrite the three EXIF date values in place. Returns False (without
+    touching the file) when they can't be patched byte for byte.
+    """
+    value = date_str.encode("ascii") + b"\x00"
+    if len(value) != EXIF_DATE_LENGTH:
+        return False
+    with open(filepath, "r+b") as f:
+        try:
+            segment = find_exif_segment(f)
+            if segment is None:
+                return False
+            tiff_start, tiff = segment
+            offsets = date_field_offsets(tiff)
+        except struct.error:
+            return False
+        if offsets is None:
+            return False
+        for offset in offsets:
+            f.seek(tiff_start + offset)
+            f.write(value)
+    return True
+
+def write_exif_date(filepath, date):
+    """
+    Set DateTime, DateTimeOriginal and DateTimeDigitized of a JPEG without
+    re-encoding it.
+
+    If all three dates already exist they are overwritten in place (a 60 byte
+    write). Otherwise the EXIF block is rebuilt with piexif and spliced into
+    the file with piexif.insert, which copies the compressed image data as is.
+    Returns "patched" or "inserted". Raises ValueError for files that are not
+    JPEGs.
+
+    This changes the file's modification time, so set file times afterwards.
+    """
+    date_str = date.strftime(EXIF_DATE_FORMAT)
+    if patch_exif_dates(filepath, date_str):
+        return "patched"
+
+    exif_dict = piexif.load(filepath)
+    exif_dict["0th"][piexif.ImageIFD.DateTime] = date_str
+    exif_dict["Exif"][piexif.ExifIFD.DateTimeOriginal] = date_str
+    exif_dict["Exif"][piexif.ExifIFD.DateTimeDigitized] = date_str
+    piexif.insert(piexif.dump(exif_dict), filepath)
+    return "inserted"
@@ -0,0 +1,191 @@
+import errno
+import json
+import os
+import threading
+
+# Windows access right that is enough for SetFileTime, so files that are open
+# for reading elsewhere can still be stamped
+FILE_WRITE_ATTRIBUTES = 0x0100
+# Extended attribute holding the creation time (ns since the epoch) where the
+# filesystem cannot store a birth time itself
+CREATION_XATTR = "user.creation_time"
+# Per-directory fallback for filesystems without user xattrs, keyed by inode
+# so it survives the renames done after the times are set
+SIDECAR_NAME = ".creation_times.json"
+# Directory descriptors kept open by PosixBackend
+MAX_OPEN_DIRS = 64
+# errno values meaning "this filesystem does not take user xattrs". Anything
+# else (EPERM, EACCES, ...) is a real error for that one file and is raised.
+NO_XATTR_ERRNOS = {errno.ENOTSUP, errno.EOPNOTSUPP}
+
+class Win32Backend:
+    """
+    Sets creation, access and modification time through one handle per file.
+
+    The old helpers opened a handle for the creation time and then let
+    os.utime open the file a second time; over SMB every open is a round
+    trip. The handle is opened with FILE_WRITE_ATTRIBUTES only and all three
+    times go into a single SetFileTime call.
+    """
+
+    def __init__(self):
+        import pywintypes
+        import win32file
+        self.pywintypes = pywintypes
+        self.win32file = win32file
+
+    def set_times(self, filepath, date):
+        filetime = self.pywintypes.Time(date)
+        handle = self.win32file.CreateFile(
+            filepath,
+            FILE_WRITE_ATTRIBUTES,
+            self.win32file.FILE_SHARE_READ | self.win32file.FILE_SHARE_WRITE | self.win32file.FILE_SHARE_DELETE,
+            None,  # SecurityAttributes
+            self.win32file.OPEN_EXISTING,
+            self.win32file.FILE_ATTRIBUTE_NORMAL,
+            None,  # TemplateFile
+        )
+        try:
+            self.win32file.SetFileTime(handle, filetime, filetime, filetime)
+        finally:
+            handle.Close()
+
+    def close(self):
+        pass
+
+class PosixBackend:
+    """
+    Sets access and modification time with utimensat and stores the creation
+    time, which Linux does not let user space set, next to the file.
+
+    utimensat is called relative to a directory descriptor that stays open
+    while the directory is being worked on, so the path is not resolved again
+    for every file. The creation time goes into the user.creation_time xattr,
+    or into a per-directory SIDECAR_NAME file on filesystems without xattrs
+    (written on close(), and only for directories where the xattr was
+    refused). Callers walking a directory should skip SIDECAR_NAME. Thread
+    safe: the lock only guards the descriptor cache and the sidecar dicts,
+    utime, setxattr and stat run outside it so the workers don't queue up
+    behind each other's network round trips.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dir_fds = {}
+        # Threads using each open descriptor, and the descriptors dropped
+        # from the cache that the last of those threads closes
+        self.fd_users = {}
+        self.retired = set()
+        self.use_dir_fd = os.utime in os.supports_dir_fd
+        self.no_xattr_dirs = set()
+        self.sidecars = {}
+
+    def _acquire_dir_fd(self, directory):
+        with self.lock:
+            fd = self.dir_fds.pop(directory, None)
+            if fd is None:
+                while len(self.dir_fds) >= MAX_OPEN_DIRS:
+                    # Oldest first, dicts keep insertion order
+                    self._retire(self.dir_fds.pop(next(iter(self.dir_fds))))
+                fd = os.open(directory, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+                self.fd_users[fd] = 0
+            self.dir_fds[directory] = fd
+            self.fd_users[fd] += 1
+            return fd
+
+    def _release_dir_fd(self, fd):
+        with self.lock:
+            self.fd_users[fd] -= 1
+            if fd in self.retired and not self.fd_users[fd]:
+                self.retired.discard(fd)
+                self._retire(fd)
+
+    def _retire(self, fd):
+        if self.fd_users[fd]:
+            self.retired.add(fd)
+        else:
+            del self.fd_users[fd]
+            os.close(fd)
+
+    def set_times(self, filepath, date):
+        ns = int(date.timestamp() * 1_000_000_000)
+        directory, name = os.path.split(os.path.abspath(filepath))
+        if self.use_dir_fd:
+            fd = self._acquire_dir_fd(directory)
+            try:
+                os.utime(name, ns=(ns, ns), dir_fd=fd)
+            finally:
+                self._release_dir_fd(fd)
+        else:
+            os.utime(filepath, ns=(ns, ns))
+        self._store_creation_time(directory, filepath, ns)
+
+    def _store_creation_time(self, directory, filepath, ns):
+        with self.lock:
+            use_xattr = directory not in self.no_xattr_dirs
+        if use_xattr and hasattr(os, "setxattr"):
+            try:
+                os.setxattr(filepath, CREATION_XATTR, str(ns).encode("ascii"))
+                return
+            except OSError as e:
+                if e.errno not in NO_XATTR_ERRNOS:
+                    raise
+                with self.lock:
+                    self.no_xattr_dirs.add(directory)
+        inode = str(os.stat(filepath).st_ino)
+        with self.lock:
+            sidecar = self.sidecars.get(directory)
+            if sidecar is None:
+                sidecar = read_sidecar(directory)
+                self.sidecars[directory] = sidecar
+            sidecar[inode] = ns
+
+    def close(self):
+        with self.lock:
+            for fd in [*self.dir_fds.values(), *self.retired]:
+                os.close(fd)
+            self.dir_fds = {}
+            self.fd_users = {}
+            self.retired = set()
+            for directory, sidecar in self.sidecars.items():
+                write_sidecar(directory, sidecar)
+            self.sidecars = {}
+
+def read_sidecar(directory):
+    try:
+        with open(os.path.join(directory, SIDECAR_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_sidecar(directory, sidecar):
+    path = os.path.join(directory, SIDECAR_NAME)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(sidecar, f)
+    os.replace(temp_path, path)
+
+def creation_time_ns(filepath):
+    """
+    Creation time of a file in ns: the real birth time where the OS reports
+    one (Windows, macOS, BSD), else whatever PosixBackend stored for it.
+    None if nothing is known.
+    """
+    stat = os.stat(filepath)
+    if os.name == "nt":
+        return stat.st_ctime_ns
+    birthtime = getattr(stat, "st_birthtime", None)
+    if birthtime is not None:
+        return int(birthtime * 1_000_000_000)
+    if hasattr(os, "getxattr"):
+        try:
+            return int(os.getxattr(filepath, CREATION_XATTR))
+        except (OSError, ValueError):
+            pass
+    return read_sidecar(os.path.dirname(os.path.abspath(filepath))).get(str(stat.st_ino))
+
+def open_backend():
+    """The timestamp backend for this platform"""
+    if os.name == "nt":
+        return Win32Backend()
+    return PosixBackend()
@@ -0,0 +1,295 @@
+"""
+Sparse filename clustering: TF-IDF over character n-grams, an approximate
+nearest neighbour index for the eps-neighbourhoods, DBSCAN on the resulting
+sparse distance graph. Nothing is ever densified, so memory grows with the
+number of non-zero n-grams instead of n_files x n_ngrams. A ClusterModel
+saves a fit so later arrivals can be assigned to it.
+"""
+
+import sys
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.cluster import DBSCAN
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Sorted rows multiplied at a time when scoring the neighbour candidates
+# (and new names compared with the centroids at a time)
+BLOCK_ROWS = 256
+# Where a folder's ClusterModel is kept
+MODEL_FILE = ".cluster_model.joblib"
+
+def make_vectorizer(analyzer="char_wb", ngram_range=(2, 4)):
+    """TF-IDF over character n-grams with float32 values (half the memory of float64)"""
+    return TfidfVectorizer(analyzer=analyzer, ngram_range=ngram_range, dtype=np.float32)
+
+def peak_memory_bytes():
+    """Peak memory of the process so far (traced Python/numpy memory on Windows)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS, in KB elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1]
+    return None
+
+class ResourceReport:
+    """Wall time and peak memory per stage, printed as the stages finish"""
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.stages = []
+        self.started = time.perf_counter()
+        if resource is None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        peak = peak_memory_bytes()
+        self.stages.append((name, seconds, peak))
+        if self.verbose:
+            print(f"{name:<24} {seconds:8.2f} s   peak memory {format_bytes(peak)}")
+
+    def summary(self):
+        total = time.perf_counter() - self.started
+        return f"Total {total:.2f} s, peak memory {format_bytes(peak_memory_bytes())}"
+
+class _Stage:
+    def __init__(self, report, name):
+        self.report = report
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.report.record(self.name, time.perf_counter() - self.started)
+        return False
+
+def format_bytes(size):
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+class SimHashIndex:
+    """
+    Approximate nearest neighbour search for cosine similarity on sparse
+    rows.
+
+    Each table projects the rows onto n_bits random hyperplanes (SimHash),
+    so rows at a small angle get codes sharing a long prefix, and sorts the
+    rows by code. Every row is then compared with the next `window` rows in
+    that order (as sparse block products, see neighbor_pairs). Several tables with independent projections catch the
+    neighbours one sort order misses. Work is O(n_rows * n_tables * window)
+    row products instead of the O(n_rows^2) of an exact neighbourhood query.
+
+    Only n-grams shared by at least two rows are projected: an n-gram that
+    appears in a single file name cannot make it similar to another one, and
+    dropping those keeps the projection matrix small.
+    """
+
+    def __init__(self, n_tables=24, window=64, n_bits=32, seed=42):
+        self.n_tables = n_tables
+        self.window = window
+        self.n_bits = n_bits
+        self.seed = seed
+
+    def orders(self, X):
+        """Yield one row permutation per table, similar rows next to each other"""
+        document_frequency = np.bincount(X.indices, minlength=X.shape[1])
+        X_shared = X[:, np.flatnonzero(document_frequency >= 2)]
+        rng = np.random.default_rng(self.seed)
+        weights = 1 << np.arange(self.n_bits - 1, -1, -1, dtype=np.uint64)
+        for _ in range(self.n_tables):
+            planes = rng.standard_normal((X_shared.shape[1], self.n_bits), dtype=np.float32)
+            codes = (np.asarray(X_shared @ planes) > 0).astype(np.uint64) @ weights
+            yield np.argsort(codes, kind="stable")
+
+    def neighbor_pairs(self, X, max_distance):
+        """
+        Unique (rows, cols, cosine distances) with rows < cols for the
+        candidate pairs within max_distance. X must have L2-normalised rows.
+        """
+        X = sparse.csr_matrix(X)
+        n_rows = X.shape[0]
+        keys = []
+        distances = []
+        for order in self.orders(X):
+            X_sorted = X[order]
+            # The band |i - j| <= window of the sorted rows, computed as
+            # products of a block of rows with the same block plus the next
+            # `window` rows; pairs outside the band are dropped
+            for start in range(0, n_rows, BLOCK_ROWS):
+                block = X_sorted[start:start + BLOCK_ROWS]
+                similarity = (block @ X_sorted[start:start + BLOCK_ROWS + self.window].T).tocoo()
+                row, col = similarity.row, similarity.col
+                keep = (col > row) & (col <= row + self.window) & (1.0 - similarity.data <= max_distance)
+                a, b = order[row[keep] + start], order[col[keep] + start]
+                keys.append(np.minimum(a, b).astype(np.int64) * n_rows + np.maximum(a, b))
+                distances.append(1.0 - similarity.data[keep])
+        if not keys:
+            empty = np.empty(0, np.int64)
+            return empty, empty, np.empty(0, np.float32)
+        keys, first = np.unique(np.concatenate(keys), return_index=True)
+        distances = np.concatenate(distances)[first].astype(np.float32)
+        return keys // n_rows, keys % n_rows, distances
+
+def neighborhood_graph(X, eps, index=None):
+    """
+    Sparse symmetric matrix of the cosine distances between rows at most eps
+    apart that the index finds. Identical names (distance 0) are stored as a
+    tiny positive distance so the edge is not dropped as an implicit zero.
+    """
+    index = index or SimHashIndex()
+    rows, cols, distances = index.neighbor_pairs(X, eps)
+    distances = np.maximum(distances, np.float32(1e-6))
+    n_rows = X.shape[0]
+    graph = sparse.coo_matrix(
+        (np.concatenate([distances, distances]), (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+        shape=(n_rows, n_rows),
+    )
+    return graph.tocsr()
+
+def elbow_eps(k_distances):
+    """
+    eps at the elbow of a k-distance curve: sort the k-th neighbour
+    distances, scale both axes to [0, 1] and take the point furthest below
+    the straight line from the first to the last point (the "knee" of the
+    flat-then-steep curve). Returns None when there is no curve to speak of
+    (fewer than 3 points or all distances equal).
+    """
+    distances = np.sort(np.asarray(k_distances, dtype=np.float64))
+    if len(distances) < 3 or distances[-1] == distances[0]:
+        return None
+    x = np.linspace(0.0, 1.0, len(distances))
+    y = (distances - distances[0]) / (distances[-1] - distances[0])
+    return float(distances[np.argmax(x - y)])
+
+def cluster_matrix(X, eps=0.6, min_samples=2, index=None, report=None):
+    """DBSCAN labels for the L2-normalised rows of X (see cluster_filenames)"""
+    report = report or ResourceReport(verbose=False)
+    with report.stage("Neighbourhood graph"):
+        graph = neighborhood_graph(X, eps, index)
+    with report.stage("DBSCAN"):
+        labels = DBSCAN(eps=eps, min_samples=min_samples, metric="precomputed").fit(graph).labels_
+    return labels
+
+def cluster_filenames(names, eps=0.6, min_samples=2, vectorizer=None, index=None, report=None):
+    """
+    Cluster file names by cosine distance of their TF-IDF n-gram vectors.
+    Returns the DBSCAN labels (-1 for unclustered), one per name. report
+    (a ResourceReport) gets the time and memory of every stage.
+    """
+    report = report or ResourceReport(verbose=False)
+    vectorizer = vectorizer or make_vectorizer()
+    with report.stage("TF-IDF"):
+        X = vectorizer.fit_transform(names)
+    return cluster_matrix(X, eps, min_samples, index, report)
+
+class ClusterModel:
+    """
+    A fitted clustering that new file names can be assigned to without
+    clustering everything again.
+
+    Keeps the fitted vectorizer, the unit-length mean TF-IDF vector
+    (centroid) of every cluster and its radius, the largest cosine distance
+    of a member to the centroid. A new name goes to the cluster with the
+    nearest centroid if it is within max(eps, radius) of it, otherwise it
+    stays unclustered. That is one sparse product with the centroids per
+    name, independent of how many names the model was fitted on. Clusters
+    drift as names get added, so a full fit should be redone now and then.
+
+    cluster_names holds a caller-defined name (e.g. a folder) per cluster.
+    """
+
+    def __init__(self, vectorizer, X, labels, eps):
+        labels = np.asarray(labels)
+        self.vectorizer = vectorizer
+        self.eps = eps
+        self.n_fitted = len(labels)
+        self.n_assigned = 0
+        self.fitted_at = time.time()
+
+        members = np.flatnonzero(labels >= 0)
+        n_clusters = int(labels.max()) + 1 if len(members) else 0
+        counts = np.bincount(labels[members], minlength=n_clusters)
+        # Row c of membership averages the rows of cluster c
+        membership = sparse.csr_matrix(
+            (1.0 / counts[labels[members]], (labels[members], members)),
+            shape=(n_clusters, X.shape[0]),
+            dtype=np.float32,
+        )
+        self.centroids = normalize(membership @ X).astype(np.float32)
+        self.radii = np.zeros(n_clusters, dtype=np.float32)
+        if len(members):
+            similarity = rows_dot_centroids(X[members], self.centroids, labels[members])
+            np.maximum.at(self.radii, labels[members], 1.0 - similarity)
+        self.cluster_names = [f"cluster_{label}" for label in range(n_clusters)]
+
+    @classmethod
+    def fit(cls, names, eps=0.6, min_samples=2, vectorizer=None, index=None, report=None):
+        """Cluster names from scratch, returns (model, labels)"""
+        report = report or ResourceReport(verbose=False)
+        vectorizer = vectorizer or make_vectorizer()
+        with report.stage("TF-IDF"):
+            X = vectorizer.fit_transform(names)
+        labels = cluster_matrix(X, eps, min_samples, index, report)
+        with report.stage("Centroids"):
+            model = cls(vectorizer, X, labels, eps)
+        return model, labels
+
+    def assign(self, names):
+        """Cluster index per name, -1 for names no cluster is close enough to"""
+        labels = np.full(len(names), -1, dtype=np.int64)
+        if not len(names) or not self.centroids.shape[0]:
+            return labels
+        X = self.vectorizer.transform(names)
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            similarity = X[start:start + BLOCK_ROWS] @ self.centroids.T
+            nearest = np.asarray(similarity.argmax(axis=1)).ravel()
+            best = similarity.max(axis=1).toarray().ravel()
+            close = 1.0 - best <= np.maximum(self.eps, self.radii[nearest])
+            labels[start:start + BLOCK_ROWS][close] = nearest[close]
+        self.n_assigned += len(names)
+        return labels
+
+    def save(self, path):
+        joblib.dump(self, path, compress=3)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+def rows_dot_centroids(X, centroids, labels):
+    """
+    Dot product of every row of X with the centroid of its own cluster,
+    without materialising a copy of the centroid per row: the centroid
+    entries are looked up by (cluster, n-gram) key.
+    """
+    X = X.tocoo()
+    C = centroids.tocoo()
+    if not C.nnz:
+        return np.zeros(X.shape[0])
+    n_features = centroids.shape[1]
+    keys = C.row.astype(np.int64) * n_features + C.col
+    order = np.argsort(keys)
+    keys, values = keys[order], C.data[order]
+    wanted = labels[X.row].astype(np.int64) * n_features + X.col
+    position = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    products = np.where(keys[position] == wanted, X.data * values[position], 0.0)
+    return np.bincount(X.row, weights=products, minlength=X.shape[0])
@@ -1,10 +1,9 @@
 import os
 import re
 from datetime import datetime
-import piexif
-from PIL import Image
 import tkinter as tk
 from tkinter import ttk, messagebox
+from exif_dates import write_exif_date
 
 def get_date_formats():
     return [
@@ -36,20 +35,8 @@ def parse_date(date_str, date_format):
 
 def modify_exif_date(filepath, date):
     try:
-        img = Image.open(filepath)
-        if img.format not in ['JPEG', 'JPG']:
-            return False
-        
-        exif_dict = piexif.load(img.info.get('exif', b''))
-        date_str = date.strftime("%Y:%m:%d %H:%M:%S")
-        
-        # Update EXIF date fields
-        exif_dict['0th'][piexif.ImageIFD.DateTime] = date_str
-        exif_dict['Exif'][piexif.ExifIFD.DateTimeOriginal] = date_str
-        exif_dict['Exif'][piexif.ExifIFD.DateTimeDigitized] = date_str
-        
-        exif_bytes = piexif.dump(exif_dict)
-        img.save(filepath, exif=exif_bytes)
+        # Raises ValueError for anything that isn't a JPEG
+        write_exif_date(filepath, date)
         # Update file modification time
         os.utime(filepath, (date.timestamp(), date.timestamp()))
         return True
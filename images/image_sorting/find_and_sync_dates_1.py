@@ -1,8 +1,7 @@
 import os
 import re
 from datetime import datetime
-from PIL import Image
-import piexif
+from exif_dates import write_exif_date
 
 # 📌 Folder containing images
 folder_path = "."
@@ -63,23 +62,13 @@ for filename in os.listdir(folder_path):
     date_str = match.group()
     try:
         date_obj = datetime.strptime(date_str, selected_format)
-        exif_date = date_obj.strftime("%Y:%m:%d %H:%M:%S")
     except Exception:
         skipped_files.append(filename)
         continue
 
-    # Load image and EXIF data
+    # Patch the EXIF dates in place (no re-encode), then the file timestamp
     try:
-        im = Image.open(file_path)
-        exif_dict = piexif.load(im.info.get("exif", b""))
-
-        # Update EXIF DateTime tags
-        exif_dict['0th'][piexif.ImageIFD.DateTime] = exif_date.encode()
-        exif_dict['Exif'][piexif.ExifIFD.DateTimeOriginal] = exif_date.encode()
-        exif_dict['Exif'][piexif.ExifIFD.DateTimeDigitized] = exif_date.encode()
-
-        exif_bytes = piexif.dump(exif_dict)
-        im.save(file_path, exif=exif_bytes)
+        write_exif_date(file_path, date_obj)
 
         # Also update file modified timestamp
         mod_time = date_obj.timestamp()
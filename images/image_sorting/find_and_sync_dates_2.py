@@ -1,8 +1,8 @@
 import os
 import re
 from datetime import datetime
-import piexif
 from PIL import Image
+from exif_dates import write_exif_date
 import tkinter as tk
 from tkinter import ttk, messagebox
 
@@ -32,29 +32,15 @@ def parse_date(date_str, date_format, format_str):
 
 def modify_exif_date(filepath, date):
     try:
-        img = Image.open(filepath)
-        if img.format not in ['JPEG', 'JPG', 'WEBP', 'PNG']:
+        with Image.open(filepath) as img:
+            image_format = img.format
+        if image_format not in ['JPEG', 'JPG', 'WEBP', 'PNG']:
             return False
 
-        # Prepare EXIF data
-        exif_dict = piexif.load(img.info.get('exif', b'')) if 'exif' in img.info else {}
-        date_str = date.strftime("%Y:%m:%d %H:%M:%S")
-
-        # Update EXIF date fields
-        if not exif_dict or exif_dict == {'0th': {}, 'Exif': {}, 'GPS': {}, '1st': {}, 'thumbnail': None}:
-            exif_dict = {'0th': {}, 'Exif': {}, 'GPS': {}, '1st': {}, 'thumbnail': None}
-        
-        exif_dict['0th'][piexif.ImageIFD.DateTime] = date_str
-        exif_dict['Exif'][piexif.ExifIFD.DateTimeOriginal] = date_str
-        exif_dict['Exif'][piexif.ExifIFD.DateTimeDigitized] = date_str
-
-        # Handle formats that might not support EXIF
-        if img.format in ['WEBP', 'PNG']:
-            # For WEBP and PNG, we might not save EXIF, but we'll update file times
-            img.save(filepath)
-        else:
-            exif_bytes = piexif.dump(exif_dict)
-            img.save(filepath, exif=exif_bytes)
+        # WEBP and PNG keep their content, only the file times are updated.
+        # JPEGs get the EXIF dates patched without re-encoding the image.
+        if image_format in ['JPEG', 'JPG']:
+            write_exif_date(filepath, date)
 
         # Update file modification time
         os.utime(filepath, (date.timestamp(), date.timestamp()))
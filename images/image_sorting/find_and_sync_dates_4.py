@@ -1,30 +1,10 @@
 import os
 import re
 from datetime import datetime
-import piexif
 from PIL import Image
-import pywintypes
-import win32file
-import win32con
+from exif_dates import write_exif_date
+from file_times import SIDECAR_NAME, open_backend
 
-def set_creation_time(filepath, date):
-    try:
-        # Convert datetime to Windows FILETIME format
-        filetime = pywintypes.Time(date)
-        handle = win32file.CreateFile(
-            filepath,
-            win32file.GENERIC_WRITE,
-            win32file.FILE_SHARE_WRITE,
-            None,  # SecurityAttributes
-            win32file.OPEN_EXISTING,
-            win32file.FILE_ATTRIBUTE_NORMAL,
-            None  # TemplateFile
-        )
-        win32file.SetFileTime(handle, filetime, None, None)  # Set creation time
-        handle.Close()
-    except Exception as e:
-        print(f"Failed to set creation time for {filepath}: {e}")
-        
 def get_date_formats():
     return [
         (r"\d{4}-\d{2}-\d{2}", "%Y-%m-%d"),                     # YYYY-MM-DD
@@ -49,37 +29,20 @@ def parse_date(date_str, date_format, format_str):
     except (ValueError, TypeError):
         return None
 
-def modify_exif_date(filepath, date):
+def modify_exif_date(filepath, date, file_times):
     try:
-        img = Image.open(filepath)
-        if img.format not in ['JPEG', 'JPG', 'WEBP', 'PNG']:
+        with Image.open(filepath) as img:
+            image_format = img.format
+        if image_format not in ['JPEG', 'JPG', 'WEBP', 'PNG']:
             return False
 
-        # Prepare EXIF data
-        exif_dict = piexif.load(img.info.get('exif', b'')) if 'exif' in img.info else {}
-        date_str = date.strftime("%Y:%m:%d %H:%M:%S")
-
-        # Update EXIF date fields
-        if not exif_dict or exif_dict == {'0th': {}, 'Exif': {}, 'GPS': {}, '1st': {}, 'thumbnail': None}:
-            exif_dict = {'0th': {}, 'Exif': {}, 'GPS': {}, '1st': {}, 'thumbnail': None}
-        
-        exif_dict['0th'][piexif.ImageIFD.DateTime] = date_str
-        exif_dict['Exif'][piexif.ExifIFD.DateTimeOriginal] = date_str
-        exif_dict['Exif'][piexif.ExifIFD.DateTimeDigitized] = date_str
-
-        # Handle formats that might not support EXIF
-        if img.format in ['WEBP', 'PNG']:
-            # For WEBP and PNG, update file times explicitly
-            img.save(filepath)
-            os.utime(filepath, (date.timestamp(), date.timestamp()))
-            set_creation_time(filepath, date)  # Update creation time
-        else:
-            exif_bytes = piexif.dump(exif_dict)
-            img.save(filepath, exif=exif_bytes)
-            # Update file times for JPEG as well
-            os.utime(filepath, (date.timestamp(), date.timestamp()))
-            set_creation_time(filepath, date)  # Update creation time
+        # WEBP and PNG keep their content, only the file times are updated.
+        # JPEGs get the EXIF dates patched without re-encoding the image,
+        # before the file times since that write bumps the modification time.
+        if image_format in ['JPEG', 'JPG']:
+            write_exif_date(filepath, date)
 
+        file_times.set_times(filepath, date)  # Creation and modification time
         return True
     except Exception:
         return False
@@ -87,42 +50,45 @@ def modify_exif_date(filepath, date):
 def process_folder(folder_path, date_format, format_str):
     failed_files = []
     processed_files = []
+    file_times = open_backend()
     
-    for filename in os.listdir(folder_path):
-        filepath = os.path.join(folder_path, filename)
-        if not os.path.isfile(filepath):
-            continue
+    try:
+        for filename in os.listdir(folder_path):
+            filepath = os.path.join(folder_path, filename)
+            if filename == SIDECAR_NAME or not os.path.isfile(filepath):
+                continue
             
-        # Search for date in filename
-        date_match = re.search(date_format, filename)
-        if date_match:
-            date_str = date_match.group()
-            date = parse_date(date_str, date_format, format_str)
-            if date and modify_exif_date(filepath, date):
-                # Prepare new filename
-                new_date_str = str(int(date.timestamp()))
-                name, ext = os.path.splitext(filename)
-                new_filename = f"{new_date_str}{ext}"
-                new_filepath = os.path.join(folder_path, new_filename)
-                
-                # Ensure unique filename
-                counter = 1
-                while os.path.exists(new_filepath):
-                    new_filename = f"{new_date_str}_{counter}{ext}"
+            # Search for date in filename
+            date_match = re.search(date_format, filename)
+            if date_match:
+                date_str = date_match.group()
+                date = parse_date(date_str, date_format, format_str)
+                if date and modify_exif_date(filepath, date, file_times):
+                    # Prepare new filename
+                    new_date_str = str(int(date.timestamp()))
+                    name, ext = os.path.splitext(filename)
+                    new_filename = f"{new_date_str}{ext}"
                     new_filepath = os.path.join(folder_path, new_filename)
-                    counter += 1
                 
-                # Rename file
-                try:
-                    os.rename(filepath, new_filepath)
-                    processed_files.append(new_filename)
-                except Exception:
+                    # Ensure unique filename
+                    counter = 1
+                    while os.path.exists(new_filepath):
+                        new_filename = f"{new_date_str}_{counter}{ext}"
+                        new_filepath = os.path.join(folder_path, new_filename)
+                        counter += 1
+                
+                    # Rename file
+                    try:
+                        os.rename(filepath, new_filepath)
+                        processed_files.append(new_filename)
+                    except Exception:
+                        failed_files.append(filename)
+                else:
                     failed_files.append(filename)
             else:
                 failed_files.append(filename)
-        else:
-            failed_files.append(filename)
-    
+    finally:
+        file_times.close()
     return failed_files, processed_files
 
 def main():
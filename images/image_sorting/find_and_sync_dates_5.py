@@ -1,11 +1,9 @@
 import os
 import re
 from datetime import datetime
-import piexif
-from PIL import Image
-import pywintypes
-import win32file
 from tqdm import tqdm
+from exif_dates import write_exif_date
+from file_times import SIDECAR_NAME, open_backend
 
 DATE_FORMATS = [
     (r"(20\d{2})-(\d{2})-(\d{2})", "%Y-%m-%d"),  # YYYY-MM-DD (2000+)
@@ -88,28 +86,6 @@ def user_inputs():
 # Actual code.
 
 
-def set_creation_time_win_api(filepath, date):
-    """
-    Set file creation time using Windows API.
-    """
-    try:
-        # Convert datetime to Windows FILETIME format
-        filetime = pywintypes.Time(date)
-        handle = win32file.CreateFile(
-            filepath,
-            win32file.GENERIC_WRITE,
-            win32file.FILE_SHARE_WRITE,
-            None,  # SecurityAttributes
-            win32file.OPEN_EXISTING,
-            win32file.FILE_ATTRIBUTE_NORMAL,
-            None,  # TemplateFile
-        )
-        win32file.SetFileTime(handle, filetime, None, None)  # Set creation time
-        handle.Close()
-    except Exception as e:
-        print(f"Failed to set creation time for {filepath}: {e}")
-
-
 def parse_date(date_str, format_str):
     try:
         if format_str == "timestamp_ms":
@@ -127,91 +103,86 @@ def get_extension(filepath):
     return ext.lower()  # Convert to lowercase for consistency
 
 
-def modify_exif_and_create_modify_times(filepath, correct_date):
+def modify_exif_and_create_modify_times(filepath, correct_date, file_times):
 
-    # irrespective of the file format, set the creation time and modification time
-    set_creation_time_win_api(filepath, correct_date)
-    # set modification time.
-    os.utime(filepath, (correct_date.timestamp(), correct_date.timestamp()))
-
-    # check file format first.
+    # check file format first. EXIF goes first since writing it bumps the
+    # modification time.
     if get_extension(filepath) in [".jpg", ".jpeg"]:
         try:
-            img = Image.open(filepath)
-            exif_dict = (
-                piexif.load(img.info.get("exif", b""))
-                if "exif" in img.info
-                else {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
-            )
-            correct_date_str = correct_date.strftime("%Y:%m:%d %H:%M:%S")
-            exif_dict["0th"][piexif.ImageIFD.DateTime] = correct_date_str
-            exif_dict["Exif"][piexif.ExifIFD.DateTimeOriginal] = correct_date_str
-            exif_dict["Exif"][piexif.ExifIFD.DateTimeDigitized] = correct_date_str
-            exif_bytes = piexif.dump(exif_dict)
-            img.save(filepath, exif=exif_bytes)
-            img.close()
-            return True
+            write_exif_date(filepath, correct_date)
         except Exception as e:
             print(f"Error modifying {filepath}: {e}")
             return False
 
+    # irrespective of the file format, set the creation time and modification time
+    try:
+        file_times.set_times(filepath, correct_date)
+    except OSError as e:
+        print(f"Failed to set file times for {filepath}: {e}")
+
     return True
 
 def process_folder(folder_path, date_format, format_str):
     failed_files = []
     processed_files = []
+    file_times = open_backend()
 
-    # List all files first for proper tqdm count
-    all_files = [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
-
-    for filename in tqdm(all_files, desc="Processing files"):
-        filepath = os.path.join(folder_path, filename)
-
-        # Search for date in filename
-        date_match = re.search(date_format, filename)
-        if date_match:
-            date_str = date_match.group()
+    try:
+        # List all files first for proper tqdm count
+        all_files = [
+            f for f in os.listdir(folder_path)
+            if f != SIDECAR_NAME and os.path.isfile(os.path.join(folder_path, f))
+        ]
 
-            date = parse_date(date_str, format_str)
+        for filename in tqdm(all_files, desc="Processing files"):
+            filepath = os.path.join(folder_path, filename)
 
-            if date and modify_exif_and_create_modify_times(filepath, date):
+            # Search for date in filename
+            date_match = re.search(date_format, filename)
+            if date_match:
+                date_str = date_match.group()
 
-                # Prepare new filename with Unix timestamp in milliseconds
-                new_date_str = str(int(date.timestamp() * 1000))
-                _, ext = os.path.splitext(filename)
-                new_filename = f"{new_date_str}{ext}"
-                new_filepath = os.path.join(folder_path, new_filename)
+                date = parse_date(date_str, format_str)
 
-                # check new file name is not original file name
-                if new_filename == filename:
-                    print(
-                        f"New filename is the same as original filename for : {filename}, skipping rename."
-                    )
-                    processed_files.append(new_filename)
-                    continue
+                if date and modify_exif_and_create_modify_times(filepath, date, file_times):
 
-                # Ensure unique filename by incrementing milliseconds
-                counter = 1
-                while os.path.exists(new_filepath):
-                    incremented_timestamp = int(new_date_str) + counter
-                    new_filename = f"{incremented_timestamp}{ext}"
+                    # Prepare new filename with Unix timestamp in milliseconds
+                    new_date_str = str(int(date.timestamp() * 1000))
+                    _, ext = os.path.splitext(filename)
+                    new_filename = f"{new_date_str}{ext}"
                     new_filepath = os.path.join(folder_path, new_filename)
-                    counter += 1
-
-                # Rename file
-                try:
-                    os.rename(filepath, new_filepath)
-                    processed_files.append(new_filename)
-                except Exception as e:
-                    print(f"Failed to rename {filepath} to {new_filepath}: {e}")
+
+                    # check new file name is not original file name
+                    if new_filename == filename:
+                        print(
+                            f"New filename is the same as original filename for : {filename}, skipping rename."
+                        )
+                        processed_files.append(new_filename)
+                        continue
+
+                    # Ensure unique filename by incrementing milliseconds
+                    counter = 1
+                    while os.path.exists(new_filepath):
+                        incremented_timestamp = int(new_date_str) + counter
+                        new_filename = f"{incremented_timestamp}{ext}"
+                        new_filepath = os.path.join(folder_path, new_filename)
+                        counter += 1
+
+                    # Rename file
+                    try:
+                        os.rename(filepath, new_filepath)
+                        processed_files.append(new_filename)
+                    except Exception as e:
+                        print(f"Failed to rename {filepath} to {new_filepath}: {e}")
+                        failed_files.append(filename)
+                else:
+                    print("Failed to modify EXIF data or set file times for:", filename)
                     failed_files.append(filename)
             else:
-                print("Failed to modify EXIF data or set file times for:", filename)
+                print("No date found in filename:", filename)
                 failed_files.append(filename)
-        else:
-            print("No date found in filename:", filename)
-            failed_files.append(filename)
-
+    finally:
+        file_times.close()
     return failed_files, processed_files
 
 
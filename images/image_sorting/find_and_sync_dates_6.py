@@ -1,37 +1,27 @@
+import argparse
 import os
-import re
-from datetime import datetime
-import piexif
-from PIL import Image
-import pywintypes
-import win32file
+import queue
+import sys
+import threading
 from tqdm import tqdm
+from date_extraction import DATE_FORMATS, DateExtractor, detect_format
+from date_sources import DEFAULT_ORDER, EMBEDDED, FILENAME, SOURCES, DateResolver, parse_order
+from exif_dates import write_exif_date
+from file_times import SIDECAR_NAME, open_backend
+from sync_index import DEFAULT_INDEX_PATH, SyncIndex
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from general_file_management.rename_planner import RenamePlanner, timestamp_names
+
+# Worker threads writing file times / EXIF (I/O bound, so more than CPU cores)
+WORKERS = 16
+# Max files waiting between discovery, workers and reporting
+QUEUE_SIZE = 1024
+# Files between two applies of the planned renames (and index writes)
+FLUSH_EVERY = 500
+# File name dates before this year are digits that only look like a date
+MIN_YEAR = 1990
 
-DATE_FORMATS = [
-    (r"(20\d{2})-(\d{2})-(\d{2})", "%Y-%m-%d"),  # YYYY-MM-DD (2000+)
-    (r"(20\d{2})(\d{2})(\d{2})", "%Y%m%d"),  # YYYYMMDD (2000+)
-    (r"(\d{2})-(\d{2})-(20\d{2})", "%d-%m-%Y"),  # DD-MM-YYYY (2000+)
-    (r"(\d{2})/(\d{2})/(20\d{2})", "%d/%m/%Y"),  # DD/MM/YYYY (2000+)
-    (r"(20\d{2})/(\d{2})/(\d{2})", "%Y/%m/%d"),  # YYYY/MM/DD (2000+)
-    (r"(\d{2})(\d{2})(20\d{2})", "%d%m%Y"),  # DDMMYYYY (2000+)
-    (r"(\d{1,2})-(\w{3})-(20\d{2})", "%d-%b-%Y"),  # D-MMM-YYYY (2000+)
-    (r"(\w{3})\s+(\d{1,2}),\s+(20\d{2})", "%b %d, %Y"),  # Mon DD, YYYY (2000+)
-    (r"(\d{1,2})\s+(\w{3})\s+(20\d{2})", "%d %b %Y"),  # DD Mon YYYY (2000+)
-    (r"(20\d{2})_(\d{2})_(\d{2})", "%Y_%m_%d"),  # YYYY_MM_DD (2000+)
-    (r"(\d{2})_(\d{2})_(20\d{2})", "%d_%m_%Y"),  # DD_MM_YYYY (2000+)
-    (r"\d{4}-\d{2}-\d{2}", "%Y-%m-%d"),  # YYYY-MM-DD
-    (r"\d{2}-\d{2}-\d{4}", "%m-%d-%Y"),  # MM-DD-YYYY
-    (r"\d{2}_\d{2}_\d{4}", "%m_%d_%Y"),  # MM_DD_YYYY
-    (r"\d{4}_\d{2}_\d{2}", "%Y_%m_%d"),  # YYYY_MM_DD
-    (r"\d{4}\d{2}\d{2}", "%Y%m%d"),  # YYYYMMDD
-    (r"\d{2}\d{2}\d{4}", "%m%d%Y"),  # MMDDYYYY
-    (r"\d{4}\d{2}\d{2}_\d{2}\d{2}\d{2}", "%Y%m%d_%H%M%S"),  # YYYYMMDD_HHMMSS
-    (r"\d{4}\d{2}\d{2}\d{2}\d{2}\d{2}", "%Y%m%d%H%M%S"),  # YYYYMMDDHHMMSS
-    (r"\d{13}", "timestamp_ms"),  # Unix timestamp (ms)
-    (r"\d{10}", "timestamp_s"),  # Unix timestamp (s)
-    (r"\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}", "%Y-%m-%d-%H-%M-%S"),  # YYYY-MM-DD-HH-MM-SS
-    (r"\d{4}\d{2}\d{2}-\d{2}\d{2}\d{2}", "%Y%m%d-%H%M%S"),  # YYYYMMDD-HHMMSS
-]
 FORMAT_EXAMPLES = [
     "2023-12-25 (Format: YYYY-MM-DD)",
     "20231225 (Format: YYYYMMDD)",
@@ -65,141 +55,382 @@ def user_inputs():
         return
 
     print("Select the date format used in image filenames:")
+    print("0. Detect it automatically for every folder")
     for i, (_, example) in enumerate(zip(DATE_FORMATS, FORMAT_EXAMPLES)):
         print(f"{i + 1}. Example: {example}")
 
     try:
         choice = int(input("Enter the number of your choice: ")) - 1
-        if choice < 0 or choice >= len(DATE_FORMATS):
+        if choice < -1 or choice >= len(DATE_FORMATS):
             print("Invalid choice")
             return
     except ValueError:
         print("Invalid input")
         return
 
+    if choice == -1:
+        return folder_path, None, None
     date_format, format_str = DATE_FORMATS[choice]
     return folder_path, date_format, format_str
 
-def set_creation_time_win_api(filepath, date):
-    """
-    Set file creation time using Windows API.
-    """
-    try:
-        filetime = pywintypes.Time(date)
-        handle = win32file.CreateFile(
-            filepath,
-            win32file.GENERIC_WRITE,
-            win32file.FILE_SHARE_WRITE,
-            None,
-            win32file.OPEN_EXISTING,
-            win32file.FILE_ATTRIBUTE_NORMAL,
-            None,
-        )
-        win32file.SetFileTime(handle, filetime, None, None)
-        handle.Close()
-    except Exception as e:
-        print(f"Failed to set creation time for {filepath}: {e}")
-
-def parse_date(date_str, format_str):
-    try:
-        if format_str == "timestamp_ms":
-            return datetime.fromtimestamp(int(date_str) / 1000.0)
-        elif format_str == "timestamp_s":
-            return datetime.fromtimestamp(int(date_str))
-        else:
-            return datetime.strptime(date_str, format_str)
-    except (ValueError, TypeError):
-        return None
-
 def get_extension(filepath):
     _, ext = os.path.splitext(filepath)
     return ext.lower()
 
-def modify_exif_and_create_modify_times(filepath, correct_date):
-    try:
-        set_creation_time_win_api(filepath, correct_date)
-        os.utime(filepath, (correct_date.timestamp(), correct_date.timestamp()))
+def modify_exif_and_create_modify_times(filepath, correct_date, file_times, write_exif=True):
+    # EXIF first: writing it bumps the modification time we set below
+    if write_exif and get_extension(filepath) in [".jpg", ".jpeg"]:
+        try:
+            write_exif_date(filepath, correct_date)
+        except Exception as e:
+            print(f"Error modifying {filepath}: {e}")
+            return False
 
-        if get_extension(filepath) in [".jpg", ".jpeg"]:
-            try:
-                img = Image.open(filepath)
-                exif_dict = (
-                    piexif.load(img.info.get("exif", b""))
-                    if "exif" in img.info
-                    else {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
-                )
-                correct_date_str = correct_date.strftime("%Y:%m:%d %H:%M:%S")
-                exif_dict["0th"][piexif.ImageIFD.DateTime] = correct_date_str
-                exif_dict["Exif"][piexif.ExifIFD.DateTimeOriginal] = correct_date_str
-                exif_dict["Exif"][piexif.ExifIFD.DateTimeDigitized] = correct_date_str
-                exif_bytes = piexif.dump(exif_dict)
-                img.save(filepath, exif=exif_bytes)
-                img.close()
-                return True
-            except Exception as e:
-                print(f"Error modifying {filepath}: {e}")
-                return False
+    try:
+        file_times.set_times(filepath, correct_date)
         return True
     except Exception as e:
         print(f"Error setting file times for {filepath}: {e}")
         return False
-def process_folder(folder_path, date_format, format_str):
+
+def iter_dirs(folder_path):
+    """
+    Yield (root, file entries) for every directory below folder_path using
+    os.scandir. Each directory is read completely before its files are handed
+    out, so the renames done while processing never show up as new entries.
+    The os.DirEntry objects carry the stat info the sync index needs.
+    """
+    pending_dirs = [folder_path]
+    while pending_dirs:
+        root = pending_dirs.pop()
+        try:
+            with os.scandir(root) as it:
+                entries = list(it)
+        except OSError as e:
+            print(f"Cannot read directory {root}: {e}")
+            continue
+        files = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    pending_dirs.append(entry.path)
+                elif entry.is_file() and entry.name != SIDECAR_NAME:
+                    files.append(entry)
+            except OSError:
+                continue
+        if files:
+            yield root, files
+
+def describe_detection(root, detection):
+    regex_format = detection["format"]
+    if regex_format is None:
+        return f"{root}: no date format detected ({detection['reason']})"
+    text = (
+        f"{root}: {regex_format[1]} "
+        f"({detection['matched']}/{detection['sampled']} sampled files)"
+    )
+    if detection["reason"]:
+        text += f", {detection['reason']}"
+    if detection["ambiguous"]:
+        text += " [AMBIGUOUS]"
+    return text
+
+def detect_folder_formats(folder_path):
+    """Yield (root, filenames, detection) for every directory in the tree"""
+    extractor = DateExtractor(DATE_FORMATS, min_year=MIN_YEAR)
+    for root, files in iter_dirs(folder_path):
+        filenames = [entry.name for entry in files]
+        yield root, filenames, detect_format(filenames, extractor)
+
+def process_file(root, filename, resolver, extractor, planner, file_times):
+    """
+    Sync dates of one file and plan its rename to its timestamp.
+    Returns (ok, path, message, target, stat) where message is printed by
+    the caller, target is the planned new path (None if the name is right)
+    and stat is the file's stat after the sync. The file is not touched
+    after its rename is planned, since the rename may be applied right away.
+    """
+    filepath = os.path.join(root, filename)
+
+    date, source = resolver.resolve(filepath, extractor)
+    if date is None:
+        return False, filepath, f"No date found ({', '.join(resolver.order)}): {filepath}", None, None
+
+    # A date read from the EXIF block is already in it
+    write_exif = source != EMBEDDED
+    if not modify_exif_and_create_modify_times(filepath, date, file_times, write_exif):
+        return False, filepath, f"Failed to modify EXIF data or set file times for: {filepath}", None, None
+    # A rename keeps size and mtime, so this is valid for the target too
+    stat = os.stat(filepath)
+
+    _, ext = os.path.splitext(filename)
+    target = planner.plan(filepath, timestamp_names(int(date.timestamp() * 1000), ext))
+    if target is None:
+        return True, filepath, f"New filename is the same as original filename for: {filename}, skipping rename.", None, stat
+    return True, filepath, None, target, stat
+
+def process_folder(folder_path, date_format=None, format_str=None, allow_ambiguous=False,
+                   index_path=DEFAULT_INDEX_PATH, sources=DEFAULT_ORDER,
+                   workers=WORKERS, queue_size=QUEUE_SIZE):
+    """
+    Streaming pipeline: a discovery thread walks the tree with os.scandir into
+    a bounded queue, worker threads sync dates and rename, and the main thread
+    collects results into a second bounded queue for reporting. Memory stays
+    flat no matter how many files the tree holds.
+
+    Without date_format every directory gets the format detected from a
+    sample of its own file names. Directories where that format is an
+    unresolved DD/MM vs MM/DD case are skipped unless allow_ambiguous.
+
+    Dates come from the sources in order (see DateResolver): the capture
+    date embedded in the file, the file name, the modification time. In
+    directories without a usable file name format only the other sources
+    are tried, and they are skipped only when the file name is the sole
+    source.
+
+    With an index_path, files the sync index knows as unchanged since their
+    last sync are skipped before anything opens them, and every file synced
+    now is added to it. Returns (failed_files, processed_files, skipped).
+
+    Renames are planned while the files are processed and applied every
+    FLUSH_EVERY files, together with the index rows of those files, all into
+    one journal for the run (see RenamePlanner). Directories are forgotten
+    by the planner once all their files are back, so memory stays flat, and
+    an interrupted run keeps everything up to its last flush (Ctrl-C
+    flushes once more).
+    """
     failed_files = []
     processed_files = []
 
-    # Walk through all directories and subdirectories
-    all_files = []
-    for root, _, files in os.walk(folder_path):
-        for filename in files:
-            all_files.append((root, filename))
-
-    for root, filename in tqdm(all_files, desc="Processing files"):
-        filepath = os.path.join(root, filename)
-
-        date_match = re.search(date_format, filename)
-        if date_match:
-            date_str = date_match.group()
-            date = parse_date(date_str, format_str)
-
-            if date and modify_exif_and_create_modify_times(filepath, date):
-                new_date_str = str(int(date.timestamp() * 1000))
-                _, ext = os.path.splitext(filename)
-                new_filename = f"{new_date_str}{ext}"
-                new_filepath = os.path.join(root, new_filename)
-
-                if new_filename == filename:
-                    print(f"New filename is the same as original filename for: {filename}, skipping rename.")
-                    processed_files.append(os.path.join(root, new_filename))
+    paths = queue.Queue(maxsize=queue_size)
+    results = queue.Queue(maxsize=queue_size)
+    planner = RenamePlanner()
+    file_times = open_backend()
+    synced = []
+    failed_renames = set()
+    # Files of a directory still in flight, and the directories now done
+    remaining = {}
+    finished_dirs = []
+    discovered = [0]
+    skipped = [0]
+    extractors = {}
+    sync_index = SyncIndex(index_path) if index_path else None
+    detector = DateExtractor(DATE_FORMATS, min_year=MIN_YEAR)
+    resolver = DateResolver(sources)
+
+    def get_extractor(regex_format):
+        if regex_format not in extractors:
+            extractors[regex_format] = DateExtractor([regex_format], min_year=MIN_YEAR)
+        return extractors[regex_format]
+
+    def directories():
+        """Yield (root, filenames, extractor or None, skip message or None)"""
+        for root, files in iter_dirs(folder_path):
+            if sync_index is not None:
+                files, synced = sync_index.split(root, files)
+                skipped[0] += synced
+                if not files:
                     continue
+            filenames = [entry.name for entry in files]
+            if FILENAME not in resolver.order:
+                yield root, filenames, None, None
+                continue
+            if date_format is not None:
+                yield root, filenames, get_extractor((date_format, format_str)), None
+                continue
 
-                counter = 1
-                while os.path.exists(new_filepath):
-                    incremented_timestamp = int(new_date_str) + counter
-                    new_filename = f"{incremented_timestamp}{ext}"
-                    new_filepath = os.path.join(root, new_filename)
-                    counter += 1
-
-                try:
-                    os.rename(filepath, new_filepath)
-                    processed_files.append(os.path.join(root, new_filename))
-                except Exception as e:
-                    print(f"Failed to rename {filepath} to {new_filepath}: {e}")
-                    failed_files.append(os.path.join(root, filename))
+            # Only files that still need a sync take part in the detection
+            detection = detect_format(filenames, detector)
+            message = describe_detection(root, detection)
+            usable = detection["format"] is not None
+            if usable and detection["ambiguous"] and not allow_ambiguous:
+                usable = False
+                message += ", file name dates not used (see --allow-ambiguous)"
+            if not usable and resolver.needs_filename_format():
+                yield root, filenames, None, message + ", skipped"
+            elif not usable:
+                tqdm.write(message)
+                yield root, filenames, None, None
             else:
-                print(f"Failed to modify EXIF data or set file times for: {os.path.join(root, filename)}")
-                failed_files.append(os.path.join(root, filename))
-        else:
-            print(f"No date found in filename: {os.path.join(root, filename)}")
-            failed_files.append(os.path.join(root, filename))
+                tqdm.write(message)
+                yield root, filenames, get_extractor(detection["format"]), None
+
+    def discover():
+        try:
+            for root, filenames, extractor, skip_message in directories():
+                discovered[0] += len(filenames)
+                if skip_message is not None:
+                    # Nothing to sync here, report the files as failed
+                    for i, filename in enumerate(filenames):
+                        message = None if i else skip_message
+                        results.put((root, False, os.path.join(root, filename), message, None, None))
+                    continue
+                remaining[root] = len(filenames)
+                for filename in filenames:
+                    paths.put((root, filename, extractor))
+        finally:
+            for _ in range(workers):
+                paths.put(None)
+
+    def work():
+        while True:
+            item = paths.get()
+            if item is None:
+                results.put(None)
+                return
+            root, filename, extractor = item
+            try:
+                ok, path, message, target, stat = process_file(root, filename, resolver, extractor, planner, file_times)
+            except Exception as e:
+                path = os.path.join(root, filename)
+                ok, message, target, stat = False, f"Error processing {path}: {e}", None, None
+            results.put((root, ok, path, message, target, stat))
+
+    def flush():
+        """
+        Apply the renames planned so far and record the collected files.
+        Every collected file was planned before it was collected, so its
+        rename is in this apply or an earlier one.
+        """
+        journal_path, _, failed = planner.apply()
+        for source, target, e in failed:
+            tqdm.write(f"Failed to rename {source} to {target}: {e}")
+            failed_renames.add(source)
+        for path, target, stat in synced:
+            if path in failed_renames:
+                # Dates are synced but the name is not, next run tries again
+                failed_files.append(path)
+                continue
+            final_path = target or path
+            processed_files.append(final_path)
+            if sync_index is not None:
+                sync_index.record(final_path, stat)
+        synced.clear()
+        for root in finished_dirs:
+            planner.forget(root)
+        finished_dirs.clear()
+        return journal_path
+
+    threads = [threading.Thread(target=discover, daemon=True)]
+    threads += [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    finished_workers = 0
+    try:
+        with tqdm(desc="Processing files", unit="file") as pbar:
+            while finished_workers < workers:
+                result = results.get()
+                if result is None:
+                    finished_workers += 1
+                    continue
+                root, ok, path, message, target, stat = result
+                if message:
+                    tqdm.write(message)
+                if ok:
+                    synced.append((path, target, stat))
+                else:
+                    failed_files.append(path)
+                if root in remaining:
+                    remaining[root] -= 1
+                    if not remaining[root]:
+                        del remaining[root]
+                        finished_dirs.append(root)
+                if len(synced) >= FLUSH_EVERY:
+                    flush()
+                pbar.total = discovered[0]
+                pbar.update(1)
+
+        for thread in threads:
+            thread.join()
+    finally:
+        # Also on Ctrl-C: keep the renames and index rows of what is done
+        journal_path = flush()
+        file_times.close()
+        if sync_index is not None:
+            sync_index.close()
+        if journal_path:
+            print(f"Rename journal (undo with general_file_management/rename_planner.py): {journal_path}")
 
-    return failed_files, processed_files
+    return failed_files, processed_files, skipped[0]
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Set EXIF and file dates from the capture dates embedded in the files "
+        "or the dates in file names, then rename the files to their timestamp. "
+        "Without arguments it asks interactively."
+    )
+    parser.add_argument("folder", nargs="?", help="folder to process (recursively)")
+    parser.add_argument(
+        "--format",
+        default="auto",
+        help=f"number of the date format (1-{len(DATE_FORMATS)}, see the interactive menu) "
+        "or 'auto' to detect it per directory (default)",
+    )
+    parser.add_argument(
+        "--allow-ambiguous",
+        action="store_true",
+        help="also sync directories where DD/MM vs MM/DD could not be decided",
+    )
+    parser.add_argument(
+        "--sources",
+        type=parse_order,
+        default=DEFAULT_ORDER,
+        help=f"date sources to try, in order, from {', '.join(SOURCES)} "
+        f"(default: {','.join(DEFAULT_ORDER)})",
+    )
+    parser.add_argument(
+        "--index",
+        default=DEFAULT_INDEX_PATH,
+        help=f"SQLite index of already synced files (default: {DEFAULT_INDEX_PATH})",
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="sync every file again, without reading or updating the index",
+    )
+    parser.add_argument(
+        "--detect-only",
+        action="store_true",
+        help="only print the detected format of every directory",
+    )
+    return parser.parse_args()
 
 def main():
-    folder_path, date_format, format_str = user_inputs()
-    if not folder_path:
+    args = parse_args()
+    if args.folder is None:
+        inputs = user_inputs()
+        if not inputs:
+            return
+        folder_path, date_format, format_str = inputs
+    else:
+        folder_path = args.folder
+        if not os.path.isdir(folder_path):
+            print("Invalid folder path")
+            return
+        date_format = format_str = None
+        if args.format != "auto":
+            if not args.format.isdigit() or not 1 <= int(args.format) <= len(DATE_FORMATS):
+                print(f"Invalid format: {args.format}")
+                return
+            date_format, format_str = DATE_FORMATS[int(args.format) - 1]
+
+    if args.detect_only:
+        for root, _, detection in detect_folder_formats(folder_path):
+            print(describe_detection(root, detection))
         return
 
-    failed_files, processed_files = process_folder(folder_path, date_format, format_str)
+    failed_files, processed_files, skipped = process_folder(
+        folder_path,
+        date_format,
+        format_str,
+        allow_ambiguous=args.allow_ambiguous,
+        index_path=None if args.no_index else args.index,
+        sources=args.sources,
+    )
+
+    if skipped:
+        print(f"\nSkipped {skipped} files that are already synced")
 
     if processed_files:
         print("\nSuccessfully processed and renamed files:")
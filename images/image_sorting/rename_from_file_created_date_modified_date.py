@@ -1,7 +1,14 @@
 import os
+import sys
 from datetime import datetime
 import time
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from general_file_management.rename_planner import RenamePlanner, timestamp_names
+
+# Planned renames between two applies, so an interrupted run keeps its work
+FLUSH_EVERY = 200
+
 # Get the current directory
 folder_path = input("Enter the folder path containing files: ").strip()
 if not os.path.isdir(folder_path):
@@ -16,48 +23,54 @@ use_creation_time = (
     .lower()
 )
 
+planner = RenamePlanner()
 
-# Iterate through files in the current directory
-for filename in os.listdir(folder_path):
-    # Check if the file is an image
-    if filename.lower().endswith(image_extensions):
-        # Get the full file path
-        file_path = os.path.join(folder_path, filename)
-
-        # Get the creation time
-        creation_time = os.path.getctime(file_path)
+def apply_planned():
+    """Rename what is planned so far, all batches go to the same journal"""
+    journal_path, renamed, failed = planner.apply()
+    for old_path, new_path in renamed:
+        print(f"Renamed: {os.path.basename(old_path)} -> {os.path.basename(new_path)}")
+    for old_path, new_path, e in failed:
+        print(f"Error renaming {os.path.basename(old_path)}: {e}")
+    return journal_path
 
-        # Get the modified time
-        modified_time = os.path.getmtime(file_path)
+planned = 0
+try:
+    # Iterate through files in the current directory
+    for filename in os.listdir(folder_path):
+        # Check if the file is an image
+        if filename.lower().endswith(image_extensions):
+            # Get the full file path
+            file_path = os.path.join(folder_path, filename)
 
-        selected_time = creation_time if use_creation_time == "1" else modified_time
+            # Get the creation time
+            creation_time = os.path.getctime(file_path)
 
-        # Convert to Unix timestamp (milliseconds)
-        timestamp_ms = int(selected_time * 1000)
+            # Get the modified time
+            modified_time = os.path.getmtime(file_path)
 
-        # Get the file extension
-        _, ext = os.path.splitext(filename)
+            selected_time = creation_time if use_creation_time == "1" else modified_time
 
-        # Create new filename with timestamp
-        new_filename = f"{timestamp_ms}{ext}"
-        new_file_path = os.path.join(folder_path, new_filename)
+            # Convert to Unix timestamp (milliseconds)
+            timestamp_ms = int(selected_time * 1000)
 
-        # Check if the new file name is the same as the old one
-        if new_file_path == file_path:
-            print(f"File {filename} already has the correct name.")
-            continue
+            # Get the file extension
+            _, ext = os.path.splitext(filename)
 
-        # Handle duplicate timestamps
-        counter = 1
-        while os.path.exists(new_file_path):
-            new_timestamp_ms = timestamp_ms + counter
-            new_filename = f"{new_timestamp_ms}{ext}"
-            new_file_path = os.path.join(folder_path, new_filename)
-            counter += 1
+            # Plan the new filename with timestamp, duplicate timestamps are
+            # resolved in memory against the directory listing
+            new_file_path = planner.plan(file_path, timestamp_names(timestamp_ms, ext))
 
-        # Rename the file
-        try:
-            os.rename(file_path, new_file_path)
-            print(f"Renamed: {filename} -> {new_filename}")
-        except OSError as e:
-            print(f"Error renaming {filename}: {e}")
+            # Check if the new file name is the same as the old one
+            if new_file_path is None:
+                print(f"File {filename} already has the correct name.")
+            else:
+                planned += 1
+                if planned >= FLUSH_EVERY:
+                    apply_planned()
+                    planned = 0
+finally:
+    # Rename the rest, also when interrupted
+    journal_path = apply_planned()
+    if journal_path:
+        print(f"Undo with: python general_file_management/rename_planner.py {journal_path}")
@@ -0,0 +1,127 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".image_sorting", "sync_index.sqlite")
+# Rows buffered before they are written in one transaction
+BATCH_SIZE = 1000
+TIMESTAMP_NAME = re.compile(r"(\d{13})\.[^.]+")
+# Name collisions add 1 ms per clash to the timestamp in the file name
+MAX_COLLISION_MS = 1000
+
+def named_after_mtime(name, stat):
+    """
+    True if the file is called <timestamp_ms>.<ext> and its modification time
+    is that timestamp, i.e. it is the output of an earlier sync.
+    """
+    match = TIMESTAMP_NAME.fullmatch(name)
+    if not match:
+        return False
+    mtime_ms = stat.st_mtime_ns // 1_000_000
+    return 0 <= int(match.group(1)) - mtime_ms < MAX_COLLISION_MS
+
+class SyncIndex:
+    """
+    SQLite record of files that are already synced, keyed by directory and
+    name, with the size and modification time they had afterwards.
+
+    A file whose size and mtime still match its row is skipped without being
+    opened. Anything else (new, edited, touched, replaced) is synced again.
+    Lookups are done per directory so a rerun costs one query per directory
+    plus the stat calls os.scandir already needs.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.pending = []
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS synced_files (
+                    dir TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    synced_at REAL NOT NULL,
+                    PRIMARY KEY (dir, name)
+                ) WITHOUT ROWID
+                """
+            )
+            self.connection.commit()
+
+    def split(self, root, entries):
+        """
+        Split the os.DirEntry objects of one directory into (pending entries,
+        number already synced). Files named after their own mtime by an
+        earlier run are added to the index on the way, rows of files that are
+        gone are dropped.
+        """
+        directory = os.path.abspath(root)
+        with self.lock:
+            rows = {
+                name: (size, mtime_ns)
+                for name, size, mtime_ns in self.connection.execute(
+                    "SELECT name, size, mtime_ns FROM synced_files WHERE dir = ?", (directory,)
+                )
+            }
+
+        pending = []
+        synced = 0
+        adopted = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                pending.append(entry)
+                continue
+            row = rows.pop(entry.name, None)
+            if row == (stat.st_size, stat.st_mtime_ns):
+                synced += 1
+            elif named_after_mtime(entry.name, stat):
+                synced += 1
+                adopted.append((directory, entry.name, stat.st_size, stat.st_mtime_ns, time.time()))
+            else:
+                pending.append(entry)
+
+        # Whatever is left in rows no longer exists (renamed or deleted)
+        if adopted or rows:
+            with self.lock:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO synced_files VALUES (?, ?, ?, ?, ?)", adopted
+                )
+                self.connection.executemany(
+                    "DELETE FROM synced_files WHERE dir = ? AND name = ?",
+                    [(directory, name) for name in rows],
+                )
+                self.connection.commit()
+        return pending, synced
+
+    def record(self, path, stat):
+        """Remember a freshly synced file (written in batches)"""
+        directory, name = os.path.split(os.path.abspath(path))
+        with self.lock:
+            self.pending.append((directory, name, stat.st_size, stat.st_mtime_ns, time.time()))
+            if len(self.pending) >= BATCH_SIZE:
+                self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO synced_files VALUES (?, ?, ?, ?, ?)", self.pending
+            )
+            self.connection.commit()
+            self.pending = []
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.connection.close()
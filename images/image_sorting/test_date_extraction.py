@@ -0,0 +1,74 @@
+import unittest
+from datetime import datetime
+
+from date_extraction import DATE_FORMATS, DateExtractor, detect_format
+
+class TimeOfDayTest(unittest.TestCase):
+    """Names with a date and a time must keep the time"""
+
+    NAMES = {
+        "IMG_20231225_143022.jpg": "%Y%m%d_%H%M%S",
+        "VID_20231225_143022.mp4": "%Y%m%d_%H%M%S",
+        "PXL_20231225_143022123.jpg": "%Y%m%d_%H%M%S",
+        "20231225-143022.jpg": "%Y%m%d-%H%M%S",
+        "2023-12-25-14-30-22.png": "%Y-%m-%d-%H-%M-%S",
+        "20231225143022.jpg": "%Y%m%d%H%M%S",
+    }
+
+    def setUp(self):
+        self.extractor = DateExtractor()
+
+    def test_extract_keeps_time(self):
+        for name, format_str in self.NAMES.items():
+            with self.subTest(name=name):
+                date, index = self.extractor.extract(name)
+                self.assertEqual(date, datetime(2023, 12, 25, 14, 30, 22))
+                self.assertEqual(DATE_FORMATS[index][1], format_str)
+
+    def test_date_only_names(self):
+        for name, format_str in {"20231225.jpg": "%Y%m%d", "scan 2023-12-25.pdf": "%Y-%m-%d"}.items():
+            with self.subTest(name=name):
+                date, index = self.extractor.extract(name)
+                self.assertEqual(date, datetime(2023, 12, 25))
+                self.assertEqual(DATE_FORMATS[index][1], format_str)
+
+    def test_detect_format(self):
+        for name, format_str in self.NAMES.items():
+            with self.subTest(name=name):
+                names = [name.replace("30", f"{second:02d}") for second in range(30)]
+                result = detect_format(names, self.extractor)
+                self.assertEqual(result["format"][1], format_str)
+                self.assertFalse(result["ambiguous"])
+
+class TimestampTest(unittest.TestCase):
+    """Unix timestamps must not be cut down to the YYYYMMDD at their start"""
+
+    NAMES = {
+        "1712051234567.jpg": ("timestamp_ms", datetime.fromtimestamp(1712051234.567)),
+        "1712051234.jpg": ("timestamp_s", datetime.fromtimestamp(1712051234)),
+        "1699999999999.png": ("timestamp_ms", datetime.fromtimestamp(1699999999.999)),
+    }
+
+    def setUp(self):
+        self.extractor = DateExtractor(min_year=1990)
+
+    def test_extract_timestamps(self):
+        for name, (format_str, expected) in self.NAMES.items():
+            with self.subTest(name=name):
+                date, index = self.extractor.extract(name)
+                self.assertEqual(date, expected)
+                self.assertEqual(DATE_FORMATS[index][1], format_str)
+
+    def test_detect_format(self):
+        names = [f"17120{n:08d}.png" for n in range(0, 10_000_000, 100_000)]
+        self.assertEqual(detect_format(names, self.extractor)["format"][1], "timestamp_ms")
+        names = [f"17120{n:05d}.jpg" for n in range(0, 100_000, 1000)]
+        self.assertEqual(detect_format(names, self.extractor)["format"][1], "timestamp_s")
+
+    def test_min_year(self):
+        # A folder already detected as YYYYMMDD must not date a timestamp 1712
+        extractor = DateExtractor([DATE_FORMATS[15]], min_year=1990)
+        self.assertEqual(extractor.extract("1712051234567.jpg"), (None, None))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,94 +1,44 @@
 import os
-import re
-from datetime import datetime
 from collections import Counter
-import dateutil.parser as dp
+from date_extraction import DateExtractor
 
-# List of regex patterns for various date formats, prioritizing YYYY >= 2000
+# (regex, format) pairs for various date formats, prioritizing YYYY >= 2000.
+# The named groups let DateExtractor build the date without parsing it again.
 DATE_PATTERNS = [
-    r'(20\d{2})-(\d{2})-(\d{2})',            # YYYY-MM-DD (2000+)
-    r'(20\d{2})(\d{2})(\d{2})',              # YYYYMMDD (2000+)
-    r'(\d{2})-(\d{2})-(20\d{2})',            # DD-MM-YYYY or MM-DD-YYYY (2000+)
-    r'(\d{2})/(\d{2})/(20\d{2})',            # DD/MM/YYYY or MM/DD/YYYY (2000+)
-    r'(20\d{2})/(\d{2})/(\d{2})',            # YYYY/MM/DD (2000+)
-    r'(\d{2})(\d{2})(20\d{2})',              # DDMMYYYY (2000+)
-    r'(\d{1,2})-(\w{3})-(20\d{2})',          # D-MMM-YYYY (2000+)
-    r'(\w{3})\s+(\d{1,2}),\s+(20\d{2})',     # Mon DD, YYYY (2000+)
-    r'(\d{1,2})\s+(\w{3})\s+(20\d{2})',      # DD Mon YYYY (2000+)
-    r'(20\d{2})_(\d{2})_(\d{2})',            # YYYY_MM_DD (2000+)
-    r'(\d{2})_(\d{2})_(20\d{2})',            # DD_MM_YYYY or MM_DD_YYYY (2000+)
+    (r'(?P<Y>20\d{2})-(?P<m>\d{2})-(?P<d>\d{2})', "%Y-%m-%d"),           # YYYY-MM-DD (2000+)
+    (r'(?P<Y>20\d{2})(?P<m>\d{2})(?P<d>\d{2})', "%Y%m%d"),               # YYYYMMDD (2000+)
+    (r'(?P<d>\d{2})-(?P<m>\d{2})-(?P<Y>20\d{2})', "%d-%m-%Y"),           # DD-MM-YYYY or MM-DD-YYYY (2000+)
+    (r'(?P<d>\d{2})/(?P<m>\d{2})/(?P<Y>20\d{2})', "%d/%m/%Y"),           # DD/MM/YYYY or MM/DD/YYYY (2000+)
+    (r'(?P<Y>20\d{2})/(?P<m>\d{2})/(?P<d>\d{2})', "%Y/%m/%d"),           # YYYY/MM/DD (2000+)
+    (r'(?P<d>\d{2})(?P<m>\d{2})(?P<Y>20\d{2})', "%d%m%Y"),               # DDMMYYYY (2000+)
+    (r'(?P<d>\d{1,2})-(?P<b>\w{3})-(?P<Y>20\d{2})', "%d-%b-%Y"),         # D-MMM-YYYY (2000+)
+    (r'(?P<b>\w{3})\s+(?P<d>\d{1,2}),\s+(?P<Y>20\d{2})', "%b %d, %Y"),  # Mon DD, YYYY (2000+)
+    (r'(?P<d>\d{1,2})\s+(?P<b>\w{3})\s+(?P<Y>20\d{2})', "%d %b %Y"),    # DD Mon YYYY (2000+)
+    (r'(?P<Y>20\d{2})_(?P<m>\d{2})_(?P<d>\d{2})', "%Y_%m_%d"),           # YYYY_MM_DD (2000+)
+    (r'(?P<d>\d{2})_(?P<m>\d{2})_(?P<Y>20\d{2})', "%d_%m_%Y"),           # DD_MM_YYYY or MM_DD_YYYY (2000+)
     # Fallback patterns for ambiguous cases
-    r'\d{4}-\d{2}-\d{2}',                    # YYYY-MM-DD
-    r'\d{2}-\d{2}-\d{4}',                    # DD-MM-YYYY or MM-DD-YYYY
-    r'\d{2}/\d{2}/\d{4}',                    # DD/MM/YYYY or MM/DD/YYYY
-    r'\d{4}/\d{2}/\d{2}',                    # YYYY/MM/DD
-    r'\d{4}\d{2}\d{2}',                      # YYYYMMDD
-    r'\d{2}\d{2}\d{4}',                      # DDMMYYYY
+    (r'(?P<Y>\d{4})-(?P<m>\d{2})-(?P<d>\d{2})', "%Y-%m-%d"),             # YYYY-MM-DD
+    (r'(?P<d>\d{2})-(?P<m>\d{2})-(?P<Y>\d{4})', "%d-%m-%Y"),             # DD-MM-YYYY or MM-DD-YYYY
+    (r'(?P<d>\d{2})/(?P<m>\d{2})/(?P<Y>\d{4})', "%d/%m/%Y"),             # DD/MM/YYYY or MM/DD/YYYY
+    (r'(?P<Y>\d{4})/(?P<m>\d{2})/(?P<d>\d{2})', "%Y/%m/%d"),             # YYYY/MM/DD
+    (r'(?P<Y>\d{4})(?P<m>\d{2})(?P<d>\d{2})', "%Y%m%d"),                 # YYYYMMDD
+    (r'(?P<d>\d{2})(?P<m>\d{2})(?P<Y>\d{4})', "%d%m%Y"),                 # DDMMYYYY
 ]
 
 # Mapping of patterns to their format strings
-PATTERN_TO_FORMAT = {
-    r'(20\d{2})-(\d{2})-(\d{2})': "%Y-%m-%d",
-    r'(20\d{2})(\d{2})(\d{2})': "%Y%m%d",
-    r'(\d{2})-(\d{2})-(20\d{2})': "%d-%m-%Y",
-    r'(\d{2})/(\d{2})/(20\d{2})': "%d/%m/%Y",
-    r'(20\d{2})/(\d{2})/(\d{2})': "%Y/%m/%d",
-    r'(\d{2})(\d{2})(20\d{2})': "%d%m%Y",
-    r'(\d{1,2})-(\w{3})-(20\d{2})': "%d-%b-%Y",
-    r'(\w{3})\s+(\d{1,2}),\s+(20\d{2})': "%b %d, %Y",
-    r'(\d{1,2})\s+(\w{3})\s+(20\d{2})': "%d %b %Y",
-    r'(20\d{2})_(\d{2})_(\d{2})': "%Y_%m_%d",
-    r'(\d{2})_(\d{2})_(20\d{2})': "%d_%m_%Y",
-    r'\d{4}-\d{2}-\d{2}': "%Y-%m-%d",
-    r'\d{2}-\d{2}-\d{4}': "%d-%m-%Y",
-    r'\d{2}/\d{2}/\d{4}': "%d/%m/%Y",
-    r'\d{4}/\d{2}/\d{2}': "%Y/%m/%d",
-    r'\d{4}\d{2}\d{2}': "%Y%m%d",
-    r'\d{2}\d{2}\d{4}': "%d%m%Y",
-}
+PATTERN_TO_FORMAT = dict(DATE_PATTERNS)
 
-def try_parse_date(date_str, match_groups=None):
-    """Attempt to parse a date string, prioritizing years >= 2000."""
-    try:
-        if match_groups:
-            year = match_groups.get('year')
-            month = match_groups.get('month', '01')
-            day = match_groups.get('day', '01')
-            if year and int(year) >= 2000:
-                date_str = f"{year}-{month}-{day}"
-        parsed_date = dp.parse(date_str, fuzzy=True, dayfirst=True, yearfirst=False)
-        if parsed_date.year >= 2000:
-            return parsed_date
-    except (ValueError, TypeError):
-        pass
-    return None
+# Day first like the old dateutil based parsing, falling back to month first
+# when the day/month pair is only valid that way round
+EXTRACTOR = DateExtractor(DATE_PATTERNS, min_year=2000, swap_day_month=True)
 
 def extract_dates_from_filename(filename):
     """Extract and parse dates from a filename, ensuring year >= 2000."""
-    for pattern in DATE_PATTERNS:
-        matches = re.finditer(pattern, filename)
-        for match in matches:
-            date_str = match.group(0)
-            # Extract groups for patterns that capture year, month, day
-            groups = match.groupdict()
-            if not groups:
-                if pattern.startswith(r'(20\d{2})-(\d{2})-(\d{2})'):
-                    groups = {'year': match.group(1), 'month': match.group(2), 'day': match.group(3)}
-                elif pattern.startswith(r'(20\d{2})(\d{2})(\d{2})'):
-                    groups = {'year': match.group(1), 'month': match.group(2), 'day': match.group(3)}
-                elif pattern.endswith(r'-(20\d{2})'):
-                    groups = {'day': match.group(1), 'month': match.group(2), 'year': match.group(3)}
-                elif pattern.endswith(r'/(20\d{2})'):
-                    groups = {'day': match.group(1), 'month': match.group(2), 'year': match.group(3)}
-                elif pattern.startswith(r'(20\d{2})/'):
-                    groups = {'year': match.group(1), 'month': match.group(2), 'day': match.group(3)}
-                elif pattern.endswith(r'(20\d{2})'):
-                    groups = {'day': match.group(1), 'month': match.group(2), 'year': match.group(3)}
-            parsed_date = try_parse_date(date_str, groups)
-            if parsed_date:
-                # Return the parsed date and the format pattern that matched
-                return parsed_date, pattern
-    return None, None
+    date, index = EXTRACTOR.extract(filename)
+    if date is None:
+        return None, None
+    # Return the parsed date and the format pattern that matched
+    return date, DATE_PATTERNS[index][0]
 
 def get_common_date_format(date_formats):
     """Determine the most common date format from a list of matched patterns."""
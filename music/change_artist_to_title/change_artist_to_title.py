@@ -1,8 +1,15 @@
 import os
+import sys
 from mutagen.id3 import ID3
 from mutagen.mp3 import MP3
 from pathlib import Path
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from general_file_management.rename_planner import RenamePlanner, numbered_names
+
+# Planned renames between two applies, so an interrupted run keeps its work
+FLUSH_EVERY = 200
+
 # Prompt user for folder path
 directory = input("Enter the full path to your MP3 files folder: ").strip()
 
@@ -10,30 +17,46 @@ if not os.path.isdir(directory):
     print("The specified path does not exist. Exiting.")
     exit(1)
 
-# Process each MP3 file
-for filename in os.listdir(directory):
-    if filename.lower().endswith(".mp3"):
-        file_path = os.path.join(directory, filename)
-        try:
-            audio = ID3(file_path)
-            artist = audio.get("TPE1")  # TPE1 is the 'Artist' tag
-
-            if artist:
-                artist_name = artist.text[0].strip()
-                new_file_path = os.path.join(directory, f"{artist_name}.mp3")
-
-                # Handle duplicate filenames by appending a number
-                counter = 1
-                while os.path.exists(new_file_path):
-                    new_file_path = os.path.join(directory, f"{artist_name} ({counter}).mp3")
-                    counter += 1
-
-                os.rename(file_path, new_file_path)
-                print(f"Renamed '{filename}' to '{os.path.basename(new_file_path)}'")
-            else:
-                print(f"No artist tag found for '{filename}' — skipping.")
-
-        except Exception as e:
-            print(f"Error reading '{filename}': {e}")
+planner = RenamePlanner()
+
+def apply_planned():
+    """Rename what is planned so far, all batches go to the same journal"""
+    journal_path, renamed, failed = planner.apply()
+    for old_path, new_path in renamed:
+        print(f"Renamed '{os.path.basename(old_path)}' to '{os.path.basename(new_path)}'")
+    for old_path, new_path, e in failed:
+        print(f"Error renaming '{os.path.basename(old_path)}': {e}")
+    return journal_path
+
+planned = 0
+try:
+    # Process each MP3 file
+    for filename in os.listdir(directory):
+        if filename.lower().endswith(".mp3"):
+            file_path = os.path.join(directory, filename)
+            try:
+                audio = ID3(file_path)
+                artist = audio.get("TPE1")  # TPE1 is the 'Artist' tag
+
+                if artist:
+                    artist_name = artist.text[0].strip()
+                    # Duplicate filenames get a number appended
+                    if planner.plan(file_path, numbered_names(artist_name, ".mp3")) is None:
+                        print(f"'{filename}' is already named after its artist.")
+                    else:
+                        planned += 1
+                else:
+                    print(f"No artist tag found for '{filename}' — skipping.")
+
+            except Exception as e:
+                print(f"Error reading '{filename}': {e}")
+            if planned >= FLUSH_EVERY:
+                apply_planned()
+                planned = 0
+finally:
+    # Rename the rest, also when interrupted
+    journal_path = apply_planned()
+    if journal_path:
+        print(f"Undo with: python general_file_management/rename_planner.py {journal_path}")
 
 print("\nAll files processed.")
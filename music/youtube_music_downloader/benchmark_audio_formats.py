@@ -0,0 +1,192 @@
+"""Compare per-track wall time of the audio_format modes
+
+Every track is downloaded once per distinct --format selection (raw audio +
+info JSON, like track mode), then each mode post-processes its own copy of
+the raw file with exactly the arguments the downloader uses, so the
+post-processing times are not skewed by network noise.
+
+    python benchmark_audio_formats.py URL [URL ...] --modes auto remux mp3
+
+yt-dlp / ffmpeg paths are read from config.yml unless given on the command
+line. Thumbnail embedding fetches the thumbnail, so post-processing still
+includes one small request per track (as it does in real runs).
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from youtube_music_downloader_with_ytdlp import audio_format_args, download_format
+
+
+def run(cmd):
+    """Run a yt-dlp command, returning (seconds, returncode, output)"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    return time.perf_counter() - started, result.returncode, result.stdout
+
+
+def fetch_raw(ytdlp, url, selection, target_dir):
+    """Download the raw stream + info JSON; returns (seconds, info_json)"""
+    target_dir.mkdir(parents=True, exist_ok=True)
+    seconds, returncode, output = run(
+        [
+            ytdlp,
+            "--format",
+            selection,
+            "--write-info-json",
+            "--output",
+            str(target_dir / "%(id)s.%(ext)s"),
+            "--output",
+            f"infojson:{target_dir / '%(id)s'}",
+            "--no-playlist",
+            url,
+        ]
+    )
+    info_files = list(target_dir.glob("*.info.json"))
+    if returncode != 0 or not info_files:
+        print(f"✗ Download failed for {url}")
+        print(output.strip().splitlines()[-1] if output.strip() else "")
+        return seconds, None
+    return seconds, info_files[0]
+
+
+def postprocess(ytdlp, ffmpeg, mode, quality, info_json, work_dir):
+    """Post-process a copy of the raw file; returns (seconds, output file)"""
+    video_id = json.loads(info_json.read_text(encoding="utf-8"))["id"]
+    if work_dir.exists():
+        shutil.rmtree(work_dir)
+    work_dir.mkdir(parents=True)
+    for raw in info_json.parent.glob(f"{video_id}.*"):
+        if not raw.name.endswith(".info.json"):
+            shutil.copy2(raw, work_dir / raw.name)
+
+    cmd = [
+        ytdlp,
+        "--load-info-json",
+        str(info_json),
+        "--format",
+        download_format(mode),
+        *audio_format_args(mode, quality),
+        "--embed-thumbnail",
+        "--embed-metadata",
+        "--add-metadata",
+        "--output",
+        str(work_dir / "%(id)s.%(ext)s"),
+    ]
+    if ffmpeg:
+        cmd.extend(["--ffmpeg-location", ffmpeg])
+    seconds, returncode, output = run(cmd)
+    if returncode != 0:
+        print(f"✗ {mode}: post-processing failed for {video_id}")
+        return seconds, None
+    files = [p for p in work_dir.iterdir() if p.is_file()]
+    return seconds, max(files, key=lambda p: p.stat().st_mtime) if files else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("urls", nargs="+", help="track URLs to benchmark")
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=["auto", "remux", "mp3"],
+        help="audio_format values to compare (default: auto remux mp3)",
+    )
+    parser.add_argument(
+        "--quality", default="0", help="audio_quality for transcoding modes"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=3, help="post-processing runs per track"
+    )
+    parser.add_argument("--config", default="config.yml")
+    parser.add_argument("--ytdlp", help="yt-dlp executable (default: from config)")
+    parser.add_argument("--ffmpeg", help="ffmpeg location (default: from config)")
+    args = parser.parse_args()
+
+    config = {}
+    if Path(args.config).exists():
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    ytdlp = args.ytdlp or config.get("ytdlp_path") or "yt-dlp"
+    ffmpeg = args.ffmpeg or config.get("ffmpeg_path") or ""
+
+    results = {
+        mode: {"download": [], "postprocess": [], "bytes": []} for mode in args.modes
+    }
+    work_root = Path(tempfile.mkdtemp(prefix="audio_bench_"))
+    try:
+        for index, url in enumerate(args.urls):
+            print(f"[{index + 1}/{len(args.urls)}] {url}")
+            downloads = {}
+            for mode in args.modes:
+                selection = download_format(mode)
+                if selection not in downloads:
+                    raw_dir = work_root / "raw" / str(len(downloads)) / str(index)
+                    downloads[selection] = fetch_raw(ytdlp, url, selection, raw_dir)
+                download_s, info_json = downloads[selection]
+                if info_json is None:
+                    continue
+
+                timings = []
+                output = None
+                for _ in range(max(1, args.runs)):
+                    seconds, output = postprocess(
+                        ytdlp, ffmpeg, mode, args.quality, info_json, work_root / mode
+                    )
+                    if output is None:
+                        break
+                    timings.append(seconds)
+                if not timings:
+                    continue
+                results[mode]["download"].append(download_s)
+                results[mode]["postprocess"].append(statistics.median(timings))
+                results[mode]["bytes"].append(output.stat().st_size)
+                print(
+                    f"  {mode:>8}: download {download_s:6.2f}s, "
+                    f"post-process {statistics.median(timings):6.2f}s -> {output.suffix}"
+                )
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    print("\n" + "-" * 72)
+    print(
+        f"{'mode':>8} {'tracks':>6} {'download s':>11} {'post-proc s':>12} "
+        f"{'total s':>8} {'avg MiB':>8}"
+    )
+    print("-" * 72)
+    for mode, data in results.items():
+        if not data["postprocess"]:
+            print(f"{mode:>8} {0:>6}  (no successful tracks)")
+            continue
+        download_s = statistics.mean(data["download"])
+        postprocess_s = statistics.mean(data["postprocess"])
+        print(
+            f"{mode:>8} {len(data['postprocess']):>6} {download_s:>11.2f} "
+            f"{postprocess_s:>12.2f} {download_s + postprocess_s:>8.2f} "
+            f"{statistics.mean(data['bytes']) / 1024 / 1024:>8.2f}"
+        )
+    print("-" * 72)
+    print("Per-track means; post-processing is the median of --runs runs")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
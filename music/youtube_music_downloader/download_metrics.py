@@ -0,0 +1,220 @@
+import json
+import re
+import threading
+import time
+
+UNITS = {
+    "B": 1,
+    "KiB": 1024,
+    "MiB": 1024**2,
+    "GiB": 1024**3,
+    "KB": 1000,
+    "MB": 1000**2,
+    "GB": 1000**3,
+}
+
+# "[download]  45.3% of    3.45MiB at    1.23MiB/s ETA 00:02"
+# "[download] 100% of    3.45MiB in 00:00:02 at 1.50MiB/s"
+PROGRESS_PATTERN = re.compile(
+    r"\[download\]\s+(?P<pct>[\d.]+)%\s+of\s+~?\s*(?P<size>[\d.]+)(?P<size_unit>[KMG]?i?B)"
+    r"(?:.*?\bat\s+(?P<speed>[\d.]+)(?P<speed_unit>[KMG]?i?B)/s)?"
+)
+
+
+def parse_progress_line(line):
+    """Parse a yt-dlp progress line into (percent, total_bytes, bytes_per_s)
+
+    Returns None if the line is not a progress line. bytes_per_s is None
+    when yt-dlp did not print a speed (e.g. "Unknown B/s").
+    """
+    match = PROGRESS_PATTERN.search(line)
+    if not match:
+        return None
+    total = float(match.group("size")) * UNITS.get(match.group("size_unit"), 1)
+    speed = None
+    if match.group("speed"):
+        speed = float(match.group("speed")) * UNITS.get(match.group("speed_unit"), 1)
+    return float(match.group("pct")), int(total), speed
+
+
+class EventLog:
+    """Thread-safe JSON lines event stream (one object per line)
+
+    Every event has "ts" (unix time) and "event"; the rest are event
+    specific fields. With no path the events are dropped, so callers can
+    emit unconditionally.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    def emit(self, event, **fields):
+        if self.file is None:
+            return
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class PlaylistMetrics:
+    """Per-playlist timing, throughput, retry and failure counters
+
+    Track timeline: started -> download finished -> done (post-processing
+    finished). Each step emits an event; summary() aggregates them for the
+    playlist_done event and the end of run report.
+    """
+
+    def __init__(self, events, playlist_id, title=""):
+        self.events = events
+        self.playlist_id = playlist_id
+        self.title = title
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.tracks = {}
+        self.done = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes = 0
+        self.download_seconds = 0.0
+        self.postprocess_seconds = 0.0
+        self.latencies = []
+
+    def _track(self, video_id):
+        return self.tracks.setdefault(video_id, {"started": time.time()})
+
+    def track_started(self, video_id):
+        with self.lock:
+            if video_id in self.tracks:
+                return
+            self._track(video_id)
+        self.events.emit("track_start", playlist_id=self.playlist_id, video_id=video_id)
+
+    def download_progress(self, video_id, total_bytes, bytes_per_s):
+        """Remember the latest size/speed seen for the track"""
+        with self.lock:
+            track = self._track(video_id)
+            track["bytes"] = total_bytes
+            if bytes_per_s:
+                track["speed"] = bytes_per_s
+
+    def download_finished(self, video_id, total_bytes=None, seconds=None):
+        with self.lock:
+            track = self._track(video_id)
+            if "download_end" in track:
+                return
+            track["download_end"] = time.time()
+            if total_bytes:
+                track["bytes"] = total_bytes
+            if seconds is None:
+                seconds = track["download_end"] - track["started"]
+            track["download_s"] = seconds
+            size = track.get("bytes") or 0
+            speed = size / seconds if seconds else track.get("speed")
+        self.events.emit(
+            "download_done",
+            playlist_id=self.playlist_id,
+            video_id=video_id,
+            bytes=size,
+            seconds=round(seconds, 3),
+            bytes_per_s=round(speed) if speed else None,
+        )
+
+    def postprocess_started(self, video_id):
+        """Mark the start of post-processing (ends the queue wait)"""
+        with self.lock:
+            self._track(video_id).setdefault("postprocess_start", time.time())
+
+    def retry(self, video_id, message=""):
+        with self.lock:
+            self.retries += 1
+        self.events.emit(
+            "retry",
+            playlist_id=self.playlist_id,
+            video_id=video_id,
+            message=message[:300],
+        )
+
+    def track_done(self, video_id, path=""):
+        now = time.time()
+        with self.lock:
+            track = self._track(video_id)
+            if track.get("finished"):
+                return
+            track["finished"] = True
+            latency = now - track["started"]
+            download_s = track.get("download_s")
+            postprocess_start = track.get(
+                "postprocess_start", track.get("download_end")
+            )
+            postprocess_s = now - postprocess_start if postprocess_start else None
+            queue_wait_s = (
+                postprocess_start - track["download_end"]
+                if postprocess_start and "download_end" in track
+                else None
+            )
+            self.done += 1
+            self.bytes += track.get("bytes") or 0
+            self.latencies.append(latency)
+            if download_s:
+                self.download_seconds += download_s
+            if postprocess_s:
+                self.postprocess_seconds += postprocess_s
+        self.events.emit(
+            "track_done",
+            playlist_id=self.playlist_id,
+            video_id=video_id,
+            path=str(path),
+            latency_s=round(latency, 3),
+            download_s=round(download_s, 3) if download_s else None,
+            postprocess_s=round(postprocess_s, 3) if postprocess_s else None,
+            queue_wait_s=round(queue_wait_s, 3) if queue_wait_s else None,
+        )
+
+    def track_failed(self, video_id, reason=""):
+        with self.lock:
+            track = self._track(video_id)
+            if track.get("finished"):
+                return
+            track["finished"] = True
+            self.failed += 1
+        self.events.emit(
+            "track_failed",
+            playlist_id=self.playlist_id,
+            video_id=video_id,
+            reason=str(reason)[:300],
+        )
+
+    def summary(self):
+        with self.lock:
+            elapsed = time.time() - self.started_at
+            latencies = sorted(self.latencies)
+            return {
+                "playlist_id": self.playlist_id,
+                "title": self.title,
+                "tracks_done": self.done,
+                "tracks_failed": self.failed,
+                "retries": self.retries,
+                "bytes": self.bytes,
+                "elapsed_s": round(elapsed, 3),
+                "bytes_per_s": round(self.bytes / elapsed) if elapsed else 0,
+                "download_s": round(self.download_seconds, 3),
+                "postprocess_s": round(self.postprocess_seconds, 3),
+                "latency_p50_s": (
+                    round(latencies[len(latencies) // 2], 3) if latencies else None
+                ),
+                "latency_max_s": round(latencies[-1], 3) if latencies else None,
+            }
+
+    def finish(self, success):
+        summary = self.summary()
+        self.events.emit("playlist_done", success=bool(success), **summary)
+        return summary
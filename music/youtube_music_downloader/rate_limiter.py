@@ -0,0 +1,117 @@
+import re
+import threading
+import time
+
+# Output that means YouTube is throttling us, not that one video is broken
+THROTTLE_PATTERN = re.compile(
+    r"HTTP Error 429|Too Many Requests|Sign in to confirm|rate[- ]limit",
+    re.IGNORECASE,
+)
+
+
+def is_throttle_message(text):
+    """True if a yt-dlp message looks like rate limiting"""
+    return bool(text) and bool(THROTTLE_PATTERN.search(text))
+
+
+def is_throttle_line(line):
+    """is_throttle_message for one line of yt-dlp stdout
+
+    Only ERROR: and WARNING: lines count; the other lines carry titles and
+    file names, and a song called "Rate Limit" is not a throttle.
+    """
+    return line.startswith(("ERROR:", "WARNING:")) and is_throttle_message(line)
+
+
+class AdaptiveRateLimiter:
+    """Token bucket shared by every yt-dlp request, with adaptive rate
+
+    acquire() blocks until a token is available. The refill rate starts at
+    ``rate`` requests/s and adapts AIMD-style:
+      - throttled(): halve the rate (down to min_rate) and pause everyone
+        for an exponentially growing backoff (base * 2^n, capped)
+      - success(): add ``increase`` to the rate (up to max_rate) and reset
+        the backoff exponent
+    """
+
+    def __init__(
+        self,
+        rate=1.0,
+        burst=2,
+        min_rate=0.05,
+        max_rate=4.0,
+        increase=0.05,
+        backoff_base=30.0,
+        backoff_max=1800.0,
+    ):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.min_rate = float(min_rate)
+        self.max_rate = max(float(max_rate), self.rate)
+        self.increase = float(increase)
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+
+        self.lock = threading.Lock()
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.consecutive_throttles = 0
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+
+    def acquire(self):
+        """Wait for a token; returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self):
+        """Back off after a throttling signal; returns the pause in seconds
+
+        Workers that were already in flight when the pause started report
+        the same throttling wave, so they don't escalate the backoff again.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = min(
+                self.backoff_max,
+                self.backoff_base * (2**self.consecutive_throttles),
+            )
+            self.consecutive_throttles += 1
+            self.paused_until = now + pause
+            self.tokens = 0
+            return pause
+
+    def success(self):
+        """Ramp the rate up again after a healthy request"""
+        with self.lock:
+            if time.monotonic() < self.paused_until:
+                # Started before the pause; says nothing about recovery
+                return
+            self.consecutive_throttles = 0
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "rate": round(self.rate, 3),
+                "paused_s": round(max(0.0, self.paused_until - time.monotonic()), 1),
+            }
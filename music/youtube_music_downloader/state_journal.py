@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class StateJournal:
+    """Crash-safe state store: a JSON snapshot plus an append-only journal
+
+    Every change is appended to the journal as one JSON line and fsynced, so a
+    write costs O(1) no matter how large the state is. A crash can at worst
+    leave a torn last line, which is ignored on replay. Every
+    ``compact_every`` changes the full state is written to the snapshot
+    through a temp file + os.replace, so the snapshot is never half-written,
+    and the journal is truncated.
+
+    The snapshot is plain indented JSON with the same schema the downloader
+    always used, so an existing download_state.json is loaded as-is.
+
+    Supported operations (``path`` is a list of keys from the root):
+      set    - state[path] = value
+      add    - append value to the list at path if not already present
+      delete - remove the key at path (no-op if missing)
+    """
+
+    def __init__(self, snapshot_path, journal_path=None, compact_every=200):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = Path(
+            journal_path or self.snapshot_path.with_suffix(".journal")
+        )
+        self.compact_every = max(1, int(compact_every))
+        self.state = {}
+        self.lock = threading.RLock()
+        self._pending_ops = 0
+        # Per-thread list of journal lines waiting for the end of a batch()
+        self._local = threading.local()
+        self.read_only = False
+
+    def load(self, default_state, read_only=False):
+        """Load snapshot + journal, returning the state dict
+
+        Missing keys from ``default_state`` are filled in. Returns a tuple
+        (state, notes) where notes are human readable messages about what
+        happened (fresh state, corrupt snapshot, replayed entries, ...).
+        With read_only nothing on disk is touched (a corrupt snapshot is not
+        moved aside, a torn journal tail is not cut) and any later write
+        raises.
+        """
+        self.read_only = read_only
+        notes = []
+        state = None
+
+        if self.snapshot_path.exists():
+            try:
+                content = self.snapshot_path.read_text(encoding="utf-8").strip()
+                if content:
+                    state = json.loads(content)
+                else:
+                    notes.append("State file exists but is empty, creating new state")
+            except (json.JSONDecodeError, ValueError) as e:
+                if read_only:
+                    notes.append(f"Could not parse state file ({e}), ignoring it")
+                else:
+                    backup = self.snapshot_path.with_suffix(".corrupt.json")
+                    os.replace(self.snapshot_path, backup)
+                    notes.append(
+                        f"Could not parse state file ({e}), moved it to {backup.name}"
+                    )
+
+        if not isinstance(state, dict):
+            state = {}
+        for key, value in default_state.items():
+            state.setdefault(key, json.loads(json.dumps(value)))
+
+        replayed = 0
+        if self.journal_path.exists():
+            good_offset = 0
+            torn = False
+            with open(self.journal_path, "rb") as f:
+                for raw in f:
+                    try:
+                        if not raw.endswith(b"\n"):
+                            raise ValueError("incomplete line")
+                        if raw.strip():
+                            entry = json.loads(raw.decode("utf-8"))
+                            self._apply(state, entry)
+                            replayed += 1
+                    except (ValueError, UnicodeDecodeError):
+                        # Torn write from a crash - everything before it is intact
+                        torn = True
+                        break
+                    good_offset += len(raw)
+            if torn:
+                if not read_only:
+                    # Cut the torn tail so new entries don't get glued onto it
+                    with open(self.journal_path, "r+b") as f:
+                        f.truncate(good_offset)
+                notes.append("Ignored an incomplete journal entry")
+        if replayed:
+            notes.append(f"Replayed {replayed} journal entries")
+
+        with self.lock:
+            self.state = state
+            self._pending_ops = replayed
+        return state, notes
+
+    def _apply(self, state, entry):
+        op = entry.get("op")
+        path = entry.get("path") or []
+        if not path:
+            return
+        parent = state
+        for key in path[:-1]:
+            if op == "delete" and key not in parent:
+                return
+            parent = parent.setdefault(key, {})
+        key = path[-1]
+        if op == "set":
+            parent[key] = entry.get("value")
+        elif op == "add":
+            items = parent.setdefault(key, [])
+            if entry.get("value") not in items:
+                items.append(entry.get("value"))
+        elif op == "delete":
+            parent.pop(key, None)
+
+    def record(self, op, path, value=None):
+        """Apply one change in memory and append it to the journal"""
+        entry = {"op": op, "path": list(path)}
+        if op != "delete":
+            entry["value"] = value
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+
+        with self.lock:
+            self._apply(self.state, entry)
+            batch = getattr(self._local, "batch", None)
+            if batch is not None:
+                batch.append(line)
+                return
+            self._write_lines([line])
+
+    @contextmanager
+    def batch(self):
+        """Group this thread's changes into a single journal write + fsync
+
+        Changes are applied in memory right away and their journal lines are
+        kept per thread until the batch ends. The journal lock is not held
+        while the caller's code runs, so other threads keep recording; their
+        lines may reach the journal before the batch's. Callers that change
+        the same keys from several threads must hold their own lock around
+        the whole batch, taken before entering it.
+        """
+        if getattr(self._local, "batch", None) is not None:
+            # Nested batch - the outer one commits
+            yield
+            return
+        self._local.batch = []
+        try:
+            yield
+        finally:
+            lines, self._local.batch = self._local.batch, None
+            if lines:
+                with self.lock:
+                    self._write_lines(lines)
+
+    def _write_lines(self, lines):
+        self._check_writable()
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending_ops += len(lines)
+        if self._pending_ops >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Atomically rewrite the snapshot and truncate the journal"""
+        self._check_writable()
+        with self.lock:
+            tmp_path = self.snapshot_path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            # Only drop the journal once the snapshot containing it is durable
+            if self.journal_path.exists():
+                self.journal_path.unlink()
+            self._pending_ops = 0
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError(f"{self.snapshot_path} was loaded read-only")
@@ -1,19 +1,255 @@
 import yaml
+import argparse
+import contextlib
 import subprocess
 import json
+import multiprocessing
 import os
 import re
+import shutil
 import sys
+import tempfile
+import threading
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from tqdm import tqdm
 import time
 
+from download_metrics import EventLog, PlaylistMetrics, parse_progress_line
+from rate_limiter import AdaptiveRateLimiter, is_throttle_line, is_throttle_message
+from state_journal import StateJournal
+
+
+class TrackLineParser:
+    """Follow yt-dlp output and report every finished or failed track
+
+    yt-dlp announces each video with a "[youtube] <id>: ..." line, then
+    prints where the file lands ("[download] Destination:",
+    "[ExtractAudio] Destination:", "[VideoRemuxer] ...; Destination:",
+    "... has already been downloaded").
+    A track counts as done once the next video starts (or the output ends)
+    with a destination seen and no ERROR for its ID.
+    """
+
+    video_pattern = re.compile(r"^\[youtube\] ([\w-]{11}): ")
+    error_pattern = re.compile(r"^ERROR: \[youtube\] ([\w-]{11}): (.*)$")
+    destination_patterns = [
+        re.compile(r"^\[download\] Destination: (.+)$"),
+        re.compile(r"^\[download\] (.+) has already been downloaded"),
+        re.compile(r"^\[ExtractAudio\] Destination: (.+)$"),
+        re.compile(
+            r"^\[ExtractAudio\] Not converting audio (.+); file is already in target format"
+        ),
+        re.compile(
+            r"^\[VideoRemuxer\] Remuxing video from \w+ to \w+; Destination: (.+)$"
+        ),
+    ]
+
+    def __init__(self, on_done=None, on_failed=None, video_id=None, on_start=None):
+        self.on_done = on_done
+        self.on_failed = on_failed
+        self.on_start = on_start
+        self.current_id = video_id
+        self.current_path = None
+        self.done = {}
+        self.failed = {}
+
+    def feed(self, line):
+        match = self.video_pattern.match(line)
+        if match and match.group(1) != self.current_id:
+            self._finish_current()
+            self.current_id = match.group(1)
+            if self.on_start:
+                self.on_start(self.current_id)
+            return
+
+        match = self.error_pattern.match(line)
+        if match:
+            video_id, reason = match.groups()
+            self.failed[video_id] = reason
+            if self.on_failed:
+                self.on_failed(video_id, reason)
+            return
+
+        for pattern in self.destination_patterns:
+            match = pattern.match(line)
+            if match:
+                # Later post-processor destinations replace the raw download
+                self.current_path = match.group(1).strip().strip('"')
+                return
+
+    def close(self):
+        """Flush the last track once the process output has ended"""
+        self._finish_current()
+
+    def _finish_current(self):
+        video_id, path = self.current_id, self.current_path
+        self.current_id = self.current_path = None
+        if not video_id or not path or video_id in self.failed:
+            return
+        self.done[video_id] = path
+        if self.on_done:
+            self.on_done(video_id, path)
+
+
+# yt-dlp errors for videos that will not come back on a retry
+PERMANENT_ERROR_PATTERN = re.compile(
+    r"Private video|Video unavailable|This video is not available|"
+    r"removed by the uploader|account associated with this video has been terminated|"
+    r"not available in your country|blocked it in your country",
+    re.IGNORECASE,
+)
+
+
+def is_permanent_error(reason):
+    """True if a track's error means retrying it is pointless"""
+    return bool(reason) and bool(PERMANENT_ERROR_PATTERN.search(reason))
+
+
+# Files counted as downloaded tracks when scanning playlist folders
+AUDIO_EXTENSIONS = (
+    ".opus",
+    ".m4a",
+    ".mp3",
+    ".flac",
+    ".ogg",
+    ".wav",
+    ".aac",
+    ".webm",
+)
+
+# Values accepted for audio_format besides "auto" and "remux"
+AUDIO_FORMATS = ("mp3", "flac", "wav", "m4a", "opus", "vorbis", "aac", "alac")
+
+
+def download_format(audio_format):
+    """yt-dlp --format selection for the audio_format setting
+
+    "remux" only takes Opus or AAC audio streams, the two codecs its stream
+    copy can put into an audio container; a track without either fails.
+    """
+    if audio_format == "remux":
+        return "bestaudio[acodec=opus]/bestaudio[acodec^=mp4a]"
+    return "bestaudio/best"
+
+
+def audio_format_args(audio_format, audio_quality="0"):
+    """yt-dlp audio extraction arguments for audio_format / audio_quality
+
+    "auto" extracts with --audio-format best, which leaves the choice to
+    yt-dlp's ExtractAudio: it copies the stream when its codec has a
+    container of its own and converts it otherwise. "remux" skips
+    ExtractAudio altogether: the Opus stream is only rewrapped from .webm to
+    .opus (ffmpeg stream copy, which also lets the thumbnail be embedded)
+    and AAC downloads stay the .m4a they already are. audio_quality does not
+    apply to either. Any other format is transcoded at audio_quality.
+    """
+    if audio_format == "remux":
+        return ["--remux-video", "webm>opus"]
+    if audio_format == "auto":
+        return ["--extract-audio", "--audio-format", "best"]
+    return [
+        "--extract-audio",
+        "--audio-format",
+        audio_format,
+        "--audio-quality",
+        str(audio_quality),
+    ]
+
+
+def run_postprocess_job(backend, ytdlp_path, ffmpeg_path, args, video_id):
+    """Post-process one downloaded track from its info JSON
+
+    Runs in a worker process of the deferred post-processing pool (and in a
+    thread for inline track mode). Returns (final_path, error); final_path
+    is None if post-processing failed.
+    """
+    if backend == "library":
+        return run_postprocess_library(args, ffmpeg_path)
+
+    result = subprocess.run(
+        [ytdlp_path, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    lines = [line.strip() for line in result.stdout.splitlines()]
+    if result.returncode != 0:
+        errors = [line for line in lines if "ERROR" in line]
+        return None, errors[-1] if errors else f"yt-dlp exited with {result.returncode}"
+
+    parser = TrackLineParser(video_id=video_id)
+    for line in lines:
+        parser.feed(line)
+    parser.close()
+    path = next(iter(parser.done.values()), None)
+    return path, "" if path else "yt-dlp did not report the output file"
+
+
+def run_postprocess_library(args, ffmpeg_path=""):
+    """Library backend version of run_postprocess_job"""
+    from yt_dlp import YoutubeDL, parse_options
+    from yt_dlp.postprocessor.common import PostProcessor
+
+    parsed = parse_options(args)
+    done = {}
+
+    class TrackDone(PostProcessor):
+        def run(inner, info):
+            done["path"] = info.get("filepath")
+            return [], info
+
+    opts = dict(parsed.ydl_opts)
+    opts.update({"quiet": True, "noprogress": True, "no_warnings": True})
+    if ffmpeg_path:
+        opts.setdefault("ffmpeg_location", ffmpeg_path)
+    try:
+        with YoutubeDL(opts) as ydl:
+            ydl.add_post_processor(TrackDone(), when="after_move")
+            returncode = ydl.download_with_info_file(parsed.options.load_info_filename)
+    except Exception as e:
+        return None, str(e)
+    if returncode != 0 or not done.get("path"):
+        return None, "post-processing failed"
+    return done["path"], ""
+
 
 class YouTubePlaylistDownloader:
-    def __init__(self, config_path="config.yml"):
+    def __init__(self, config_path="config.yml", read_only=False):
+        # read_only (the plan command): load config and state without
+        # creating root_path, the state file or the events file
         self.config_path = config_path
+        self.read_only = read_only
         self.load_config()
         self.state_file = Path("download_state.json")
+        # Guards self.state and the state file when playlists download in parallel
+        self.state_lock = threading.RLock()
+        # Track mode pools, created on first use and shared by all playlists
+        self._fetch_pool = None
+        self._postprocess_pool = None
+        # Deferred post-processing: worker processes and the jobs in flight
+        self._postprocess_process_pool = None
+        self._postprocess_jobs = {}
+        self._postprocess_dirs = set()
+        self.postprocess_counts = {"done": 0, "failed": 0}
+        # Per-thread YoutubeDL instances reused by the library backend
+        self._ydl_local = threading.local()
+        # Structured events (JSON lines) and per-playlist metrics of this run
+        self.events = EventLog(None if read_only else self.events_file or None)
+        self.playlist_metrics = {}
+        self.run_summaries = []
+        # One token bucket paces every request yt-dlp makes to YouTube
+        self.rate_limiter = AdaptiveRateLimiter(
+            rate=self.requests_per_second,
+            burst=self.request_burst,
+            min_rate=self.min_requests_per_second,
+            max_rate=self.max_requests_per_second,
+            backoff_base=self.backoff_base_seconds,
+            backoff_max=self.backoff_max_seconds,
+        )
         self.load_state()
 
     def load_config(self):
@@ -46,6 +282,11 @@ class YouTubePlaylistDownloader:
                 self.audio_format = "auto"
             else:
                 self.audio_format = str(audio_format_raw).lower()
+            if self.audio_format not in ("auto", "remux", *AUDIO_FORMATS):
+                print(
+                    f"Warning: Unknown audio_format '{self.audio_format}', using 'auto'"
+                )
+                self.audio_format = "auto"
 
             audio_quality_raw = config.get("audio_quality")
             if audio_quality_raw is None or audio_quality_raw == "":
@@ -55,8 +296,168 @@ class YouTubePlaylistDownloader:
 
             self.extra_args = config.get("extra_args", "")
 
+            # Number of playlists downloaded at the same time (1 = sequential)
+            try:
+                self.max_parallel_playlists = max(
+                    1, int(config.get("max_parallel_playlists", 1) or 1)
+                )
+            except (TypeError, ValueError):
+                print("Warning: Invalid max_parallel_playlists, using 1")
+                self.max_parallel_playlists = 1
+
+            # Number of state changes journaled before the snapshot is rewritten
+            try:
+                self.state_compact_every = max(
+                    1, int(config.get("state_compact_every", 200) or 200)
+                )
+            except (TypeError, ValueError):
+                print("Warning: Invalid state_compact_every, using 200")
+                self.state_compact_every = 200
+
+            # "subprocess" runs the yt-dlp executable, "library" drives the
+            # yt_dlp Python package in-process with progress hooks
+            self.backend = str(config.get("backend", "subprocess")).lower()
+            if self.backend not in ("subprocess", "library"):
+                print(f"Warning: Unknown backend '{self.backend}', using 'subprocess'")
+                self.backend = "subprocess"
+            if self.backend == "library":
+                try:
+                    import yt_dlp  # noqa: F401
+                except ImportError:
+                    print(
+                        "Error: backend 'library' needs the yt-dlp Python package "
+                        "(pip install yt-dlp)"
+                    )
+                    sys.exit(1)
+
+            # Optional JSON lines file receiving structured progress events
+            self.events_file = config.get("events_file") or ""
+            if self.os_type == "linux" and self.events_file.startswith("~"):
+                self.events_file = os.path.expanduser(self.events_file)
+
+            # Number of playlists whose info is looked up at the same time
+            try:
+                self.max_parallel_info_fetches = max(
+                    1, int(config.get("max_parallel_info_fetches", 8) or 8)
+                )
+            except (TypeError, ValueError):
+                print("Warning: Invalid max_parallel_info_fetches, using 8")
+                self.max_parallel_info_fetches = 8
+
+            # Request pacing: start at requests_per_second, halve the rate and
+            # pause (backoff_base_seconds, doubling up to backoff_max_seconds)
+            # whenever YouTube throttles, and creep back up while healthy
+            rate_defaults = {
+                "requests_per_second": 1.0,
+                "min_requests_per_second": 0.05,
+                "max_requests_per_second": 4.0,
+                "request_burst": 2,
+                "backoff_base_seconds": 30.0,
+                "backoff_max_seconds": 1800.0,
+            }
+            for key, default in rate_defaults.items():
+                try:
+                    value = float(config.get(key, default) or default)
+                    if value <= 0:
+                        raise ValueError(key)
+                except (TypeError, ValueError):
+                    print(f"Warning: Invalid {key}, using {default}")
+                    value = default
+                setattr(self, key, value)
+            self.max_requests_per_second = max(
+                self.max_requests_per_second, self.requests_per_second
+            )
+
+            # How often a throttled request is retried after backing off
+            try:
+                self.throttle_retries = max(0, int(config.get("throttle_retries", 3)))
+            except (TypeError, ValueError):
+                print("Warning: Invalid throttle_retries, using 3")
+                self.throttle_retries = 3
+
+            # Hours a channel's playlist list is reused before enumerating again
+            try:
+                self.channel_cache_ttl_hours = float(
+                    config.get("channel_cache_ttl_hours", 24)
+                )
+            except (TypeError, ValueError):
+                print("Warning: Invalid channel_cache_ttl_hours, using 24")
+                self.channel_cache_ttl_hours = 24.0
+
+            # Record finished tracks and only retry the missing ones next run
+            self.resume_partial = bool(config.get("resume_partial", True))
+            # Runs a failing track is retried in before it is skipped (0 = forever)
+            try:
+                self.max_track_attempts = max(
+                    0, int(config.get("max_track_attempts", 3))
+                )
+            except (TypeError, ValueError):
+                print("Warning: Invalid max_track_attempts, using 3")
+                self.max_track_attempts = 3
+
+            # Shared track library: every video is downloaded once into
+            # library_path and exposed in playlist folders as hardlink,
+            # symlink or M3U entry ("off" keeps one copy per playlist folder)
+            self.library_mode = str(config.get("library_mode", "off")).lower()
+            if self.library_mode not in ("off", "hardlink", "symlink", "m3u"):
+                print(
+                    f"Warning: Unknown library_mode '{self.library_mode}', using 'off'"
+                )
+                self.library_mode = "off"
+            library_path = config.get("library_path") or str(
+                self.root_path / "_library"
+            )
+            if self.os_type == "linux" and library_path.startswith("~"):
+                library_path = os.path.expanduser(library_path)
+            self.library_path = Path(library_path)
+
+            # Re-check completed playlists and only download newly added tracks
+            self.sync_mode = bool(config.get("sync_mode", False))
+            # With sync_mode, delete files of tracks removed from the playlist
+            self.sync_prune = bool(config.get("sync_prune", False))
+
+            # "playlist" hands the whole playlist to one yt-dlp process,
+            # "track" fetches tracks in parallel and post-processes separately
+            self.download_mode = str(config.get("download_mode", "playlist")).lower()
+            if self.download_mode not in ("playlist", "track"):
+                print(
+                    f"Warning: Unknown download_mode '{self.download_mode}', using 'playlist'"
+                )
+                self.download_mode = "playlist"
+
+            try:
+                self.max_parallel_downloads = max(
+                    1, int(config.get("max_parallel_downloads", 4) or 4)
+                )
+            except (TypeError, ValueError):
+                print("Warning: Invalid max_parallel_downloads, using 4")
+                self.max_parallel_downloads = 4
+
+            try:
+                self.max_parallel_postprocess = max(
+                    1,
+                    int(config.get("max_parallel_postprocess") or os.cpu_count() or 1),
+                )
+            except (TypeError, ValueError):
+                print("Warning: Invalid max_parallel_postprocess, using CPU count")
+                self.max_parallel_postprocess = os.cpu_count() or 1
+
+            # "inline": yt-dlp extracts audio and embeds thumbnail/metadata
+            # right after each download; "deferred": only raw audio is
+            # downloaded and the ffmpeg work goes to a persistent queue that
+            # a pool of max_parallel_postprocess processes works through
+            self.postprocess_mode = str(
+                config.get("postprocess_mode", "inline")
+            ).lower()
+            if self.postprocess_mode not in ("inline", "deferred"):
+                print(
+                    f"Warning: Unknown postprocess_mode '{self.postprocess_mode}', using 'inline'"
+                )
+                self.postprocess_mode = "inline"
+
             # Create root directory if it doesn't exist
-            self.root_path.mkdir(parents=True, exist_ok=True)
+            if not self.read_only:
+                self.root_path.mkdir(parents=True, exist_ok=True)
 
             print(f"✓ Configuration loaded successfully")
             print(f"  OS Type: {self.os_type}")
@@ -72,8 +473,29 @@ class YouTubePlaylistDownloader:
             if self.ffmpeg_path:
                 print(f"  ffmpeg: {self.ffmpeg_path}")
             print(f"  Audio Format: {self.audio_format}")
-            if self.audio_format != "auto":
+            if self.audio_format not in ("auto", "remux"):
                 print(f"  Audio Quality: {self.audio_quality}")
+            if self.max_parallel_playlists > 1:
+                print(f"  Parallel Playlists: {self.max_parallel_playlists}")
+            if self.sync_mode:
+                print(
+                    f"  Sync Mode: on{' (prune removed tracks)' if self.sync_prune else ''}"
+                )
+            if self.library_mode != "off":
+                print(f"  Library: {self.library_path} ({self.library_mode})")
+            if self.events_file:
+                print(f"  Events: {self.events_file}")
+            print(f"  Backend: {self.backend}")
+            print(
+                f"  Rate Limit: {self.requests_per_second:g} req/s "
+                f"(max {self.max_requests_per_second:g})"
+            )
+            print(f"  Download Mode: {self.download_mode}")
+            if self.download_mode == "track":
+                print(f"  Parallel Downloads: {self.max_parallel_downloads}")
+            if self.download_mode == "track" or self.postprocess_mode == "deferred":
+                print(f"  Parallel Post-processing: {self.max_parallel_postprocess}")
+            print(f"  Post-processing: {self.postprocess_mode}")
             print()
 
         except FileNotFoundError:
@@ -99,53 +521,340 @@ class YouTubePlaylistDownloader:
         return path
 
     def load_state(self):
-        """Load download state for continuity support"""
-        if self.state_file.exists():
-            try:
-                with open(self.state_file, "r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                    if content:
-                        self.state = json.loads(content)
-                    else:
-                        # File exists but is empty
-                        print(
-                            "Note: State file exists but is empty, creating new state"
-                        )
-                        self.state = {
-                            "completed_playlists": [],
-                            "partially_downloaded": {},
-                            "playlist_info": {},
-                        }
-                        self.save_state()
-            except (json.JSONDecodeError, ValueError) as e:
-                print(f"Warning: Could not parse state file ({e}), creating new state")
-                self.state = {
-                    "completed_playlists": [],
-                    "partially_downloaded": {},
-                    "playlist_info": {},
-                }
-                self.save_state()
-        else:
-            self.state = {
+        """Load download state for continuity support
+
+        The state lives in download_state.json (snapshot) plus
+        download_state.journal (changes since the last snapshot). An existing
+        download_state.json from older versions is picked up unchanged.
+        In read-only mode a missing state file is left missing.
+        """
+        is_new = not self.state_file.exists()
+        self.journal = StateJournal(
+            self.state_file, compact_every=self.state_compact_every
+        )
+        self.state, notes = self.journal.load(
+            {
                 "completed_playlists": [],
                 "partially_downloaded": {},
                 "playlist_info": {},
-            }
-            # Create the file immediately
+                "playlist_tracks": {},
+                "library": {},
+                "channel_playlists": {},
+                "postprocess_queue": {},
+                "skipped_tracks": {},
+                "run_history": [],
+            },
+            read_only=self.read_only,
+        )
+        for note in notes:
+            print(f"Note: {note}")
+
+        if self.read_only:
+            return
+        if is_new or notes:
+            # Create the file immediately / fold the replayed journal into it
             self.save_state()
+        if is_new:
             print(f"Created new state file: {self.state_file.absolute()}")
 
     def save_state(self):
-        """Save download state"""
+        """Write a full state snapshot and truncate the journal"""
+        with self.state_lock:
+            try:
+                self.journal.compact()
+                tqdm.write(
+                    f"[STATE SAVED] File written to: {self.state_file.absolute()}"
+                )
+            except Exception as e:
+                print(f"[STATE ERROR] Failed to save state: {e}")
+                import traceback
+
+                traceback.print_exc()
+
+    def update_state(self, op, path, value=None):
+        """Apply a change to the state and append it to the journal
+
+        See StateJournal for the supported operations. Use
+        ``with self.state_batch():`` to commit several changes at once.
+        """
+        with self.state_lock:
+            try:
+                self.journal.record(op, path, value)
+            except Exception as e:
+                print(f"[STATE ERROR] Failed to record state change: {e}")
+                import traceback
+
+                traceback.print_exc()
+
+    @contextlib.contextmanager
+    def state_batch(self):
+        """Group state changes into one journal write, holding state_lock
+
+        state_lock is always taken before the journal's own lock, never the
+        other way round, so use this instead of ``self.journal.batch()``.
+        """
+        with self.state_lock, self.journal.batch():
+            yield
+
+    def mark_playlist_completed(self, playlist_id):
+        """Add a playlist to completed_playlists and persist it (thread-safe)"""
+        with self.state_lock:
+            self.update_state("add", ["completed_playlists"], playlist_id)
+            return len(self.state["completed_playlists"])
+
+    def get_done_tracks(self, playlist_id):
+        """Tracks of an unfinished playlist already downloaded ({id: file})"""
+        with self.state_lock:
+            partial = self.state["partially_downloaded"].get(playlist_id, {})
+            return dict(partial.get("done", {}))
+
+    def get_skipped_tracks(self, playlist_id):
+        """Tracks given up on ({id: reason}), see record_track_failed"""
+        with self.state_lock:
+            return dict(self.state["skipped_tracks"].get(playlist_id, {}))
+
+    def get_known_tracks(self, playlist_id):
+        """Every track of the playlist downloaded so far ({id: file})"""
+        with self.state_lock:
+            known = dict(self.state["playlist_tracks"].get(playlist_id, {}))
+        known.update(self.get_done_tracks(playlist_id))
+        return known
+
+    def remember_track_count(self, playlist_id, count):
+        """Store a playlist's track count from a listing (used by plan)"""
+        with self.state_lock:
+            info = self.state["playlist_info"].get(playlist_id)
+            if info is None or info.get("track_count") == count:
+                return
+        self.update_state("set", ["playlist_info", playlist_id, "track_count"], count)
+
+    def get_queued_tracks(self, playlist_id):
+        """Tracks downloaded but still waiting for deferred post-processing"""
+        with self.state_lock:
+            queued = self.state["postprocess_queue"].get(playlist_id, {})
+            return {vid: Path(job["info_json"]).name for vid, job in queued.items()}
+
+    def finish_playlist(self, playlist_id):
+        """Mark a playlist completed and fold its finished tracks into playlist_tracks"""
+        known = self.get_known_tracks(playlist_id)
+        with self.state_batch():
+            total = self.mark_playlist_completed(playlist_id)
+            self.update_state("set", ["playlist_tracks", playlist_id], known)
+            self.update_state("delete", ["partially_downloaded", playlist_id])
+        return total
+
+    def prune_tracks(self, playlist_id, playlist_dir, video_ids, known, prefix=""):
+        """Delete the files of tracks that were removed from the playlist"""
+        with self.state_batch():
+            for video_id in video_ids:
+                path = playlist_dir / known[video_id]
+                if self.library_mode == "m3u":
+                    # Only the M3U entry goes; the library copy may be shared
+                    self.log(f"  🗑 Removed from playlist: {path.name}", prefix)
+                else:
+                    try:
+                        path.unlink()
+                        self.log(f"  🗑 Removed: {path.name}", prefix)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        self.log(f"  ⚠ Could not remove {path.name}: {e}", prefix)
+                        continue
+                self.update_state("delete", ["playlist_tracks", playlist_id, video_id])
+                self.update_state(
+                    "delete", ["partially_downloaded", playlist_id, "done", video_id]
+                )
+        if self.library_mode == "m3u":
+            self.write_playlist_m3u(playlist_id, playlist_dir)
+
+    def record_track_done(
+        self, playlist_id, video_id, path, playlist_dir=None, downloaded=True
+    ):
+        """Remember that one track of a playlist finished downloading
+
+        In library mode ``path`` is the file in the library: it is added to
+        the library index and linked into ``playlist_dir``. ``downloaded`` is
+        False for tracks taken from the library without a download.
+        """
+        metrics = self.playlist_metrics.get(playlist_id)
+        if metrics and downloaded:
+            metrics.track_done(video_id, path)
+
+        name = Path(path).name
+        if self.library_mode != "off" and playlist_dir is not None:
+            library_file = Path(path)
+            try:
+                name = self.link_into_playlist(library_file, playlist_dir, video_id)
+            except OSError as e:
+                self.log(f"  ⚠ Could not link {library_file.name}: {e}")
+            self.update_state("set", ["library", video_id], library_file.name)
+
+        with self.state_batch():
+            if playlist_id in self.state["completed_playlists"]:
+                # Finished after the playlist (sync or deferred post-processing)
+                self.update_state(
+                    "set", ["playlist_tracks", playlist_id, video_id], name
+                )
+                return
+            self.update_state(
+                "set",
+                ["partially_downloaded", playlist_id, "done", video_id],
+                name,
+            )
+            self.update_state(
+                "delete", ["partially_downloaded", playlist_id, "failed", video_id]
+            )
+            self.update_state(
+                "delete", ["partially_downloaded", playlist_id, "attempts", video_id]
+            )
+
+    def output_template(self, playlist_dir):
+        """yt-dlp output template for tracks of a playlist
+
+        In library mode every track lands in the shared library, with the
+        video ID in the name so equal titles never collide.
+        """
+        if self.library_mode != "off":
+            return str(self.library_path / "%(title)s [%(id)s].%(ext)s")
+        return str(playlist_dir / "%(title)s.%(ext)s")
+
+    def get_library_file(self, video_id):
+        """Path of a track in the shared library, or None if not downloaded"""
+        with self.state_lock:
+            name = self.state["library"].get(video_id)
+        if name:
+            path = self.library_path / name
+            if path.exists():
+                return path
+        return None
+
+    def link_into_playlist(self, library_file, playlist_dir, video_id):
+        """Expose a library file in a playlist folder
+
+        Returns the name recorded for the playlist: the link's file name, or
+        for M3U mode the path of the library file relative to the folder.
+        """
+        if self.library_mode == "m3u":
+            return os.path.relpath(library_file, playlist_dir)
+
+        # "Title [id].ext" -> "Title.ext", unless another track took that name
+        short_name = library_file.name.replace(f" [{video_id}]", "")
+        for name in (short_name, library_file.name):
+            target = playlist_dir / name
+            if not (target.exists() or target.is_symlink()):
+                break
+            if target.exists() and os.path.samefile(target, library_file):
+                return name
+        else:
+            return library_file.name
+
+        if self.library_mode == "hardlink":
+            try:
+                os.link(library_file, target)
+                return name
+            except OSError:
+                # Different file system or no hardlink support - try a symlink
+                pass
         try:
-            with open(self.state_file, "w", encoding="utf-8") as f:
-                json.dump(self.state, f, indent=2, ensure_ascii=False)
-            print(f"[STATE SAVED] File written to: {self.state_file.absolute()}")
-        except Exception as e:
-            print(f"[STATE ERROR] Failed to save state: {e}")
-            import traceback
+            target.symlink_to(os.path.relpath(library_file, playlist_dir))
+        except OSError:
+            shutil.copy2(library_file, target)
+        return name
+
+    def link_library_tracks(self, playlist_id, playlist_dir, entries, done_tracks):
+        """Link tracks that are already in the library instead of downloading
+
+        Returns {video_id: name} of the tracks that were linked.
+        """
+        linked = {}
+        for entry in entries:
+            video_id = str(entry["id"])
+            if video_id in done_tracks:
+                continue
+            library_file = self.get_library_file(video_id)
+            if library_file is None:
+                continue
+            self.record_track_done(
+                playlist_id, video_id, library_file, playlist_dir, downloaded=False
+            )
+            linked[video_id] = library_file.name
+        return linked
 
-            traceback.print_exc()
+    def write_playlist_m3u(self, playlist_id, playlist_dir):
+        """Write <folder>/<folder name>.m3u pointing at the library files"""
+        tracks = self.get_known_tracks(playlist_id)
+        playlist_dir.mkdir(parents=True, exist_ok=True)
+        m3u_path = playlist_dir / f"{playlist_dir.name}.m3u"
+        with open(m3u_path, "w", encoding="utf-8") as f:
+            f.write("#EXTM3U\n")
+            for relative_path in tracks.values():
+                f.write(f"{relative_path}\n")
+
+    def record_track_failed(self, playlist_id, video_id, reason=""):
+        """Remember that one track of a playlist failed (retried on resume)
+
+        A track that is private, removed or blocked, or that failed in
+        max_track_attempts runs, is given up on: it moves to skipped_tracks,
+        is no longer downloaded and no longer keeps its playlist from
+        completing. Returns True if the track was skipped.
+        """
+        metrics = self.playlist_metrics.get(playlist_id)
+        if metrics:
+            metrics.track_failed(video_id, reason)
+        partial_path = ["partially_downloaded", playlist_id]
+        with self.state_lock:
+            partial = self.state["partially_downloaded"].get(playlist_id, {})
+            attempts = partial.get("attempts", {}).get(video_id, 0) + 1
+        skip = is_permanent_error(reason) or (
+            self.max_track_attempts and attempts >= self.max_track_attempts
+        )
+        with self.state_batch():
+            if skip:
+                self.update_state(
+                    "set", ["skipped_tracks", playlist_id, video_id], reason
+                )
+                self.update_state("delete", [*partial_path, "failed", video_id])
+                self.update_state("delete", [*partial_path, "attempts", video_id])
+            else:
+                self.update_state("set", [*partial_path, "failed", video_id], reason)
+                self.update_state(
+                    "set", [*partial_path, "attempts", video_id], attempts
+                )
+        if skip:
+            self.log(f"  ⊘ Skipping {video_id} from now on: {reason}")
+        return bool(skip)
+
+    def log(self, message="", prefix=""):
+        """Print a message, tagging every line with the worker prefix if given"""
+        if not prefix:
+            print(message)
+            return
+        for part in str(message).strip("\n").splitlines() or [""]:
+            tqdm.write(f"{prefix} {part}")
+
+    def wait_for_rate_limit(self, prefix=""):
+        """Block until the shared token bucket lets the next request through"""
+        waited = self.rate_limiter.acquire()
+        if waited >= 5:
+            self.log(f"⏳ Waited {waited:.0f}s for the rate limiter", prefix)
+
+    def report_throttle(self, message, prefix="", playlist_id=None, video_id=None):
+        """Slow every worker down after YouTube signalled rate limiting"""
+        pause = self.rate_limiter.throttled()
+        rate = self.rate_limiter.snapshot()["rate"]
+        self.log(
+            f"⚠ Throttled by YouTube, pausing requests for {pause:.0f}s "
+            f"(now {rate:g} req/s)",
+            prefix,
+        )
+        self.events.emit(
+            "throttled",
+            playlist_id=playlist_id,
+            video_id=video_id,
+            pause_s=round(pause, 1),
+            rate=rate,
+            message=str(message)[:300],
+        )
 
     def clean_filename(self, name):
         """Clean playlist name for use as directory name"""
@@ -203,8 +912,12 @@ class YouTubePlaylistDownloader:
         print(f"✓ Found {len(playlist_urls)} playlist URLs in file\n")
         return playlist_urls
 
-    def get_playlist_info(self, playlist_url):
-        """Get playlist title and ID from URL, with caching"""
+    def get_playlist_info(self, playlist_url, cache=True):
+        """Get playlist title and ID from URL, with caching
+
+        With ``cache=False`` the result is not written to the state, so the
+        caller can commit many lookups at once (see resolve_playlists).
+        """
         playlist_id = self.extract_playlist_id(playlist_url)
 
         # Check cache first
@@ -215,56 +928,36 @@ class YouTubePlaylistDownloader:
 
         print(f"Fetching info for: {playlist_url}")
 
-        cmd = [
-            self.ytdlp_path,
-            "--flat-playlist",
-            "--dump-json",
-            "--playlist-items",
-            "1",
-            playlist_url,
-        ]
-
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                check=True,
-            )
-
-            for line in result.stdout.strip().split("\n"):
-                if line:
-                    try:
-                        data = json.loads(line)
-                        # Get playlist info from the entry
-                        playlist_title = (
-                            data.get("playlist_title")
-                            or data.get("playlist")
-                            or f"Playlist_{playlist_id}"
-                        )
+            for data in self.dump_flat_playlist(playlist_url, playlist_items="1"):
+                try:
+                    # Get playlist info from the entry
+                    playlist_title = (
+                        data.get("playlist_title")
+                        or data.get("playlist")
+                        or f"Playlist_{playlist_id}"
+                    )
 
-                        # Ensure we have valid strings
-                        if not playlist_title or playlist_title == "None":
-                            playlist_title = f"Playlist_{playlist_id}"
+                    # Ensure we have valid strings
+                    if not playlist_title or playlist_title == "None":
+                        playlist_title = f"Playlist_{playlist_id}"
 
-                        playlist_info = {
-                            "id": str(playlist_id),
-                            "title": str(playlist_title),
-                            "url": playlist_url,
-                        }
+                    playlist_info = {
+                        "id": str(playlist_id),
+                        "title": str(playlist_title),
+                        "url": playlist_url,
+                    }
 
-                        # Cache the info
-                        if "playlist_info" not in self.state:
-                            self.state["playlist_info"] = {}
-                        self.state["playlist_info"][playlist_id] = playlist_info
-                        self.save_state()
+                    # Cache the info
+                    if cache:
+                        self.update_state(
+                            "set", ["playlist_info", playlist_id], playlist_info
+                        )
 
-                        return playlist_info
-                    except (json.JSONDecodeError, AttributeError, TypeError) as e:
-                        print(f"Warning: Could not parse JSON: {e}")
-                        continue
+                    return playlist_info
+                except (AttributeError, TypeError) as e:
+                    print(f"Warning: Could not parse JSON: {e}")
+                    continue
 
             # Fallback if JSON parsing fails
             playlist_info = {
@@ -274,10 +967,8 @@ class YouTubePlaylistDownloader:
             }
 
             # Cache even the fallback
-            if "playlist_info" not in self.state:
-                self.state["playlist_info"] = {}
-            self.state["playlist_info"][playlist_id] = playlist_info
-            self.save_state()
+            if cache:
+                self.update_state("set", ["playlist_info", playlist_id], playlist_info)
 
             return playlist_info
 
@@ -290,13 +981,255 @@ class YouTubePlaylistDownloader:
             }
 
             # Cache even errors
-            if "playlist_info" not in self.state:
-                self.state["playlist_info"] = {}
-            self.state["playlist_info"][playlist_id] = playlist_info
-            self.save_state()
+            if cache:
+                self.update_state("set", ["playlist_info", playlist_id], playlist_info)
 
             return playlist_info
 
+    def dump_flat_playlist(self, url, playlist_items=None):
+        """Run yt-dlp --flat-playlist --dump-json and return the parsed entries
+
+        The request goes through the rate limiter; when YouTube throttles it
+        is retried after the backoff, up to throttle_retries times.
+        Raises subprocess.CalledProcessError if yt-dlp fails.
+        """
+        for attempt in range(self.throttle_retries + 1):
+            self.wait_for_rate_limit()
+            try:
+                entries = list(self.iter_flat_playlist(url, playlist_items))
+            except subprocess.CalledProcessError as e:
+                if attempt < self.throttle_retries and is_throttle_message(e.stderr):
+                    self.report_throttle(e.stderr)
+                    continue
+                raise
+            self.rate_limiter.success()
+            return entries
+
+    def iter_flat_playlist(self, url, playlist_items=None, on_start=None):
+        """Yield the --flat-playlist --dump-json entries of ``url`` as they arrive
+
+        The subprocess backend parses stdout line by line while yt-dlp is still
+        paging through the listing, so nothing but the current line is held
+        in memory. ``on_start`` receives the Popen object (e.g. to terminate
+        it early). The library backend yields the extracted entries. This
+        makes one request and does not go through the rate limiter.
+        Raises subprocess.CalledProcessError if yt-dlp fails.
+        """
+        if self.backend == "library":
+            yield from self.extract_flat_library(url, playlist_items)
+            return
+
+        cmd = [self.ytdlp_path, "--flat-playlist", "--dump-json"]
+        if playlist_items:
+            cmd.extend(["--playlist-items", str(playlist_items)])
+        cmd.append(url)
+
+        # stderr goes to a file so a chatty yt-dlp can't fill the pipe and stall
+        with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as stderr:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+            )
+            if on_start:
+                on_start(process)
+            listed_all = False
+            try:
+                for line in process.stdout:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        print(f"Warning: Could not parse JSON: {e}")
+                listed_all = True
+            finally:
+                # Only a consumer that stops early cuts yt-dlp short; at the
+                # end of stdout it may still be exiting, so give it time
+                if not listed_all and process.poll() is None:
+                    process.terminate()
+                process.stdout.close()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+            if process.returncode != 0:
+                stderr.seek(0)
+                raise subprocess.CalledProcessError(
+                    process.returncode, cmd, stderr=stderr.read()
+                )
+
+    def get_library_ydl(self, playlist_items=None):
+        """Thread-local YoutubeDL for flat listings, reused across URLs"""
+        from yt_dlp import YoutubeDL, parse_options
+
+        instances = getattr(self._ydl_local, "instances", None)
+        if instances is None:
+            instances = self._ydl_local.instances = {}
+        key = str(playlist_items or "")
+        if key not in instances:
+            args = ["--flat-playlist"]
+            if playlist_items:
+                args.extend(["--playlist-items", key])
+            opts = parse_options(args).ydl_opts
+            opts.update({"quiet": True, "no_warnings": True, "skip_download": True})
+            instances[key] = YoutubeDL(opts)
+        return instances[key]
+
+    def extract_flat_library(self, url, playlist_items=None):
+        """Library backend version of dump_flat_playlist"""
+        from yt_dlp.utils import DownloadError
+
+        ydl = self.get_library_ydl(playlist_items)
+        try:
+            info = ydl.extract_info(url, download=False)
+        except DownloadError as e:
+            raise subprocess.CalledProcessError(1, "yt_dlp", stderr=str(e))
+
+        info = ydl.sanitize_info(info) or {}
+        entries = info.get("entries")
+        if entries is None:
+            return [info]
+        for entry in entries:
+            # Match what --dump-json prints for every flat entry
+            entry.setdefault("playlist_title", info.get("title"))
+            entry.setdefault("playlist_id", info.get("id"))
+        return [entry for entry in entries if entry]
+
+    def run_ytdlp_library(
+        self,
+        args,
+        prefix="",
+        on_progress=None,
+        on_done=None,
+        on_failed=None,
+        metrics=None,
+        on_throttle=None,
+    ):
+        """Run a yt-dlp command line in-process through yt_dlp.YoutubeDL
+
+        ``args`` are the same arguments the subprocess backend passes to the
+        executable; they are turned into YoutubeDL options with
+        yt_dlp.parse_options, so extra_args keep working. Progress and
+        finished tracks come from the progress hook and an after_move
+        post-processor instead of scraped output. If ``on_throttle`` is given
+        it is called with the first rate limiting message and the run is
+        cancelled, since every further request would be refused as well.
+
+        Returns (returncode, download_started).
+        """
+        from yt_dlp import YoutubeDL, parse_options
+        from yt_dlp.postprocessor.common import PostProcessor
+        from yt_dlp.utils import DownloadCancelled
+
+        parsed = parse_options(args)
+        state = {"started": False}
+
+        def progress_hook(d):
+            if d.get("status") not in ("downloading", "finished"):
+                return
+            state["started"] = True
+            video_id = d.get("info_dict", {}).get("id")
+            total = d.get("total_bytes") or d.get("total_bytes_estimate")
+            if metrics and video_id:
+                metrics.track_started(video_id)
+                metrics.download_progress(video_id, total, d.get("speed"))
+                if d.get("status") == "finished":
+                    metrics.download_finished(
+                        video_id, d.get("total_bytes"), d.get("elapsed")
+                    )
+            if d.get("status") != "downloading":
+                return
+            if not total:
+                return
+            line = f"[download] {d.get('downloaded_bytes', 0) * 100 / total:5.1f}%"
+            if d.get("speed"):
+                line += f" at {d['speed'] / 1024 / 1024:.2f}MiB/s"
+            if prefix:
+                if on_progress:
+                    on_progress(line)
+            else:
+                print(f"\r{line}", end="", flush=True)
+
+        def postprocessor_hook(d):
+            video_id = d.get("info_dict", {}).get("id")
+            if metrics and video_id and d.get("status") == "started":
+                metrics.postprocess_started(video_id)
+            if d.get("status") == "started":
+                name = d.get("postprocessor", "")
+                if name in (
+                    "ExtractAudio",
+                    "VideoRemuxer",
+                    "EmbedThumbnail",
+                    "Metadata",
+                ):
+                    self.log(
+                        f"\n[{name}] {d.get('info_dict', {}).get('title')}", prefix
+                    )
+
+        def check_throttle(msg):
+            if on_throttle and is_throttle_message(msg):
+                on_throttle(msg)
+                raise DownloadCancelled(msg)
+
+        class Logger:
+            def debug(inner, msg):
+                pass
+
+            def info(inner, msg):
+                pass
+
+            def warning(inner, msg):
+                if metrics and "Retrying" in msg:
+                    metrics.retry(None, msg)
+                check_throttle(msg)
+
+            def error(inner, msg):
+                self.log(f"\n{msg}", prefix)
+                check_throttle(msg)
+                match = TrackLineParser.error_pattern.match(msg)
+                if match and on_failed:
+                    on_failed(*match.groups())
+
+        class TrackDone(PostProcessor):
+            def run(inner, info):
+                if on_done and info.get("filepath"):
+                    on_done(info["id"], info["filepath"])
+                return [], info
+
+        opts = dict(parsed.ydl_opts)
+        opts.update(
+            {
+                "quiet": True,
+                "noprogress": True,
+                "no_color": True,
+                "logger": Logger(),
+                "progress_hooks": [progress_hook],
+                "postprocessor_hooks": [postprocessor_hook],
+            }
+        )
+        if self.ffmpeg_path:
+            opts.setdefault("ffmpeg_location", self.ffmpeg_path)
+
+        with YoutubeDL(opts) as ydl:
+            ydl.add_post_processor(TrackDone(), when="after_move")
+            try:
+                if parsed.options.load_info_filename:
+                    returncode = ydl.download_with_info_file(
+                        parsed.options.load_info_filename
+                    )
+                else:
+                    returncode = ydl.download(parsed.urls)
+            except DownloadCancelled:
+                returncode = 1
+        return returncode, state["started"]
+
     def extract_playlist_id(self, url):
         """Extract playlist ID from URL"""
         match = re.search(r"list=([^&]+)", url)
@@ -305,12 +1238,30 @@ class YouTubePlaylistDownloader:
         return url.split("/")[-1]
 
     def get_playlists_from_channel(self):
-        """Fetch all public playlists from the channel"""
+        """Fetch all public playlists from the channel
+
+        The channel URL variants are probed in parallel; the first one that
+        lists playlists wins and the other probes are stopped. Entries are
+        parsed while yt-dlp pages through the channel, and only id/title/url
+        of each playlist is kept. The result is cached in the state for
+        channel_cache_ttl_hours.
+        """
         print("Fetching playlists from channel...")
         print(
             "Note: This only works for regular YouTube channels, not YouTube Music channels\n"
         )
 
+        with self.state_lock:
+            cached = self.state["channel_playlists"].get(self.channel_url)
+        if cached and self.channel_cache_ttl_hours > 0:
+            age_hours = (time.time() - cached.get("fetched_at", 0)) / 3600
+            if age_hours < self.channel_cache_ttl_hours:
+                print(
+                    f"✓ Using cached list of {len(cached['playlists'])} playlists "
+                    f"({age_hours:.1f}h old)\n"
+                )
+                return cached["playlists"]
+
         # Try different channel URL formats
         channel_urls_to_try = [
             f"{self.channel_url}/playlists",
@@ -318,37 +1269,72 @@ class YouTubePlaylistDownloader:
             self.channel_url,
         ]
 
-        playlists = []
-
-        for channel_url in channel_urls_to_try:
-            cmd = [self.ytdlp_path, "--flat-playlist", "--dump-json", channel_url]
-
-            try:
-                result = subprocess.run(
-                    cmd, capture_output=True, text=True, encoding="utf-8", check=True
-                )
-
-                for line in result.stdout.strip().split("\n"):
-                    if line:
-                        try:
-                            data = json.loads(line)
-                            if data.get("_type") == "playlist":
-                                playlists.append(
-                                    {
-                                        "id": data["id"],
-                                        "title": data["title"],
-                                        "url": data["url"],
-                                    }
-                                )
-                        except json.JSONDecodeError:
-                            continue
-
-                if playlists:
-                    print(f"✓ Found {len(playlists)} playlists\n")
-                    return playlists
+        stop = threading.Event()
+        processes_lock = threading.Lock()
+        processes = {}
+
+        def register(channel_url, process):
+            with processes_lock:
+                processes[channel_url] = process
+
+        def probe(channel_url):
+            for attempt in range(self.throttle_retries + 1):
+                if stop.is_set():
+                    return []
+                self.wait_for_rate_limit()
+                playlists = []
+                try:
+                    for data in self.iter_flat_playlist(
+                        channel_url,
+                        on_start=lambda process: register(channel_url, process),
+                    ):
+                        if stop.is_set():
+                            return []
+                        if data.get("_type") == "playlist":
+                            playlists.append(
+                                {
+                                    "id": data["id"],
+                                    "title": data["title"],
+                                    "url": data["url"],
+                                }
+                            )
+                except subprocess.CalledProcessError as e:
+                    if stop.is_set():
+                        return []
+                    if attempt < self.throttle_retries and is_throttle_message(
+                        e.stderr
+                    ):
+                        self.report_throttle(e.stderr)
+                        continue
+                    return []
+                self.rate_limiter.success()
+                return playlists
+            return []
 
-            except subprocess.CalledProcessError as e:
-                continue
+        playlists = []
+        with ThreadPoolExecutor(max_workers=len(channel_urls_to_try)) as pool:
+            futures = {pool.submit(probe, url): url for url in channel_urls_to_try}
+            for future in as_completed(futures):
+                found = future.result()
+                if not found:
+                    continue
+                playlists = found
+                # First success wins, stop the slower probes
+                stop.set()
+                with processes_lock:
+                    for url, process in processes.items():
+                        if url != futures[future] and process.poll() is None:
+                            process.terminate()
+                break
+
+        if playlists:
+            print(f"✓ Found {len(playlists)} playlists\n")
+            self.update_state(
+                "set",
+                ["channel_playlists", self.channel_url],
+                {"fetched_at": round(time.time()), "playlists": playlists},
+            )
+            return playlists
 
         print("⚠ No playlists found via channel URL")
         print(
@@ -356,21 +1342,57 @@ class YouTubePlaylistDownloader:
         )
         return []
 
-    def get_playlists_from_urls(self):
-        """Get playlist info from direct URLs"""
-        print("Processing playlist URLs...")
-        playlists = []
+    def resolve_playlists(self, urls):
+        """Get playlist info for many URLs at once
+
+        Cached playlists are answered from the state, the rest are fetched
+        through a pool of max_parallel_info_fetches workers. All new cache
+        entries are committed to the state in one batch at the end.
+        Playlists are returned in the order of ``urls``.
+        """
+        results = [None] * len(urls)
+        to_fetch = []
+        with self.state_lock:
+            cache = self.state.get("playlist_info", {})
+            for index, url in enumerate(urls):
+                cached = cache.get(self.extract_playlist_id(url))
+                if cached:
+                    results[index] = cached
+                else:
+                    to_fetch.append(index)
+
+        if len(urls) - len(to_fetch):
+            print(f"Using cached info for {len(urls) - len(to_fetch)} playlists")
 
         with tqdm(
-            total=len(self.playlist_urls),
+            total=len(urls),
+            initial=len(urls) - len(to_fetch),
             desc="Fetching playlist info",
             unit="playlist",
         ) as pbar:
-            for url in self.playlist_urls:
-                playlist = self.get_playlist_info(url)
-                if playlist:
-                    playlists.append(playlist)
-                pbar.update(1)
+            if to_fetch:
+                workers = min(self.max_parallel_info_fetches, len(to_fetch))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = {
+                        pool.submit(self.get_playlist_info, urls[i], False): i
+                        for i in to_fetch
+                    }
+                    for future in as_completed(futures):
+                        results[futures[future]] = future.result()
+                        pbar.update(1)
+
+        fetched = [results[i] for i in to_fetch if results[i]]
+        if fetched:
+            with self.state_batch():
+                for info in fetched:
+                    self.update_state("set", ["playlist_info", info["id"]], info)
+
+        return [playlist for playlist in results if playlist]
+
+    def get_playlists_from_urls(self):
+        """Get playlist info from direct URLs"""
+        print("Processing playlist URLs...")
+        playlists = self.resolve_playlists(self.playlist_urls)
 
         print(f"\n✓ Processed {len(playlists)} playlists\n")
         return playlists
@@ -383,149 +1405,1232 @@ class YouTubePlaylistDownloader:
             return []
 
         print("Processing playlist URLs from file...")
-        playlists = []
-
-        with tqdm(
-            total=len(urls), desc="Fetching playlist info", unit="playlist"
-        ) as pbar:
-            for url in urls:
-                playlist = self.get_playlist_info(url)
-                if playlist:
-                    playlists.append(playlist)
-                pbar.update(1)
+        playlists = self.resolve_playlists(urls)
 
         print(f"\n✓ Processed {len(playlists)} playlists\n")
         return playlists
 
-    def download_playlist(self, playlist):
-        """Download a single playlist with progress tracking"""
+    def download_playlist(self, playlist, prefix="", on_progress=None):
+        """Download a single playlist with progress tracking
+
+        When ``prefix`` is set the playlist is running in a worker pool: every
+        line is tagged with the prefix and progress percentages are reported
+        through ``on_progress`` instead of being redrawn in place.
+        """
         playlist_id = str(playlist["id"])
         playlist_title = str(playlist["title"])
 
         # Check if already completed
-        if playlist_id in self.state["completed_playlists"]:
-            print(f"⊙ Skipping '{playlist_title}' (already completed)")
+        with self.state_lock:
+            already_completed = playlist_id in self.state["completed_playlists"]
+        if already_completed and not self.sync_mode:
+            self.log(f"⊙ Skipping '{playlist_title}' (already completed)", prefix)
             return True
 
-        print(f"\n[STATE CHECK] Playlist ID: {playlist_id}")
-        print(f"[STATE CHECK] Completed playlists: {self.state['completed_playlists']}")
-        print(f"[STATE CHECK] State file location: {self.state_file.absolute()}")
+        if not prefix:
+            print(f"\n[STATE CHECK] Playlist ID: {playlist_id}")
+            print(
+                f"[STATE CHECK] Completed playlists: {self.state['completed_playlists']}"
+            )
+            print(f"[STATE CHECK] State file location: {self.state_file.absolute()}")
 
-        # Create playlist directory
         clean_title = self.clean_filename(playlist_title)
         playlist_dir = self.root_path / clean_title
+
+        entries = None
+        if self.sync_mode:
+            done_tracks = self.get_known_tracks(playlist_id)
+            try:
+                entries = [
+                    e for e in self.dump_flat_playlist(playlist["url"]) if e.get("id")
+                ]
+            except subprocess.CalledProcessError as e:
+                self.log(f"✗ Could not list '{playlist_title}': {e.stderr}", prefix)
+                return False
+            listed = {str(e["id"]) for e in entries}
+            self.remember_track_count(playlist_id, len(listed))
+            queued = self.get_queued_tracks(playlist_id)
+            skipped = self.get_skipped_tracks(playlist_id)
+            added = [
+                e
+                for e in entries
+                if str(e["id"]) not in done_tracks
+                and str(e["id"]) not in queued
+                and str(e["id"]) not in skipped
+            ]
+            removed = [vid for vid in done_tracks if vid not in listed]
+
+            if self.sync_prune and removed:
+                self.prune_tracks(
+                    playlist_id, playlist_dir, removed, done_tracks, prefix
+                )
+            if not added:
+                if not already_completed:
+                    self.finish_playlist(playlist_id)
+                self.log(
+                    f"⊙ Up to date: '{playlist_title}' ({len(listed)} tracks, "
+                    f"{len(removed)} removed)",
+                    prefix,
+                )
+                return True
+            self.log(
+                f"[SYNC] '{playlist_title}': {len(added)} new, {len(removed)} removed",
+                prefix,
+            )
+        else:
+            done_tracks = (
+                self.get_done_tracks(playlist_id) if self.resume_partial else {}
+            )
+            if done_tracks:
+                self.log(
+                    f"[RESUME] {len(done_tracks)} tracks already downloaded, fetching the rest",
+                    prefix,
+                )
+        # Downloaded tracks waiting in the post-processing queue are not
+        # missing, and tracks given up on are not tried again
+        done_tracks = {
+            **self.get_skipped_tracks(playlist_id),
+            **self.get_queued_tracks(playlist_id),
+            **done_tracks,
+        }
+
+        # Create playlist directory
         playlist_dir.mkdir(parents=True, exist_ok=True)
 
-        print(f"\n{'='*60}")
-        print(f"Downloading: {playlist_title}")
-        print(f"Destination: {playlist_dir}")
-        print(f"{'='*60}\n")
+        self.log(f"\n{'='*60}", prefix)
+        self.log(f"Downloading: {playlist_title}", prefix)
+        self.log(f"Destination: {playlist_dir}", prefix)
+        self.log(f"{'='*60}\n", prefix)
+
+        metrics = PlaylistMetrics(self.events, playlist_id, playlist_title)
+        with self.state_lock:
+            self.playlist_metrics[playlist_id] = metrics
+        self.events.emit(
+            "playlist_start",
+            playlist_id=playlist_id,
+            title=playlist_title,
+            mode=self.download_mode,
+            backend=self.backend,
+        )
+        succeeded = False
 
-        # Build yt-dlp command - simple audio download with metadata
-        cmd = [
-            self.ytdlp_path,
-            "--extract-audio",
-            "--audio-format",
-            "best",
-            "--audio-quality",
-            "0",
+        try:
+            if self.library_mode != "off":
+                if entries is None:
+                    entries = [
+                        e
+                        for e in self.dump_flat_playlist(playlist["url"])
+                        if e.get("id")
+                    ]
+                linked = self.link_library_tracks(
+                    playlist_id, playlist_dir, entries, done_tracks
+                )
+                if linked:
+                    self.log(
+                        f"[LIBRARY] {len(linked)} tracks already in the library, linked",
+                        prefix,
+                    )
+                    done_tracks = {**done_tracks, **linked}
+
+            if self.download_mode == "track":
+                success, download_started = self.download_playlist_tracks(
+                    playlist, playlist_dir, prefix, on_progress, done_tracks, entries
+                )
+            else:
+                success, download_started = self.run_playlist_download(
+                    playlist, playlist_dir, prefix, on_progress, done_tracks, entries
+                )
+
+            if success:
+                self.log(f"\n✓ Completed: {playlist_title}", prefix)
+                self.log(
+                    f"[STATE] Adding playlist ID to completed: {playlist_id}", prefix
+                )
+                total = self.finish_playlist(playlist_id)
+                if self.library_mode == "m3u":
+                    self.write_playlist_m3u(playlist_id, playlist_dir)
+                self.log(f"[STATE] State saved. Total completed: {total}\n", prefix)
+                succeeded = True
+                return True
+            else:
+                self.log(f"\n⚠ Completed with errors: {playlist_title}", prefix)
+                if self.resume_partial:
+                    # Keep it pending; the next run only fetches what is missing
+                    with self.state_lock:
+                        partial = self.state["partially_downloaded"].get(
+                            playlist_id, {}
+                        )
+                        done_count = len(partial.get("done", {}))
+                        failed_count = len(partial.get("failed", {}))
+                    self.log(
+                        f"[STATE] {done_count} tracks done, {failed_count} failed - "
+                        f"failed/missing tracks will be retried on the next run\n",
+                        prefix,
+                    )
+                # Still mark as complete if some downloads happened
+                elif download_started:
+                    self.log(
+                        f"[STATE] Adding playlist ID to completed (with errors): {playlist_id}",
+                        prefix,
+                    )
+                    total = self.finish_playlist(playlist_id)
+                    self.log(f"[STATE] State saved. Total completed: {total}\n", prefix)
+                return False
+
+        except Exception as e:
+            self.log(f"\n✗ Error downloading playlist: {e}", prefix)
+            import traceback
+
+            traceback.print_exc()
+            print()
+            return False
+
+        finally:
+            with self.state_lock:
+                self.playlist_metrics.pop(playlist_id, None)
+            summary = metrics.finish(succeeded)
+            self.run_summaries.append(summary)
+            self.log(
+                f"[METRICS] {summary['tracks_done']} done, "
+                f"{summary['tracks_failed']} failed, {summary['retries']} retries, "
+                f"{summary['bytes'] / 1024 / 1024:.1f} MiB in {summary['elapsed_s']:.1f}s",
+                prefix,
+            )
+
+    def postprocess_args(self):
+        """yt-dlp arguments for audio extraction, thumbnail and metadata"""
+        args = [
+            *audio_format_args(self.audio_format, self.audio_quality),
             "--embed-thumbnail",
             "--embed-metadata",
             "--add-metadata",
+        ]
+        if self.ffmpeg_path:
+            args.extend(["--ffmpeg-location", self.ffmpeg_path])
+        return args
+
+    def get_missing_entries(self, playlist, done_tracks, prefix="", entries=None):
+        """List the playlist's tracks that are not in ``done_tracks``
+
+        ``entries`` is a flat listing fetched earlier (sync mode); without it
+        the playlist is listed now.
+        """
+        if entries is None:
+            entries = [
+                e for e in self.dump_flat_playlist(playlist["url"]) if e.get("id")
+            ]
+        self.remember_track_count(str(playlist["id"]), len(entries))
+        missing = [e for e in entries if str(e["id"]) not in done_tracks]
+        self.log(f"Found {len(entries)} tracks, {len(missing)} to download", prefix)
+        return missing
+
+    def track_url(self, entry):
+        """Watch URL of a flat playlist entry"""
+        return entry.get("url") or f"https://music.youtube.com/watch?v={entry['id']}"
+
+    def run_playlist_download(
+        self,
+        playlist,
+        playlist_dir,
+        prefix="",
+        on_progress=None,
+        done_tracks=None,
+        entries=None,
+    ):
+        """Hand the whole playlist URL to a single yt-dlp process
+
+        If some tracks are already done (resume / sync), only the missing
+        tracks' URLs are passed to yt-dlp through a batch file. When YouTube
+        throttles, the process is stopped, and after the backoff it is
+        started again for the tracks that are still missing.
+
+        Returns (success, download_started).
+        """
+        playlist_id = str(playlist["id"])
+        started_any = False
+        for attempt in range(self.throttle_retries + 1):
+            self.wait_for_rate_limit(prefix)
+            success, download_started, throttle = self.run_playlist_attempt(
+                playlist, playlist_dir, prefix, on_progress, done_tracks, entries
+            )
+            started_any = started_any or download_started
+            if throttle is None:
+                if success:
+                    self.rate_limiter.success()
+                return success, started_any
+            self.report_throttle(throttle, prefix, playlist_id)
+            # Skip whatever finished before the throttling on the next attempt
+            done_tracks = {**(done_tracks or {}), **self.get_done_tracks(playlist_id)}
+        self.log("✗ Still throttled, the remaining tracks are left for later", prefix)
+        return False, started_any
+
+    def run_playlist_attempt(
+        self,
+        playlist,
+        playlist_dir,
+        prefix="",
+        on_progress=None,
+        done_tracks=None,
+        entries=None,
+    ):
+        """One yt-dlp run for run_playlist_download
+
+        Returns (success, download_started, throttle_message); the message
+        is None unless the run was stopped because of rate limiting.
+        """
+        playlist_id = str(playlist["id"])
+        batch_file = None
+        targets = [playlist["url"]]
+        if done_tracks:
+            missing = self.get_missing_entries(playlist, done_tracks, prefix, entries)
+            if not missing:
+                return True, True, None
+            batch_file = playlist_dir / ".resume_urls.txt"
+            batch_file.write_text(
+                "\n".join(self.track_url(e) for e in missing) + "\n",
+                encoding="utf-8",
+            )
+            targets = ["--batch-file", str(batch_file)]
+
+        if self.postprocess_mode == "deferred":
+            # Raw audio only; the info JSON lets the queue post-process it later
+            pending_dir = self.pending_dir(playlist_dir)
+            pending_dir.mkdir(parents=True, exist_ok=True)
+            processing = [
+                "--format",
+                download_format(self.audio_format),
+                "--write-info-json",
+                "--output",
+                f"infojson:{pending_dir / '%(id)s'}",
+            ]
+
+            def on_done(video_id, path):
+                self.enqueue_postprocess(
+                    playlist_id,
+                    video_id,
+                    pending_dir / f"{video_id}.info.json",
+                    playlist_dir,
+                )
+
+        else:
+            processing = [
+                "--format",
+                download_format(self.audio_format),
+                *self.postprocess_args(),
+            ]
+
+            def on_done(video_id, path):
+                self.record_track_done(playlist_id, video_id, path, playlist_dir)
+
+        # Build yt-dlp command - simple audio download with metadata
+        args = [
+            *processing,
             "--output",
-            str(playlist_dir / "%(title)s.%(ext)s"),
+            self.output_template(playlist_dir),
             "--no-overwrites",
             "--ignore-errors",
-            playlist["url"],
+            *targets,
         ]
 
         # Add extra args if specified
         if self.extra_args:
-            cmd.extend(self.extra_args.split())
+            args.extend(self.extra_args.split())
+
+        if self.backend == "library":
+            failed = {}
+            throttled = []
+
+            def on_failed(video_id, reason):
+                failed[video_id] = reason
+                self.record_track_failed(playlist_id, video_id, reason)
+
+            returncode, download_started = self.run_ytdlp_library(
+                args,
+                prefix,
+                on_progress,
+                metrics=self.playlist_metrics.get(playlist_id),
+                on_done=on_done,
+                on_failed=on_failed,
+                on_throttle=throttled.append,
+            )
+            if batch_file is not None:
+                batch_file.unlink(missing_ok=True)
+            if throttled:
+                return False, download_started, throttled[0]
+            success = returncode == 0 or (download_started and returncode == 1)
+            if self.resume_partial and self.retried_failures(playlist_id, failed):
+                success = False
+            return success, download_started, None
+
+        cmd = [self.ytdlp_path, *args]
+
+        # Run subprocess with simpler output handling (like the original)
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=1,
+            universal_newlines=True,
+        )
+
+        download_started = False
+        metrics = self.playlist_metrics.get(playlist_id)
+        parser = TrackLineParser(
+            on_start=metrics.track_started if metrics else None,
+            on_done=on_done,
+            on_failed=lambda vid, reason: self.record_track_failed(
+                playlist_id, vid, reason
+            ),
+        )
 
+        # Track progress
+        throttle = None
+        count_pattern = re.compile(r"^\[download\] Downloading item \d+ of (\d+)")
         try:
-            # Run subprocess with simpler output handling (like the original)
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                bufsize=1,
-                universal_newlines=True,
+            for line in process.stdout:
+                line = line.strip()
+                match = count_pattern.match(line) if batch_file is None else None
+                if match:
+                    self.remember_track_count(playlist_id, int(match.group(1)))
+                if is_throttle_line(line):
+                    # Every further request would be refused as well
+                    throttle = line
+                    self.log(f"\n{line}", prefix)
+                    process.terminate()
+                    break
+                if line:
+                    parser.feed(line)
+                    if metrics and parser.current_id:
+                        self.update_line_metrics(metrics, parser.current_id, line)
+                    # Show download progress
+                    if "[download]" in line and "%" in line:
+                        download_started = True
+                        if prefix:
+                            if on_progress:
+                                on_progress(line)
+                        else:
+                            print(f"\r{line}", end="", flush=True)
+                    elif "[download] Destination:" in line:
+                        download_started = True
+                        self.log(f"\n{line}", prefix)
+                    elif "ERROR" in line:
+                        self.log(f"\n{line}", prefix)
+                    elif "WARNING" in line:
+                        # Don't print every warning to reduce noise
+                        if (
+                            "JavaScript runtime" not in line
+                            and "SABR streaming" not in line
+                        ):
+                            self.log(f"\n{line}", prefix)
+                    elif (
+                        "[ExtractAudio]" in line
+                        or "[VideoRemuxer]" in line
+                        or "[EmbedThumbnail]" in line
+                        or "[Metadata]" in line
+                    ):
+                        self.log(f"\n{line}", prefix)
+                    elif "[download] Downloading" in line:
+                        self.log(f"\n{line}", prefix)
+        except UnicodeDecodeError:
+            # If we hit encoding issues, just let the process finish
+            pass
+
+        process.wait()
+        if batch_file is not None:
+            batch_file.unlink(missing_ok=True)
+        if throttle is not None:
+            # The track in flight was cut off, so it does not count as done
+            return False, download_started, throttle
+        parser.close()
+
+        # Consider it successful if downloads started and process completed
+        success = process.returncode == 0 or (
+            download_started and process.returncode == 1
+        )
+        if self.resume_partial and self.retried_failures(playlist_id, parser.failed):
+            success = False
+        return success, download_started, None
+
+    def retried_failures(self, playlist_id, failed):
+        """The failed video IDs that were not skipped, so they are retried"""
+        skipped = self.get_skipped_tracks(playlist_id)
+        return [video_id for video_id in failed if video_id not in skipped]
+
+    def update_line_metrics(self, metrics, video_id, line):
+        """Feed one line of yt-dlp output for ``video_id`` into the metrics"""
+        progress = parse_progress_line(line)
+        if progress:
+            percent, total_bytes, bytes_per_s = progress
+            metrics.download_progress(video_id, total_bytes, bytes_per_s)
+            if percent >= 100:
+                metrics.download_finished(video_id)
+        elif "Retrying" in line:
+            metrics.retry(video_id, line)
+        elif line.startswith(("[ExtractAudio]", "[VideoRemuxer]")):
+            metrics.download_finished(video_id)
+            metrics.postprocess_started(video_id)
+
+    def get_track_pools(self):
+        """Shared (network, post-processing) pools used by track mode"""
+        with self.state_lock:
+            if self._fetch_pool is None:
+                self._fetch_pool = ThreadPoolExecutor(
+                    max_workers=self.max_parallel_downloads,
+                    thread_name_prefix="fetch",
+                )
+                self._postprocess_pool = ThreadPoolExecutor(
+                    max_workers=self.max_parallel_postprocess,
+                    thread_name_prefix="postprocess",
+                )
+            return self._fetch_pool, self._postprocess_pool
+
+    def shutdown_track_pools(self):
+        """Wait for and release the track mode pools"""
+        with self.state_lock:
+            pools = (self._fetch_pool, self._postprocess_pool)
+            self._fetch_pool = self._postprocess_pool = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+    def pending_dir(self, playlist_dir):
+        """Directory holding info JSON of tracks fetched but not post-processed"""
+        return playlist_dir / ".pending"
+
+    def fetch_track(self, entry, playlist_dir, prefix="", metrics=None):
+        """Stage 2: download the raw audio stream of one track (network-bound)
+
+        The info JSON is written to the playlist's .pending directory so the
+        post-processing stage can pick the track up without hitting the
+        network again. Returns the info JSON path, or None on failure.
+        """
+        video_id = str(entry["id"])
+        pending_dir = self.pending_dir(playlist_dir)
+        pending_dir.mkdir(parents=True, exist_ok=True)
+        info_json = pending_dir / f"{video_id}.info.json"
+
+        args = [
+            "--format",
+            download_format(self.audio_format),
+            "--write-info-json",
+            "--output",
+            self.output_template(playlist_dir),
+            "--output",
+            f"infojson:{pending_dir / video_id}",
+            "--no-overwrites",
+            "--no-playlist",
+        ]
+        if self.extra_args:
+            args.extend(self.extra_args.split())
+        args.append(self.track_url(entry))
+
+        if metrics:
+            metrics.track_started(video_id)
+
+        for attempt in range(self.throttle_retries + 1):
+            self.wait_for_rate_limit(prefix)
+            ok, throttle = self.fetch_track_attempt(args, info_json, prefix, metrics)
+            if ok:
+                self.rate_limiter.success()
+                if metrics:
+                    metrics.download_finished(video_id)
+                return info_json
+            if throttle is None:
+                return None
+            playlist_id = metrics.playlist_id if metrics else None
+            self.report_throttle(throttle, prefix, playlist_id, video_id)
+            if metrics and attempt < self.throttle_retries:
+                metrics.retry(video_id, throttle)
+        return None
+
+    def fetch_track_attempt(self, args, info_json, prefix="", metrics=None):
+        """Run one yt-dlp fetch for fetch_track
+
+        Returns (ok, throttle_message); the message is None unless YouTube
+        rate limited the request.
+        """
+        video_id = info_json.name.split(".")[0]
+        if self.backend == "library":
+            throttled = []
+            returncode, _ = self.run_ytdlp_library(
+                args, prefix, metrics=metrics, on_throttle=throttled.append
+            )
+            ok = returncode == 0 and info_json.exists()
+            return ok, throttled[0] if throttled and not ok else None
+
+        result = subprocess.run(
+            [self.ytdlp_path, *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        lines = [line.strip() for line in result.stdout.splitlines()]
+        if metrics:
+            for line in lines:
+                self.update_line_metrics(metrics, video_id, line)
+        if result.returncode == 0 and info_json.exists():
+            return True, None
+        for line in lines:
+            if is_throttle_line(line):
+                return False, line
+        for line in lines:
+            if "ERROR" in line:
+                self.log(f"  {line}", prefix)
+        return False, None
+
+    def postprocess_track(self, info_json, playlist_dir, prefix="", metrics=None):
+        """Stage 3: extract audio, embed thumbnail and metadata (CPU-bound)
+
+        yt-dlp sees the already downloaded file for the loaded info JSON and
+        only runs the post-processors on it. Returns the final file path, or
+        None on failure.
+        """
+        args = self.postprocess_command(info_json, playlist_dir)
+        if metrics:
+            metrics.postprocess_started(Path(info_json).name.split(".")[0])
+
+        if self.backend == "library":
+            done = {}
+            returncode, _ = self.run_ytdlp_library(
+                args, prefix, on_done=lambda vid, path: done.setdefault(vid, path)
             )
+            if returncode != 0:
+                return None
+            if not done:
+                # Failed: keep the info JSON, it is not a file of the track
+                self.log("  yt-dlp did not report the output file", prefix)
+                return None
+            Path(info_json).unlink(missing_ok=True)
+            return next(iter(done.values()))
+
+        path, error = run_postprocess_job(
+            self.backend,
+            self.ytdlp_path,
+            self.ffmpeg_path,
+            args,
+            Path(info_json).name.split(".")[0],
+        )
+        if path is None:
+            self.log(f"  {error}", prefix)
+            return None
+        Path(info_json).unlink(missing_ok=True)
+        return path
+
+    def postprocess_command(self, info_json, playlist_dir):
+        """yt-dlp arguments that post-process the download of an info JSON"""
+        # Same --format as the download, or yt-dlp would pick another stream
+        args = [
+            "--load-info-json",
+            str(info_json),
+            "--format",
+            download_format(self.audio_format),
+            *self.postprocess_args(),
+            "--output",
+            self.output_template(playlist_dir),
+        ]
+        if self.extra_args:
+            args.extend(self.extra_args.split())
+        return args
+
+    def enqueue_postprocess(self, playlist_id, video_id, info_json, playlist_dir):
+        """Put a downloaded track on the persistent post-processing queue
+
+        The job is stored in the state first, so it survives a crash or
+        Ctrl+C, and then handed to the process pool right away.
+        """
+        job = {"info_json": str(info_json), "playlist_dir": str(playlist_dir)}
+        self.update_state("set", ["postprocess_queue", playlist_id, video_id], job)
+        metrics = self.playlist_metrics.get(playlist_id)
+        if metrics:
+            metrics.download_finished(video_id)
+            metrics.track_done(video_id, info_json)
+        self.submit_postprocess(playlist_id, video_id, job)
+
+    def get_postprocess_process_pool(self):
+        """Process pool for deferred post-processing, created on first use"""
+        with self.state_lock:
+            if self._postprocess_process_pool is None:
+                self._postprocess_process_pool = ProcessPoolExecutor(
+                    max_workers=self.max_parallel_postprocess,
+                    # Forking a process with busy threads can inherit held locks
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._postprocess_process_pool
+
+    def submit_postprocess(self, playlist_id, video_id, job):
+        """Start a queued job in the process pool unless it already runs"""
+        key = (playlist_id, video_id)
+        with self.state_lock:
+            if key in self._postprocess_jobs:
+                return
+            future = self.get_postprocess_process_pool().submit(
+                run_postprocess_job,
+                self.backend,
+                self.ytdlp_path,
+                self.ffmpeg_path,
+                self.postprocess_command(job["info_json"], Path(job["playlist_dir"])),
+                video_id,
+            )
+            self._postprocess_jobs[key] = future
+        future.add_done_callback(
+            lambda f: self.complete_postprocess(playlist_id, video_id, job, f)
+        )
+
+    def complete_postprocess(self, playlist_id, video_id, job, future):
+        """Record the outcome of a deferred post-processing job"""
+        try:
+            path, error = future.result()
+        except Exception as e:
+            path, error = None, str(e)
+        playlist_dir = Path(job["playlist_dir"])
+        queue_path = ["postprocess_queue", playlist_id, video_id]
+
+        if path is not None:
+            with self.state_batch():
+                self.record_track_done(playlist_id, video_id, path, playlist_dir)
+                self.update_state("delete", queue_path)
+                if not self.get_queued_tracks(playlist_id):
+                    self.update_state("delete", ["postprocess_queue", playlist_id])
+            Path(job["info_json"]).unlink(missing_ok=True)
+            with self.state_lock:
+                self.postprocess_counts["done"] += 1
+                self._postprocess_dirs.add(playlist_dir)
+                completed = playlist_id in self.state["completed_playlists"]
+            if self.library_mode == "m3u" and completed:
+                self.write_playlist_m3u(playlist_id, playlist_dir)
+            self.log(f"✓ {Path(path).name}", "[PP]")
+            self.events.emit(
+                "postprocess_done", playlist_id=playlist_id, video_id=video_id
+            )
+            return
 
-            download_started = False
+        attempts = job.get("attempts", 0) + 1
+        with self.state_lock:
+            self.postprocess_counts["failed"] += 1
+        if attempts >= 3:
+            # Give up: drop the job so the track is downloaded again
+            with self.state_batch():
+                self.update_state("delete", queue_path)
+                self.record_track_failed(playlist_id, video_id, error)
+            self.log(f"✗ {video_id}: {error} (giving up)", "[PP]")
+        else:
+            self.update_state(
+                "set", queue_path, {**job, "attempts": attempts, "error": error}
+            )
+            self.log(f"✗ {video_id}: {error} (retried next run)", "[PP]")
+        self.events.emit(
+            "postprocess_failed",
+            playlist_id=playlist_id,
+            video_id=video_id,
+            attempts=attempts,
+            reason=str(error)[:300],
+        )
 
-            # Track progress
+    def resume_postprocess_queue(self):
+        """Submit the jobs left in the queue by earlier runs; returns the count"""
+        with self.state_lock:
+            jobs = [
+                (playlist_id, video_id, dict(job))
+                for playlist_id, queued in self.state["postprocess_queue"].items()
+                for video_id, job in queued.items()
+            ]
+        for playlist_id, video_id, job in jobs:
+            self.submit_postprocess(playlist_id, video_id, job)
+        return len(jobs)
+
+    def wait_for_postprocess(self):
+        """Wait until every submitted post-processing job has finished"""
+        with self.state_lock:
+            pool = self._postprocess_process_pool
+            pending = sum(not f.done() for f in self._postprocess_jobs.values())
+        if pool is None:
+            return
+        if pending:
+            print(f"\nWaiting for {pending} post-processing jobs...")
+        pool.shutdown(wait=True)
+        with self.state_lock:
+            self._postprocess_process_pool = None
+            self._postprocess_jobs = {}
+            dirs, self._postprocess_dirs = self._postprocess_dirs, set()
+        # Downloads may still write into .pending while jobs run, so empty
+        # .pending directories are only removed once everything is done
+        for playlist_dir in dirs:
             try:
-                for line in process.stdout:
-                    line = line.strip()
-                    if line:
-                        # Show download progress
-                        if "[download]" in line and "%" in line:
-                            download_started = True
-                            print(f"\r{line}", end="", flush=True)
-                        elif "[download] Destination:" in line:
-                            download_started = True
-                            print(f"\n{line}")
-                        elif "ERROR" in line:
-                            print(f"\n{line}")
-                        elif "WARNING" in line:
-                            # Don't print every warning to reduce noise
-                            if (
-                                "JavaScript runtime" not in line
-                                and "SABR streaming" not in line
-                            ):
-                                print(f"\n{line}")
-                        elif (
-                            "[ExtractAudio]" in line
-                            or "[EmbedThumbnail]" in line
-                            or "[Metadata]" in line
-                        ):
-                            print(f"\n{line}")
-                        elif "[download] Downloading" in line:
-                            print(f"\n{line}")
-            except UnicodeDecodeError:
-                # If we hit encoding issues, just let the process finish
+                self.pending_dir(playlist_dir).rmdir()
+            except OSError:
+                pass
+        counts = self.postprocess_counts
+        print(f"✓ Post-processing: {counts['done']} done, {counts['failed']} failed")
+
+    def run_postprocess_queue(self):
+        """Only work through the persistent post-processing queue"""
+        count = self.resume_postprocess_queue()
+        if not count:
+            print("Post-processing queue is empty")
+            return
+        print(f"Post-processing {count} queued tracks...")
+        self.wait_for_postprocess()
+        self.save_state()
+        self.events.close()
+
+    def download_playlist_tracks(
+        self,
+        playlist,
+        playlist_dir,
+        prefix="",
+        on_progress=None,
+        done_tracks=None,
+        entries=None,
+    ):
+        """Download a playlist track by track through the two-stage pipeline
+
+        Stage 1 enumerates the track IDs, the network pool fetches raw audio
+        and every fetched track is handed straight to the post-processing
+        pool, so one slow track never blocks the others. Tracks listed in
+        ``done_tracks`` are skipped.
+
+        Returns (success, download_started).
+        """
+        playlist_id = str(playlist["id"])
+        entries = self.get_missing_entries(playlist, done_tracks or {}, prefix, entries)
+        total = len(entries)
+        if not entries:
+            # Nothing left to download (all done, or an empty playlist)
+            return True, bool(done_tracks)
+
+        fetch_pool, postprocess_pool = self.get_track_pools()
+        metrics = self.playlist_metrics.get(playlist_id)
+        counter_lock = threading.Lock()
+        counts = {"done": 0, "failed": 0, "skipped": 0}
+
+        def report(entry, path, stage):
+            ok = path is not None
+            skipped = False
+            if ok and stage == "queued":
+                # enqueue_postprocess already recorded it
                 pass
+            elif ok:
+                self.record_track_done(
+                    playlist_id, str(entry["id"]), path, playlist_dir
+                )
+            else:
+                skipped = self.record_track_failed(
+                    playlist_id, str(entry["id"]), f"{stage} failed"
+                )
+            with counter_lock:
+                counts["done" if ok else "skipped" if skipped else "failed"] += 1
+                finished = counts["done"] + counts["failed"] + counts["skipped"]
+            title = entry.get("title") or entry["id"]
+            if not ok:
+                mark = f"✗ ({stage} failed)"
+            else:
+                mark = "⧗ (queued for post-processing)" if stage == "queued" else "✓"
+            self.log(f"  [{finished}/{total}] {mark} {title}", prefix)
+            if on_progress:
+                on_progress(f"{finished * 100 / total:.1f}%")
+
+        def postprocess(entry, info_json):
+            path = self.postprocess_track(info_json, playlist_dir, prefix, metrics)
+            report(entry, path, "post-processing")
+            return path
 
-            process.wait()
+        fetch_futures = {
+            fetch_pool.submit(self.fetch_track, e, playlist_dir, prefix, metrics): e
+            for e in entries
+        }
+        postprocess_futures = []
+        for future in as_completed(fetch_futures):
+            entry = fetch_futures[future]
+            try:
+                info_json = future.result()
+            except Exception as e:
+                self.log(f"  ✗ Error fetching {entry['id']}: {e}", prefix)
+                info_json = None
+            if info_json is None:
+                report(entry, None, "download")
+                continue
+            if self.postprocess_mode == "deferred":
+                self.enqueue_postprocess(
+                    playlist_id, str(entry["id"]), info_json, playlist_dir
+                )
+                report(entry, info_json, "queued")
+                continue
+            postprocess_futures.append(
+                postprocess_pool.submit(postprocess, entry, info_json)
+            )
 
-            # Consider it successful if downloads started and process completed
-            if process.returncode == 0 or (
-                download_started and process.returncode == 1
-            ):
-                print(f"\n✓ Completed: {playlist_title}")
-                print(f"[STATE] Adding playlist ID to completed: {playlist_id}")
-                self.state["completed_playlists"].append(playlist_id)
-                self.save_state()
-                print(
-                    f"[STATE] State saved. Total completed: {len(self.state['completed_playlists'])}\n"
+        for future in as_completed(postprocess_futures):
+            try:
+                future.result()
+            except Exception as e:
+                self.log(f"  ✗ Error post-processing: {e}", prefix)
+                with counter_lock:
+                    counts["failed"] += 1
+
+        # Leave .pending behind only if some tracks still need post-processing
+        try:
+            self.pending_dir(playlist_dir).rmdir()
+        except OSError:
+            pass
+
+        return counts["failed"] == 0, counts["done"] > 0
+
+    def download_playlists_parallel(self, playlists, pbar):
+        """Download playlists through a bounded worker pool
+
+        Each worker owns a slot (W1..Wn) used as its output prefix; the shared
+        progress bar advances as playlists finish and its postfix shows the
+        current percentage of every busy worker.
+        """
+        slots = queue.Queue()
+        for i in range(1, self.max_parallel_playlists + 1):
+            slots.put(f"[W{i}]")
+
+        status_lock = threading.Lock()
+        worker_status = {}
+        progress_pattern = re.compile(r"(\d+(?:\.\d+)?)%")
+
+        def refresh_postfix():
+            with status_lock:
+                postfix = " ".join(
+                    f"{slot.strip('[]')}:{status}"
+                    for slot, status in sorted(worker_status.items())
                 )
-                return True
-            else:
-                print(f"\n⚠ Completed with errors: {playlist_title}")
-                # Still mark as complete if some downloads happened
-                if download_started:
-                    print(
-                        f"[STATE] Adding playlist ID to completed (with errors): {playlist_id}"
-                    )
-                    self.state["completed_playlists"].append(playlist_id)
-                    self.save_state()
-                    print(
-                        f"[STATE] State saved. Total completed: {len(self.state['completed_playlists'])}\n"
+            pbar.set_postfix_str(postfix, refresh=True)
+
+        def worker(playlist):
+            prefix = slots.get()
+            try:
+
+                def on_progress(line):
+                    match = progress_pattern.search(line)
+                    if match:
+                        with status_lock:
+                            worker_status[prefix] = f"{float(match.group(1)):.0f}%"
+                        refresh_postfix()
+
+                with status_lock:
+                    worker_status[prefix] = "0%"
+                refresh_postfix()
+                return self.download_playlist(
+                    playlist, prefix=prefix, on_progress=on_progress
+                )
+            finally:
+                with status_lock:
+                    worker_status.pop(prefix, None)
+                slots.put(prefix)
+
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_parallel_playlists) as pool:
+            futures = {pool.submit(worker, p): p for p in playlists}
+            for future in as_completed(futures):
+                playlist = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    tqdm.write(f"✗ Worker failed for '{playlist['title']}': {e}")
+                    results.append(False)
+                pbar.update(1)
+                refresh_postfix()
+        return results
+
+    def print_run_metrics(self):
+        """Aggregate the per-playlist metrics of this run and emit run_done"""
+        if not self.run_summaries:
+            return
+        done = sum(m["tracks_done"] for m in self.run_summaries)
+        failed = sum(m["tracks_failed"] for m in self.run_summaries)
+        retries = sum(m["retries"] for m in self.run_summaries)
+        total_bytes = sum(m["bytes"] for m in self.run_summaries)
+        download_s = sum(m["download_s"] for m in self.run_summaries)
+        postprocess_s = sum(m["postprocess_s"] for m in self.run_summaries)
+        elapsed = time.time() - self.run_started_at
+
+        # Throughput history for the planner (last 20 runs)
+        history = list(self.state.get("run_history", []))[-19:]
+        history.append(
+            {
+                "ts": round(time.time()),
+                "tracks_done": done,
+                "bytes": total_bytes,
+                "elapsed_s": round(elapsed, 3),
+            }
+        )
+        self.update_state("set", ["run_history"], history)
+
+        self.events.emit(
+            "run_done",
+            playlists=len(self.run_summaries),
+            tracks_done=done,
+            tracks_failed=failed,
+            retries=retries,
+            bytes=total_bytes,
+            elapsed_s=round(elapsed, 3),
+            bytes_per_s=round(total_bytes / elapsed) if elapsed else 0,
+            download_s=round(download_s, 3),
+            postprocess_s=round(postprocess_s, 3),
+        )
+
+        print("\n" + "-" * 60)
+        print("Run metrics")
+        print("-" * 60)
+        print(f"Tracks: {done} done, {failed} failed, {retries} retries")
+        print(
+            f"Downloaded: {total_bytes / 1024 / 1024:.1f} MiB in {elapsed:.1f}s "
+            f"({total_bytes / 1024 / 1024 / elapsed if elapsed else 0:.2f} MiB/s)"
+        )
+        if done:
+            print(
+                f"Per track: {download_s / done:.1f}s download, "
+                f"{postprocess_s / done:.1f}s post-processing (avg)"
+            )
+        slowest = sorted(
+            self.run_summaries, key=lambda m: m["elapsed_s"], reverse=True
+        )[:3]
+        for m in slowest:
+            print(f"  {m['elapsed_s']:8.1f}s  {m['title']}")
+        print("-" * 60)
+
+    def scan_playlist_dir(self, playlist_dir):
+        """Count audio files and their bytes in a playlist folder (no recursion)"""
+        count = size = 0
+        try:
+            with os.scandir(playlist_dir) as it:
+                for entry in it:
+                    if entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                        try:
+                            size += entry.stat().st_size
+                        except OSError:
+                            continue
+                        count += 1
+        except OSError:
+            pass
+        return count, size
+
+    def planned_playlists(self):
+        """Playlists of the configured input, from config and cache only
+
+        Returns (playlists, note); playlists without cached info get a
+        placeholder title. For channels the cached enumeration is used.
+        """
+        if self.input_method == "channel":
+            cached = self.state["channel_playlists"].get(self.channel_url)
+            if not cached:
+                return [], "channel not enumerated yet (run once to cache it)"
+            age_hours = (time.time() - cached.get("fetched_at", 0)) / 3600
+            note = ""
+            if (
+                self.channel_cache_ttl_hours > 0
+                and age_hours >= self.channel_cache_ttl_hours
+            ):
+                note = f"channel list is {age_hours:.0f}h old and will be refreshed"
+            return list(cached["playlists"]), note
+
+        if self.input_method == "playlist_file":
+            urls = self.extract_playlist_urls_from_file(self.playlist_file)
+        else:
+            urls = self.playlist_urls
+        playlists = []
+        uncached = 0
+        for url in urls:
+            playlist_id = self.extract_playlist_id(url)
+            info = self.state["playlist_info"].get(playlist_id)
+            if info is None:
+                uncached += 1
+                info = {"id": playlist_id, "title": None, "url": url}
+            playlists.append(info)
+        note = f"{uncached} playlists not looked up yet" if uncached else ""
+        return playlists, note
+
+    def plan(self):
+        """Compute what a run would do, without any network access
+
+        Uses the cached playlist info, the state and a scan of the playlist
+        folders. Track counts come from earlier listings; where a playlist
+        was never listed the average size of known playlists is used and
+        the numbers are marked as estimated. Bytes and duration are
+        extrapolated from the throughput of recent runs (run_history).
+        """
+        started = time.perf_counter()
+        with self.state_lock:
+            playlists, note = self.planned_playlists()
+            completed = set(self.state["completed_playlists"])
+            known_sizes = [
+                len(tracks)
+                for tracks in self.state["playlist_tracks"].values()
+                if tracks
+            ]
+            avg_playlist_tracks = (
+                sum(known_sizes) / len(known_sizes) if known_sizes else None
+            )
+
+            items = []
+            for playlist in playlists:
+                playlist_id = str(playlist["id"])
+                partial = self.state["partially_downloaded"].get(playlist_id, {})
+                done = len(partial.get("done", {}))
+                failed = len(partial.get("failed", {}))
+                queued = len(self.state["postprocess_queue"].get(playlist_id, {}))
+                skipped = len(self.state["skipped_tracks"].get(playlist_id, {}))
+                track_count = playlist.get("track_count")
+                title = playlist.get("title")
+                on_disk = (0, 0)
+                if title:
+                    on_disk = self.scan_playlist_dir(
+                        self.root_path / self.clean_filename(str(title))
                     )
-                return False
 
-        except Exception as e:
-            print(f"\n✗ Error downloading playlist: {e}")
-            import traceback
+                estimated = False
+                if playlist_id in completed:
+                    status = "sync" if self.sync_mode else "completed"
+                    pending = 0
+                else:
+                    status = "partial" if done or failed or queued else "pending"
+                    if track_count is None and avg_playlist_tracks is not None:
+                        track_count = round(avg_playlist_tracks)
+                        estimated = True
+                    if track_count is None:
+                        pending = failed
+                        estimated = True
+                    else:
+                        pending = max(track_count - done - queued - skipped, failed)
+                items.append(
+                    {
+                        "id": playlist_id,
+                        "title": title,
+                        "status": status,
+                        "tracks": track_count,
+                        "done": done,
+                        "failed": failed,
+                        "queued": queued,
+                        "skipped": skipped,
+                        "pending": pending,
+                        "estimated": estimated,
+                        "files_on_disk": on_disk[0],
+                        "bytes_on_disk": on_disk[1],
+                    }
+                )
 
-            traceback.print_exc()
-            print()
-            return False
+            history = [
+                run
+                for run in self.state.get("run_history", [])
+                if run.get("tracks_done")
+            ]
+
+        pending_tracks = sum(item["pending"] for item in items)
+        history_tracks = sum(run["tracks_done"] for run in history)
+        history_bytes = sum(run["bytes"] for run in history)
+        history_seconds = sum(run["elapsed_s"] for run in history)
+        disk_files = sum(item["files_on_disk"] for item in items)
+        disk_bytes = sum(item["bytes_on_disk"] for item in items)
+
+        if history_tracks and history_bytes:
+            bytes_per_track, bytes_source = history_bytes / history_tracks, "history"
+        elif disk_files:
+            bytes_per_track, bytes_source = disk_bytes / disk_files, "disk"
+        else:
+            bytes_per_track, bytes_source = None, None
+        seconds_per_track = history_seconds / history_tracks if history_tracks else None
+
+        return {
+            "playlists": items,
+            "note": note,
+            "counts": {
+                status: sum(item["status"] == status for item in items)
+                for status in ("completed", "sync", "partial", "pending")
+            },
+            "pending_tracks": pending_tracks,
+            "failed_tracks": sum(item["failed"] for item in items),
+            "queued_postprocess": sum(item["queued"] for item in items),
+            "estimated": any(
+                item["estimated"] for item in items if item["status"] != "completed"
+            ),
+            "bytes_per_track": round(bytes_per_track) if bytes_per_track else None,
+            "bytes_source": bytes_source,
+            "estimated_bytes": (
+                round(pending_tracks * bytes_per_track) if bytes_per_track else None
+            ),
+            "seconds_per_track": (
+                round(seconds_per_track, 3) if seconds_per_track else None
+            ),
+            "estimated_seconds": (
+                round(pending_tracks * seconds_per_track, 1)
+                if seconds_per_track
+                else None
+            ),
+            "history_runs": len(history),
+            "run_needed": bool(
+                pending_tracks
+                or any(
+                    item["status"] in ("sync", "partial", "pending") for item in items
+                )
+            ),
+            "planned_in_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def print_plan(self, plan):
+        """Human readable version of plan()"""
+        approx = "~" if plan["estimated"] else ""
+        counts = plan["counts"]
+        print("=" * 60)
+        print(f"Download plan ({len(plan['playlists'])} playlists, no network)")
+        print("=" * 60)
+        for item in plan["playlists"]:
+            if item["status"] == "completed":
+                continue
+            mark = {"sync": "↻", "partial": "◐", "pending": "○"}[item["status"]]
+            title = item["title"] or f"(not looked up) {item['id']}"
+            if item["status"] == "sync":
+                detail = "re-checked for new tracks"
+            elif item["tracks"] is None:
+                detail = (
+                    f"track count unknown, {item['done']} done, "
+                    f"{item['failed']} failed"
+                )
+            else:
+                detail = (
+                    f"{'~' if item['estimated'] else ''}{item['pending']} to download "
+                    f"of {item['tracks']}, {item['done']} done, {item['failed']} failed"
+                )
+                if item["queued"]:
+                    detail += f", {item['queued']} queued"
+            print(f"  {mark} {title}: {detail}")
+        print()
+        print(
+            f"Completed: {counts['completed']}  Sync: {counts['sync']}  "
+            f"Partial: {counts['partial']}  Pending: {counts['pending']}"
+        )
+        print(
+            f"Tracks to download: {approx}{plan['pending_tracks']} "
+            f"({plan['failed_tracks']} failed before)"
+        )
+        if plan["queued_postprocess"]:
+            print(f"Post-processing queue: {plan['queued_postprocess']} tracks")
+        if plan["estimated_bytes"] is not None:
+            print(
+                f"Estimated size: ~{plan['estimated_bytes'] / 1024 / 1024:.1f} MiB "
+                f"({plan['bytes_per_track'] / 1024 / 1024:.2f} MiB/track from "
+                f"{plan['bytes_source']})"
+            )
+        if plan["estimated_seconds"] is not None:
+            minutes, seconds = divmod(int(plan["estimated_seconds"]), 60)
+            print(
+                f"Estimated time: ~{minutes}m{seconds:02d}s "
+                f"({plan['seconds_per_track']:.1f}s/track over the last "
+                f"{plan['history_runs']} runs)"
+            )
+        else:
+            print("Estimated time: unknown (no finished runs recorded yet)")
+        if plan["note"]:
+            print(f"Note: {plan['note']}")
+        print(f"Run needed: {'yes' if plan['run_needed'] else 'no'}")
+        print(f"Planned in {plan['planned_in_ms']:.1f} ms")
 
     def run(self):
         """Main execution function"""
+        self.run_started_at = time.time()
         print("\n" + "=" * 60)
         print("YouTube Playlist Downloader")
         print("=" * 60 + "\n")
@@ -536,6 +2641,10 @@ class YouTubePlaylistDownloader:
             f"[STATE] Current completed playlists: {self.state['completed_playlists']}\n"
         )
 
+        resumed = self.resume_postprocess_queue()
+        if resumed:
+            print(f"[POSTPROCESS] Resuming {resumed} queued post-processing jobs\n")
+
         # Get playlists based on input method
         if self.input_method == "channel":
             playlists = self.get_playlists_from_channel()
@@ -546,6 +2655,7 @@ class YouTubePlaylistDownloader:
 
         if not playlists:
             print("No playlists to download!")
+            self.wait_for_postprocess()
             return
 
         print(f"\n[STATE] Checking which playlists are already completed...")
@@ -564,6 +2674,10 @@ class YouTubePlaylistDownloader:
             for p in playlists
             if str(p["id"]) not in self.state["completed_playlists"]
         ]
+        if self.sync_mode:
+            # Completed playlists are checked for new tracks as well
+            print(f"[SYNC] Checking all {len(playlists)} playlists for new tracks\n")
+            remaining = list(playlists)
         completed_count = len(playlists) - len(remaining)
 
         print(f"Progress: {completed_count}/{len(playlists)} playlists completed")
@@ -571,19 +2685,29 @@ class YouTubePlaylistDownloader:
 
         if not remaining:
             print("All playlists already downloaded!")
+            self.wait_for_postprocess()
             return
 
         # Download each playlist with progress bar
         with tqdm(
             total=len(remaining), desc="Overall Progress", unit="playlist"
         ) as pbar:
-            for playlist in remaining:
-                success = self.download_playlist(playlist)
-                pbar.update(1)
+            if self.max_parallel_playlists > 1 and len(remaining) > 1:
+                print(
+                    f"Downloading with {self.max_parallel_playlists} parallel workers\n"
+                )
+                self.download_playlists_parallel(remaining, pbar)
+            else:
+                # Requests are paced by the rate limiter, no fixed delay needed
+                for playlist in remaining:
+                    self.download_playlist(playlist)
+                    pbar.update(1)
 
-                # Small delay between playlists
-                if success:
-                    time.sleep(1)
+        self.shutdown_track_pools()
+        self.wait_for_postprocess()
+        self.save_state()
+        self.print_run_metrics()
+        self.events.close()
 
         print("\n" + "=" * 60)
         print("Download Complete!")
@@ -595,9 +2719,47 @@ class YouTubePlaylistDownloader:
 
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="YouTube Playlist Downloader")
+    arg_parser.add_argument(
+        "command",
+        nargs="?",
+        default="download",
+        choices=["download", "postprocess", "plan"],
+        help="download playlists (default), only work through the deferred "
+        "post-processing queue, or show what a run would do without network "
+        "access",
+    )
+    arg_parser.add_argument(
+        "--config", default="config.yml", help="path to the config file"
+    )
+    arg_parser.add_argument(
+        "--json", action="store_true", help="plan: print the plan as JSON"
+    )
+    arg_parser.add_argument(
+        "--exit-code",
+        action="store_true",
+        help="plan: exit with 1 if a run is needed, 0 if there is nothing to do",
+    )
+    cli_args = arg_parser.parse_args()
+
     try:
-        downloader = YouTubePlaylistDownloader()
-        downloader.run()
+        if cli_args.command == "plan":
+            # Keep stdout for the plan itself
+            with contextlib.redirect_stdout(sys.stderr):
+                downloader = YouTubePlaylistDownloader(cli_args.config, read_only=True)
+                plan = downloader.plan()
+            if cli_args.json:
+                print(json.dumps(plan, indent=2, ensure_ascii=False))
+            else:
+                downloader.print_plan(plan)
+            downloader.events.close()
+            sys.exit(1 if cli_args.exit_code and plan["run_needed"] else 0)
+
+        downloader = YouTubePlaylistDownloader(cli_args.config)
+        if cli_args.command == "postprocess":
+            downloader.run_postprocess_queue()
+        else:
+            downloader.run()
     except KeyboardInterrupt:
         print("\n\n⚠ Download interrupted by user")
         print("Progress has been saved. Run the script again to continue.")